@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from .instrumentation import InstrumentedQueuePool, instrument_engine
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -19,12 +21,47 @@ if not DATABASE_URL:
         f"mysql+pymysql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
     )
 
+# Connection pool. Every request thread and every fan-out query worker can
+# hold a connection, so the API threadpool defaults to what the pool can serve
+# once the workers have theirs; threads then never queue on pool checkout.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+QUERY_WORKERS = int(os.getenv("API_QUERY_WORKERS", "8"))
+API_THREADPOOL_SIZE = int(
+    os.getenv("API_THREADPOOL_SIZE", str(max(1, DB_POOL_SIZE + DB_MAX_OVERFLOW - QUERY_WORKERS)))
+)
+
+# Analytic (aggregate) endpoints: how many may query at once, how long each
+# statement may run, and the Retry-After sent to requests turned away.
+ANALYTICS_CONCURRENCY = int(os.getenv("API_ANALYTICS_CONCURRENCY", "4"))
+ANALYTICS_TIMEOUT_SECONDS = float(os.getenv("API_ANALYTICS_TIMEOUT", "15"))
+ANALYTICS_RETRY_AFTER_SECONDS = int(os.getenv("API_ANALYTICS_RETRY_AFTER", "2"))
+# Statement timeout for trip listings.
+LISTING_TIMEOUT_SECONDS = float(os.getenv("API_LISTING_TIMEOUT", "10"))
+# Listing totals not answered by the derived tables count at most this many
+# trips; larger totals are planner estimates, flagged approximate.
+TOTAL_COUNT_CAP = int(os.getenv("API_TOTAL_COUNT_CAP", "10000"))
+# Requests slower than this are logged with their slowest SQL; 0 turns it off.
+SLOW_REQUEST_SECONDS = float(os.getenv("API_SLOW_REQUEST_SECONDS", "0"))
+# Directory of the cache shared by all API workers on a host (aggregate
+# responses and dimension data); unset keeps every cache per process.
+SHARED_CACHE_DIR = os.getenv("API_SHARED_CACHE_DIR", "")
+SHARED_CACHE_MAX_BYTES = int(float(os.getenv("API_SHARED_CACHE_MAX_MB", "512")) * 2**20)
+# Run ``etl.refresh`` next to the API every this many seconds; 0 turns it off.
+REFRESH_INTERVAL_SECONDS = float(os.getenv("API_REFRESH_INTERVAL", "0"))
+
 engine = create_engine(
     DATABASE_URL,
     echo=False,
     future=True,
     pool_pre_ping=True,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
 )
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(
     bind=engine,
@@ -33,4 +70,18 @@ SessionLocal = sessionmaker(
     future=True,
 )
 
-__all__ = ["DATABASE_URL", "engine", "SessionLocal"]
+__all__ = [
+    "DATABASE_URL",
+    "DB_POOL_SIZE",
+    "DB_MAX_OVERFLOW",
+    "DB_POOL_TIMEOUT",
+    "QUERY_WORKERS",
+    "API_THREADPOOL_SIZE",
+    "ANALYTICS_CONCURRENCY",
+    "ANALYTICS_TIMEOUT_SECONDS",
+    "ANALYTICS_RETRY_AFTER_SECONDS",
+    "LISTING_TIMEOUT_SECONDS",
+    "TOTAL_COUNT_CAP",
+    "engine",
+    "SessionLocal",
+]
@@ -2,7 +2,12 @@ from __future__ import annotations
 
 from typing import Generator
 
-from .config import SessionLocal
+from fastapi import Depends
+
+from backend.app.utils.admission import admit_analytic_query
+
+from .config import ANALYTICS_TIMEOUT_SECONDS, LISTING_TIMEOUT_SECONDS, SessionLocal
+from .timeouts import set_statement_timeout
 
 
 def get_session() -> Generator:
@@ -18,4 +23,29 @@ def get_session() -> Generator:
     try:
         yield session
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+
+def _session_with_timeout(seconds: float) -> Generator:
+    session = SessionLocal()
+    try:
+        set_statement_timeout(session, seconds)
+        yield session
+    finally:
+        session.close()
+
+
+def get_listing_session() -> Generator:
+    """Session for trip listings; statements are cancelled after ``API_LISTING_TIMEOUT``."""
+    yield from _session_with_timeout(LISTING_TIMEOUT_SECONDS)
+
+
+def get_analytics_session(_: None = Depends(admit_analytic_query)) -> Generator:
+    """
+    Session for aggregate endpoints.
+
+    The request must first win one of ``API_ANALYTICS_CONCURRENCY`` slots
+    (503 with ``Retry-After`` otherwise), and its statements are cancelled
+    after ``API_ANALYTICS_TIMEOUT`` seconds.
+    """
+    yield from _session_with_timeout(ANALYTICS_TIMEOUT_SECONDS)
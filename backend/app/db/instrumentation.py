@@ -0,0 +1,77 @@
+"""SQLAlchemy hooks feeding ``app.utils.metrics``: statement timings and pool waits."""
+
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from ..utils.metrics import (
+    POOL_TIMEOUTS,
+    POOL_WAIT,
+    STATEMENT_ERRORS,
+    Gauge,
+    record_statement,
+    registry,
+)
+
+
+# Key in the connection's ``info`` dict holding statement start times.
+_STARTED_KEY = "statement_started"
+
+
+class InstrumentedQueuePool(QueuePool):
+    """``QueuePool`` that times every checkout, including waits for a free slot."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement ``engine`` runs and publish its pool occupancy."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _statement_started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info[_STARTED_KEY].pop()
+        record_statement(time.perf_counter() - started, statement)
+
+    @event.listens_for(engine, "handle_error")
+    def _statement_failed(context):
+        STATEMENT_ERRORS.inc()
+        conn = context.connection
+        if conn is not None and conn.info.get(_STARTED_KEY):
+            started = conn.info[_STARTED_KEY].pop()
+            record_statement(time.perf_counter() - started, context.statement or "")
+
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        registry.register(
+            Gauge("db_pool_size", "Connections the pool keeps open.", pool.size)
+        )
+        registry.register(
+            Gauge("db_pool_checked_out", "Connections currently in use.", pool.checkedout)
+        )
+        registry.register(
+            Gauge(
+                "db_pool_overflow",
+                "Connections open beyond the pool size.",
+                lambda: max(0, pool.overflow()),
+            )
+        )
+
+
+__all__ = ["InstrumentedQueuePool", "instrument_engine"]
@@ -0,0 +1,101 @@
+"""Per-session statement timeouts that cancel runaway SQL on the server."""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .config import engine
+
+
+# Key in the pooled connection's ``info`` dict while a timeout is in force,
+# and in the session's, of the timeout its transactions start with.
+_TIMEOUT_KEY = "statement_timeout"
+
+# Server error codes for "statement cancelled by its timeout".
+_MYSQL_QUERY_TIMEOUT = 3024
+_POSTGRES_QUERY_CANCELED = "57014"
+
+
+def set_statement_timeout(session: Session, seconds: float) -> None:
+    """
+    Limit every statement ``session`` runs to ``seconds``.
+
+    MySQL uses ``max_execution_time`` (SELECTs only), cleared when the
+    connection returns to the pool. PostgreSQL uses ``SET LOCAL
+    statement_timeout``, which ends with the session's transaction. SQLite
+    interrupts statements from a progress handler.
+    """
+    session.info[_TIMEOUT_KEY] = seconds
+    connection = session.connection()
+    milliseconds = max(1, int(seconds * 1000))
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {milliseconds}")
+        return
+    if dialect == "mysql":
+        connection.exec_driver_sql(f"SET SESSION max_execution_time = {milliseconds}")
+    elif dialect != "sqlite":
+        return
+    connection.connection.info[_TIMEOUT_KEY] = seconds
+
+
+def rollback(session: Session) -> None:
+    """
+    Roll ``session`` back, keeping its statement timeout for what runs next.
+
+    The rollback ends the transaction, and with it PostgreSQL's ``SET
+    LOCAL``, and returns the connection to the pool, which clears the MySQL
+    and SQLite timeouts. Fallback queries after a failed probe would
+    otherwise run unbounded.
+    """
+    session.rollback()
+    seconds = session.info.get(_TIMEOUT_KEY)
+    if seconds is not None:
+        set_statement_timeout(session, seconds)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_sqlite_deadline(conn, cursor, statement, parameters, context, executemany):
+    seconds = conn.connection.info.get(_TIMEOUT_KEY)
+    if seconds is None or conn.dialect.name != "sqlite":
+        return
+    deadline = time.monotonic() + seconds
+    # A truthy return from the handler makes SQLite abort the statement.
+    conn.connection.dbapi_connection.set_progress_handler(
+        lambda: time.monotonic() > deadline, 10_000
+    )
+
+
+@event.listens_for(engine, "checkin")
+def _clear_statement_timeout(dbapi_connection, connection_record):
+    if connection_record.info.pop(_TIMEOUT_KEY, None) is None:
+        return
+    if engine.dialect.name == "sqlite":
+        dbapi_connection.set_progress_handler(None, 0)
+        return
+    try:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET SESSION max_execution_time = 0")
+        cursor.close()
+    except Exception:
+        # Never hand out a connection that may still carry the timeout.
+        connection_record.invalidate()
+
+
+def is_statement_timeout(exc: OperationalError) -> bool:
+    """True when ``exc`` is a statement cancelled by ``set_statement_timeout``."""
+    orig = exc.orig
+    args = getattr(orig, "args", ())
+    if args and args[0] == _MYSQL_QUERY_TIMEOUT:
+        return True
+    if getattr(orig, "pgcode", None) == _POSTGRES_QUERY_CANCELED:
+        return True
+    return isinstance(orig, sqlite3.OperationalError) and "interrupted" in str(orig)
+
+
+__all__ = ["set_statement_timeout", "rollback", "is_statement_timeout"]
@@ -7,16 +7,88 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from fastapi import FastAPI
+import logging
+import subprocess
+import time
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 
+from backend.app.db.config import (
+    API_THREADPOOL_SIZE,
+    REFRESH_INTERVAL_SECONDS,
+    SLOW_REQUEST_SECONDS,
+    SessionLocal,
+)
+from backend.app.db.timeouts import is_statement_timeout
 from backend.app.routes import api_router
+from backend.app.utils.dimensions import dimension_cache
+from backend.app.utils.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    REQUEST_DB_TIME,
+    REQUEST_LATENCY,
+    REQUEST_QUERIES,
+    REQUESTS,
+    RequestStats,
+    current_request_stats,
+    registry,
+)
+
+
+logger = logging.getLogger(__name__)
+slow_request_logger = logging.getLogger("backend.app.slow_requests")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync endpoints run on AnyIO's threadpool; keep it within the DB pool.
+    to_thread.current_default_thread_limiter().total_tokens = API_THREADPOOL_SIZE
+
+    # Warm the vendor/location cache so the first requests skip the load.
+    session = SessionLocal()
+    try:
+        dimension_cache.load(session)
+    except SQLAlchemyError:
+        logger.exception("Could not preload dimension cache; loading on first use")
+    finally:
+        session.close()
+
+    refresher = _start_refresher() if REFRESH_INTERVAL_SECONDS > 0 else None
+    try:
+        yield
+    finally:
+        if refresher is not None:
+            refresher.terminate()
+            try:
+                refresher.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                refresher.kill()
+
+
+def _start_refresher() -> subprocess.Popen:
+    """
+    Run the derived-table scheduler (``etl.refresh``) beside the API.
+
+    It runs as a child process so its pandas work never holds this process's
+    GIL while requests are served. With several API workers each starts one;
+    a host-wide lock lets only one of them refresh at a time.
+    """
+    logger.info("Starting derived-table refresh every %ss", REFRESH_INTERVAL_SECONDS)
+    return subprocess.Popen(
+        [sys.executable, "-m", "etl.refresh", "--interval", str(REFRESH_INTERVAL_SECONDS)],
+        cwd=PROJECT_ROOT / "backend",
+    )
 
 
 app = FastAPI(
     title="Urban Mobility Data Explorer API",
     version="1.0.0",
     description="API endpoints for exploring vendors, locations, trips, and analytical insights.",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware to allow frontend requests
@@ -26,11 +98,67 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"],  
+    # Pagination totals of the trip listings (``include_total=true``).
+    expose_headers=["X-Total-Count", "X-Total-Count-Approximate"],
 )
 
 app.include_router(api_router)
 
 
+def _log_slow_request(request: Request, status: int, elapsed: float, stats: RequestStats) -> None:
+    statements = "\n".join(
+        f"  {seconds:.3f}s  {' '.join(statement.split())[:1_000]}"
+        for seconds, statement in stats.slowest()
+    )
+    slow_request_logger.warning(
+        "Slow request %s %s -> %s in %.3fs (%d queries, %.3fs in SQL); slowest SQL:\n%s",
+        request.method,
+        request.url.path + (f"?{request.url.query}" if request.url.query else ""),
+        status,
+        elapsed,
+        stats.query_count,
+        stats.db_seconds,
+        statements or "  (none)",
+    )
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-route latency, status, SQL statement count and SQL time."""
+    stats = RequestStats()
+    token = current_request_stats.set(stats)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        current_request_stats.reset(token)
+        # The route template, not the raw path, keeps label cardinality bounded.
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUEST_LATENCY.observe(elapsed, request.method, route)
+        REQUESTS.inc(request.method, route, str(status))
+        REQUEST_QUERIES.observe(stats.query_count, request.method, route)
+        REQUEST_DB_TIME.observe(stats.db_seconds, request.method, route)
+        if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+            _log_slow_request(request, status, elapsed, stats)
+
+
+@app.exception_handler(OperationalError)
+async def statement_timeout_handler(request: Request, exc: OperationalError):
+    if is_statement_timeout(exc):
+        return JSONResponse(status_code=504, content={"detail": "Query exceeded its time limit"})
+    raise exc
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Request, SQL and connection pool metrics in the Prometheus text format."""
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get("/health", tags=["Utility"])
 def health_check() -> dict[str, str]:
     return {"status": "ok"}
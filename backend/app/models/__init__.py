@@ -1,5 +1,31 @@
 """SQLAlchemy ORM models for the Urban Mobility data explorer."""
 
-from .models import Base, Location, Trip, Vendor
+from .models import (
+    Base,
+    DerivedRefresh,
+    EtlRun,
+    Location,
+    MetricHistogramBin,
+    OdMatrixCell,
+    PartitionChange,
+    Trip,
+    TripRollup,
+    TripSample,
+    TripSampleStratum,
+    Vendor,
+)
 
-__all__ = ["Base", "Vendor", "Location", "Trip"]
+__all__ = [
+    "Base",
+    "Vendor",
+    "Location",
+    "Trip",
+    "TripRollup",
+    "OdMatrixCell",
+    "TripSample",
+    "TripSampleStratum",
+    "MetricHistogramBin",
+    "EtlRun",
+    "PartitionChange",
+    "DerivedRefresh",
+]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String, Boolean
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Index, Integer, Numeric, String, Boolean
 from sqlalchemy.orm import declarative_base, relationship
 
 
@@ -38,9 +38,9 @@ class Trip(Base):
     __tablename__ = "trips"
 
     trip_id = Column(Integer, primary_key=True, autoincrement=True)
-    vendor_id = Column(String(10), ForeignKey("vendors.vendor_id"), nullable=False, index=True)
-    pickup_id = Column(Integer, ForeignKey("locations.location_id"), nullable=False, index=True)
-    dropoff_id = Column(Integer, ForeignKey("locations.location_id"), nullable=False, index=True)
+    vendor_id = Column(String(10), ForeignKey("vendors.vendor_id"), nullable=False)
+    pickup_id = Column(Integer, ForeignKey("locations.location_id"), nullable=False)
+    dropoff_id = Column(Integer, ForeignKey("locations.location_id"), nullable=False)
 
     request_datetime = Column(DateTime, nullable=True)
     on_scene_datetime = Column(DateTime, nullable=True)
@@ -68,5 +68,226 @@ class Trip(Base):
         foreign_keys=[dropoff_id],
     )
 
+    # Filter columns lead, pickup_datetime follows so that filtered date
+    # ranges and the default "newest first" ordering are index range scans.
+    # The metric indexes back the sort orders of ``TRIP_SORT_ORDERS``, with
+    # trip_id as the tie-breaker so pages stay stable.
+    __table_args__ = (
+        Index("idx_vendor_pickup_datetime", "vendor_id", "pickup_datetime"),
+        Index("idx_pickup_pickup_datetime", "pickup_id", "pickup_datetime"),
+        Index("idx_dropoff_pickup_datetime", "dropoff_id", "pickup_datetime"),
+        Index("idx_pickup_datetime", "pickup_datetime"),
+        Index("idx_trip_miles", "trip_miles", "trip_id"),
+        Index("idx_trip_duration_hours", "trip_duration_hours", "trip_id"),
+        Index("idx_average_speed_mph", "average_speed_mph", "trip_id"),
+        Index("idx_base_passenger_fare", "base_passenger_fare", "trip_id"),
+        Index("idx_driver_pay", "driver_pay", "trip_id"),
+    )
+
     def __repr__(self) -> str: 
         return f"<Trip trip_id={self.trip_id}>"
+
+
+class TripRollup(Base):
+    """Hourly pre-aggregates of ``trips`` per vendor and pickup zone.
+
+    Rows are additive: every load appends the rollups of its own batch, so a
+    grain may appear more than once and readers always ``SUM`` over it.
+    """
+
+    __tablename__ = "trip_rollups"
+
+    rollup_id = Column(Integer, primary_key=True, autoincrement=True)
+    pickup_hour = Column(DateTime, nullable=True)
+    vendor_id = Column(String(10), nullable=False)
+    pickup_id = Column(Integer, nullable=False)
+
+    trip_count = Column(Integer, nullable=False, default=0)
+    trip_miles_sum = Column(Numeric(14, 2), nullable=False, default=0)
+    trip_miles_count = Column(Integer, nullable=False, default=0)
+    trip_duration_hours_sum = Column(Numeric(14, 2), nullable=False, default=0)
+    trip_duration_hours_count = Column(Integer, nullable=False, default=0)
+    average_speed_mph_sum = Column(Numeric(14, 2), nullable=False, default=0)
+    average_speed_mph_count = Column(Integer, nullable=False, default=0)
+    base_passenger_fare_sum = Column(Numeric(16, 2), nullable=False, default=0)
+    base_passenger_fare_count = Column(Integer, nullable=False, default=0)
+    driver_pay_sum = Column(Numeric(16, 2), nullable=False, default=0)
+    driver_pay_count = Column(Integer, nullable=False, default=0)
+    total_extra_charges_sum = Column(Numeric(16, 2), nullable=False, default=0)
+    total_extra_charges_count = Column(Integer, nullable=False, default=0)
+    base_passenger_fare_min = Column(Numeric(8, 2), nullable=True)
+    base_passenger_fare_max = Column(Numeric(8, 2), nullable=True)
+    fare_outlier_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_rollup_hour_vendor", "pickup_hour", "vendor_id"),
+        Index("idx_rollup_vendor_hour", "vendor_id", "pickup_hour"),
+        Index("idx_rollup_pickup_hour", "pickup_id", "pickup_hour"),
+    )
+
+    def __repr__(self) -> str: 
+        return f"<TripRollup pickup_hour={self.pickup_hour} vendor_id={self.vendor_id!r}>"
+
+
+class OdMatrixCell(Base):
+    """Origin-destination pre-aggregates per month, hour of day and vendor.
+
+    Only observed (pickup_id, dropoff_id) pairs get rows, so the matrix stays
+    sparse. Like ``trip_rollups`` the rows are additive and read with ``SUM``.
+    """
+
+    __tablename__ = "od_matrix"
+
+    cell_id = Column(Integer, primary_key=True, autoincrement=True)
+    pickup_month = Column(Date, nullable=True)
+    hour_of_day = Column(Integer, nullable=True)
+    vendor_id = Column(String(10), nullable=False)
+    pickup_id = Column(Integer, nullable=False)
+    dropoff_id = Column(Integer, nullable=False)
+
+    trip_count = Column(Integer, nullable=False, default=0)
+    base_passenger_fare_sum = Column(Numeric(16, 2), nullable=False, default=0)
+    base_passenger_fare_count = Column(Integer, nullable=False, default=0)
+    trip_duration_hours_sum = Column(Numeric(14, 2), nullable=False, default=0)
+    trip_duration_hours_count = Column(Integer, nullable=False, default=0)
+    average_speed_mph_sum = Column(Numeric(14, 2), nullable=False, default=0)
+    average_speed_mph_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_od_pickup_dropoff", "pickup_id", "dropoff_id"),
+        Index("idx_od_dropoff_pickup", "dropoff_id", "pickup_id"),
+        Index("idx_od_vendor_hour", "vendor_id", "hour_of_day"),
+        Index("idx_od_month", "pickup_month"),
+    )
+
+    def __repr__(self) -> str: 
+        return f"<OdMatrixCell pickup_id={self.pickup_id} dropoff_id={self.dropoff_id}>"
+
+
+class TripSample(Base):
+    """Stratified random sample of ``trips`` (strata: vendor and pickup month).
+
+    ``weight`` is the number of trips each sampled row stands for, so
+    weighted sums over the sample estimate sums over ``trips``.
+    """
+
+    __tablename__ = "trip_samples"
+
+    sample_id = Column(Integer, primary_key=True, autoincrement=True)
+    vendor_id = Column(String(10), nullable=False)
+    sample_month = Column(Date, nullable=True)
+    weight = Column(Float, nullable=False)
+
+    pickup_id = Column(Integer, nullable=False)
+    dropoff_id = Column(Integer, nullable=False)
+    pickup_datetime = Column(DateTime, nullable=True)
+    trip_miles = Column(Numeric(6, 2), nullable=True)
+    trip_duration_hours = Column(Numeric(5, 2), nullable=True)
+    average_speed_mph = Column(Numeric(5, 2), nullable=True)
+    base_passenger_fare = Column(Numeric(8, 2), nullable=True)
+    driver_pay = Column(Numeric(8, 2), nullable=True)
+    total_extra_charges = Column(Numeric(8, 2), nullable=True)
+    is_fare_outlier = Column(Boolean, nullable=True, default=False)
+
+    __table_args__ = (
+        Index("idx_sample_vendor_month", "vendor_id", "sample_month"),
+        Index("idx_sample_pickup_datetime", "pickup_id", "pickup_datetime"),
+        Index("idx_sample_dropoff_datetime", "dropoff_id", "pickup_datetime"),
+    )
+
+    def __repr__(self) -> str: 
+        return f"<TripSample sample_id={self.sample_id}>"
+
+
+class TripSampleStratum(Base):
+    """Population and sample sizes of each ``trip_samples`` stratum."""
+
+    __tablename__ = "trip_sample_strata"
+
+    stratum_id = Column(Integer, primary_key=True, autoincrement=True)
+    vendor_id = Column(String(10), nullable=False)
+    sample_month = Column(Date, nullable=True)
+    population_count = Column(Integer, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("idx_stratum_vendor_month", "vendor_id", "sample_month"),
+    )
+
+    def __repr__(self) -> str: 
+        return f"<TripSampleStratum vendor_id={self.vendor_id!r} sample_month={self.sample_month}>"
+
+
+class MetricHistogramBin(Base):
+    """Trip count in one histogram bin of one metric, per vendor, zone and month.
+
+    Bins follow ``app.utils.histograms.HISTOGRAM_SCHEMES``; only non-empty
+    bins are stored. Rows are additive and merged with ``SUM``.
+    """
+
+    __tablename__ = "metric_histograms"
+
+    histogram_id = Column(Integer, primary_key=True, autoincrement=True)
+    metric = Column(String(32), nullable=False)
+    pickup_month = Column(Date, nullable=True)
+    vendor_id = Column(String(10), nullable=False)
+    pickup_id = Column(Integer, nullable=False)
+    bin_index = Column(Integer, nullable=False)
+    trip_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_histogram_metric_vendor_month", "metric", "vendor_id", "pickup_month"),
+        Index("idx_histogram_metric_pickup_month", "metric", "pickup_id", "pickup_month"),
+    )
+
+    def __repr__(self) -> str: 
+        return f"<MetricHistogramBin metric={self.metric!r} bin_index={self.bin_index}>"
+
+
+class EtlRun(Base):
+    """One completed ETL load; the latest ``run_id`` is the data generation."""
+
+    __tablename__ = "etl_runs"
+
+    run_id = Column(Integer, primary_key=True, autoincrement=True)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    trips_loaded = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str: 
+        return f"<EtlRun run_id={self.run_id}>"
+
+
+class PartitionChange(Base):
+    """A pickup month that an ETL run added trips to.
+
+    ``etl.refresh`` rebuilds the derived tables of every month changed since
+    its last run. ``pickup_month`` is NULL for trips without a pickup time.
+    """
+
+    __tablename__ = "partition_changes"
+
+    change_id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, nullable=False)
+    pickup_month = Column(Date, nullable=True)
+    trips_loaded = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_partition_change_run", "run_id"),
+    )
+
+    def __repr__(self) -> str: 
+        return f"<PartitionChange run_id={self.run_id} pickup_month={self.pickup_month}>"
+
+
+class DerivedRefresh(Base):
+    """Watermark of one ``etl.refresh`` job: the last ETL run it has caught up with."""
+
+    __tablename__ = "derived_refreshes"
+
+    job = Column(String(32), primary_key=True)
+    last_run_id = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime, nullable=True)
+
+    def __repr__(self) -> str: 
+        return f"<DerivedRefresh job={self.job!r} last_run_id={self.last_run_id}>"
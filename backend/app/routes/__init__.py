@@ -2,24 +2,216 @@
 
 from __future__ import annotations
 
-from typing import List
+from datetime import date, timedelta
+from typing import List, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, or_
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 
-from backend.app.db.deps import get_session
+from backend.app.db.config import ANALYTICS_TIMEOUT_SECONDS
+from backend.app.db.deps import get_analytics_session, get_listing_session, get_session
 from backend.app.models import Location, Trip, Vendor
 from backend.app.schemas import (
+    ApproximationOut,
+    DashboardOut,
+    DistanceFareHistogramOut,
+    DistributionOut,
+    HourlyTripCountsOut,
     InsightOverviewOut,
     LocationOut,
+    OdMatrixOut,
+    SearchResultsOut,
+    TimeseriesOut,
     TripOut,
+    TripWithZonesOut,
     TripSummaryOut,
     VendorOut,
     VendorPerformanceOut,
 )
+from backend.app.utils.admission import admit_analytic_query
+from backend.app.utils.approx import (
+    CONFIDENCE_LEVEL,
+    estimate_summary,
+    estimate_vendor_performance,
+    samples_available,
+)
+from backend.app.utils.cached_routes import SharedCacheRoute
+from backend.app.utils.counts import TripCount, count_location_trips, count_trips
+from backend.app.utils.dimensions import get_dimensions
+from backend.app.utils.queries import (
+    TRIP_SORT_PATTERN,
+    TripFilters,
+    count_dimensions,
+    distance_fare_histogram,
+    hourly_trip_counts,
+    metric_distribution,
+    od_matrix,
+    run_concurrently,
+    summarize_trips,
+    trip_timeseries,
+    trip_filter_clauses,
+    trip_order_by,
+    stream_rows,
+    trip_filters,
+    trip_search_clause,
+    vendor_performance,
+)
+from backend.app.utils.serializers import (
+    ARROW_STREAM_MEDIA_TYPE,
+    EXPANDED_TRIP_ARROW_SCHEMA,
+    EXPANDED_TRIP_FIELDS,
+    EXPORT_FORMATS,
+    TRIP_COLUMNS,
+    encode_arrow,
+    encode_json,
+    iter_export,
+    wants_arrow,
+    with_zones,
+    zone_values,
+)
+
+
+class AggregateCacheRoute(SharedCacheRoute):
+    # Aggregates depend only on the URL and the loaded data, so workers can
+    # share them; listings and single trips are cheap and are not cached.
+    cached_paths = frozenset(
+        {
+            "/api/trips/summary",
+            "/api/insights/overview",
+            "/api/insights/top-vendors",
+            "/api/insights/hourly-trips",
+            "/api/insights/distance-fare",
+            "/api/insights/od-matrix",
+            "/api/insights/distribution",
+            "/api/insights/timeseries",
+            "/api/insights/algorithm-performance",
+            "/api/dashboard",
+        }
+    )
+
+
+api_router = APIRouter(prefix="/api", route_class=AggregateCacheRoute)
+
+# Trip listings also answer ``Accept: application/vnd.apache.arrow.stream``.
+TRIP_LIST_RESPONSES = {
+    200: {"content": {ARROW_STREAM_MEDIA_TYPE: {}}},
+}
+
+# Trip listings render ``TripOut``, or ``TripWithZonesOut`` with ``expand=zones``.
+TRIP_LIST_MODEL = Union[List[TripOut], List[TripWithZonesOut]]
+
+
+# ``expand=zones`` embeds pickup/dropoff borough and zone names in each trip.
+EXPAND_PATTERN = "^zones$"
+
+
+# ``YYYY-MM`` query parameters of the month-grained insight tables.
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+# Minute buckets are read from ``trips``; bound the span they may cover.
+MAX_MINUTE_SPAN = timedelta(days=7)
+
+
+def _month_start(month: str | None) -> date | None:
+    return date.fromisoformat(f"{month}-01") if month else None
 
-api_router = APIRouter(prefix="/api")
+
+def _trip_page(
+    query,
+    offset: int,
+    limit: int,
+    accept: str | None,
+    session: Session,
+    expand: str | None = None,
+) -> Response:
+    """
+    Fetch one page of ``query`` and encode it directly.
+
+    Rows are selected as plain column tuples and written as JSON (same shape
+    as ``List[TripOut]``) or Arrow IPC, skipping ORM entities and per-row
+    model validation. Zone names for ``expand=zones`` come from the
+    dimension cache, not a join.
+    """
+    rows = query.with_entities(*TRIP_COLUMNS).offset(offset).limit(limit).all()
+    if expand == "zones":
+        rows = with_zones(rows, get_dimensions(session).locations)
+        if wants_arrow(accept):
+            return Response(
+                content=encode_arrow(rows, EXPANDED_TRIP_ARROW_SCHEMA),
+                media_type=ARROW_STREAM_MEDIA_TYPE,
+            )
+        return Response(
+            content=encode_json(rows, EXPANDED_TRIP_FIELDS), media_type="application/json"
+        )
+    if wants_arrow(accept):
+        return Response(content=encode_arrow(rows), media_type=ARROW_STREAM_MEDIA_TYPE)
+    return Response(content=encode_json(rows), media_type="application/json")
+
+
+def _with_total(response: Response, count: TripCount | None) -> Response:
+    """Add ``X-Total-Count`` (and whether it is an estimate) to a trip page."""
+    if count is not None:
+        response.headers["X-Total-Count"] = str(count.total)
+        response.headers["X-Total-Count-Approximate"] = "true" if count.approximate else "false"
+    return response
+
+
+def _summary_out(totals: dict) -> TripSummaryOut:
+    avg_duration_hours = totals["avg_trip_duration_hours"]
+    return TripSummaryOut(
+        total_trips=totals["total_trips"],
+        avg_trip_miles=totals["avg_trip_miles"],
+        avg_trip_duration_minutes=avg_duration_hours * 60
+        if avg_duration_hours is not None
+        else None,
+        avg_speed_mph=totals["avg_speed_mph"],
+        total_revenue=totals["total_revenue"],
+        total_driver_pay=totals["total_driver_pay"],
+    )
+
+
+def _approximation_out(estimates: dict, intervals: dict, model) -> ApproximationOut:
+    return ApproximationOut(
+        confidence_level=CONFIDENCE_LEVEL,
+        sample_size=estimates["sample_size"],
+        confidence_intervals={
+            key: interval for key, interval in intervals.items() if key in model.model_fields
+        },
+    )
+
+
+def _overview_out(totals: dict, dimensions: tuple[int, int]) -> InsightOverviewOut:
+    unique_vendors, unique_locations = dimensions
+    return InsightOverviewOut(
+        total_trips=totals["total_trips"],
+        unique_vendors=unique_vendors,
+        unique_locations=unique_locations,
+        avg_base_fare=totals["avg_base_fare"],
+        avg_extra_charges=totals["avg_extra_charges"],
+    )
+
+
+def _algorithm_performance(totals: dict) -> dict:
+    total_trips = totals["total_trips"]
+    outlier_trips = totals["outlier_trips"]
+    outlier_percentage = (outlier_trips / total_trips * 100) if total_trips > 0 else 0
+    return {
+        "algorithm_status": "Custom IQR Outlier Detection",
+        "total_trips_analyzed": total_trips,
+        "outliers_detected": outlier_trips,
+        "outlier_percentage": round(outlier_percentage, 2),
+        "fare_statistics": {
+            "min_fare": totals["min_fare"] or 0,
+            "max_fare": totals["max_fare"] or 0,
+            "avg_fare": totals["avg_base_fare"] or 0,
+            "total_with_fares": totals["fare_count"],
+        },
+        "algorithm_complexity": "O(n log n) - Manual QuickSort + IQR Detection",
+        "data_quality_score": max(0, 100 - outlier_percentage),
+    }
 
 
 @api_router.get("/vendors", response_model=List[VendorOut], tags=["Vendors"])
@@ -50,27 +242,28 @@ def get_vendor(
 
 
 @api_router.get(
-    "/vendors/{vendor_id}/trips", response_model=List[TripOut], tags=["Vendors"]
+    "/vendors/{vendor_id}/trips",
+    response_model=TRIP_LIST_MODEL,
+    responses=TRIP_LIST_RESPONSES,
+    tags=["Vendors"],
 )
 def get_vendor_trips(
     vendor_id: str,
     limit: int = Query(100, ge=1, le=1_000),
     offset: int = Query(0, ge=0),
-    session: Session = Depends(get_session),
+    expand: str | None = Query(None, pattern=EXPAND_PATTERN),
+    include_total: bool = Query(False),
+    accept: str | None = Header(None),
+    session: Session = Depends(get_listing_session),
 ) -> List[TripOut]:
-    vendor_exists = (
-        session.query(Vendor.vendor_id)
-        .filter(Vendor.vendor_id == vendor_id)
-        .first()
-    )
-    if vendor_exists is None:
+    if vendor_id not in get_dimensions(session).vendors:
         raise HTTPException(status_code=404, detail="Vendor not found")
 
     trips = session.query(Trip).filter(Trip.vendor_id == vendor_id).order_by(
         Trip.pickup_datetime.desc()
     )
-    trips = trips.offset(offset).limit(limit).all()
-    return trips
+    total = count_trips(session, TripFilters(vendor_id=vendor_id)) if include_total else None
+    return _with_total(_trip_page(trips, offset, limit, accept, session, expand), total)
 
 
 @api_router.get("/locations", response_model=List[LocationOut], tags=["Locations"])
@@ -105,21 +298,22 @@ def get_location(
 
 
 @api_router.get(
-    "/locations/{location_id}/trips", response_model=List[TripOut], tags=["Locations"]
+    "/locations/{location_id}/trips",
+    response_model=TRIP_LIST_MODEL,
+    responses=TRIP_LIST_RESPONSES,
+    tags=["Locations"],
 )
 def get_location_trips(
     location_id: int,
     role: str = Query("pickup", pattern="^(pickup|dropoff|both)$"),
     limit: int = Query(100, ge=1, le=1_000),
     offset: int = Query(0, ge=0),
-    session: Session = Depends(get_session),
+    expand: str | None = Query(None, pattern=EXPAND_PATTERN),
+    include_total: bool = Query(False),
+    accept: str | None = Header(None),
+    session: Session = Depends(get_listing_session),
 ) -> List[TripOut]:
-    location_exists = (
-        session.query(Location.location_id)
-        .filter(Location.location_id == location_id)
-        .first()
-    )
-    if location_exists is None:
+    if location_id not in get_dimensions(session).locations:
         raise HTTPException(status_code=404, detail="Location not found")
 
     query = session.query(Trip)
@@ -132,201 +326,359 @@ def get_location_trips(
             or_(Trip.pickup_id == location_id, Trip.dropoff_id == location_id)
         )
 
-    trips = query.order_by(Trip.pickup_datetime.desc()).offset(offset).limit(limit).all()
-    return trips
+    total = count_location_trips(session, location_id, role) if include_total else None
+    return _with_total(
+        _trip_page(
+            query.order_by(Trip.pickup_datetime.desc()), offset, limit, accept, session, expand
+        ),
+        total,
+    )
 
 
-@api_router.get("/trips/summary", response_model=TripSummaryOut, tags=["Trips"])
-def trip_summary(
+@api_router.get("/search", response_model=SearchResultsOut, tags=["Search"])
+def search_dimensions(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
     session: Session = Depends(get_session),
-) -> TripSummaryOut:
-    total_trips, avg_miles, avg_duration_hours, avg_speed, total_revenue, total_driver_pay = (
-        session.query(
-            func.count(Trip.trip_id),
-            func.avg(Trip.trip_miles),
-            func.avg(Trip.trip_duration_hours),
-            func.avg(Trip.average_speed_mph),
-            func.sum(Trip.base_passenger_fare),
-            func.sum(Trip.driver_pay),
-        )
-        .one()
+) -> SearchResultsOut:
+    """Vendors and zones matching ``q`` by word prefix or substring."""
+    dimensions = get_dimensions(session)
+    matches = dimensions.search_index.lookup(q)
+    return SearchResultsOut(
+        vendors=[dimensions.vendors[vendor_id] for vendor_id in matches.vendor_ids[:limit]],
+        locations=[
+            dimensions.locations[location_id] for location_id in matches.location_ids[:limit]
+        ],
     )
 
-    summary = TripSummaryOut(
-        total_trips=total_trips or 0,
-        avg_trip_miles=float(avg_miles) if avg_miles is not None else None,
-        avg_trip_duration_minutes=float(avg_duration_hours * 60)
-        if avg_duration_hours is not None
-        else None,
-        avg_speed_mph=float(avg_speed) if avg_speed is not None else None,
-        total_revenue=float(total_revenue) if total_revenue is not None else None,
-        total_driver_pay=float(total_driver_pay)
-        if total_driver_pay is not None
-        else None,
-    )
-    return summary
+
+@api_router.get(
+    "/trips/summary",
+    response_model=TripSummaryOut,
+    response_model_exclude_unset=True,
+    tags=["Trips"],
+)
+def trip_summary(
+    approx: bool = Query(False),
+    filters: TripFilters = Depends(trip_filters),
+    session: Session = Depends(get_analytics_session),
+) -> TripSummaryOut:
+    """
+    Trip count, averages and totals for the filtered trips.
+
+    With ``approx=true`` the figures are estimated from the stratified sample
+    and ``approximation`` carries 95% confidence intervals.
+    """
+    if approx and samples_available(session):
+        estimates = estimate_summary(session, filters)
+        intervals = dict(estimates["confidence_intervals"])
+        duration = intervals.pop("avg_trip_duration_hours", None)
+        if duration is not None:
+            intervals["avg_trip_duration_minutes"] = {
+                bound: value * 60 for bound, value in duration.items()
+            }
+        return _summary_out(estimates).model_copy(
+            update={"approximation": _approximation_out(estimates, intervals, TripSummaryOut)}
+        )
+    return _summary_out(summarize_trips(session, filters))
 
 
-@api_router.get("/trips", response_model=List[TripOut], tags=["Trips"])
+@api_router.get(
+    "/trips",
+    response_model=TRIP_LIST_MODEL,
+    responses=TRIP_LIST_RESPONSES,
+    tags=["Trips"],
+)
 def list_trips(
     limit: int = Query(100, ge=1, le=1_000),
     offset: int = Query(0, ge=0),
-    vendor_id: str | None = Query(None),
     search: str | None = Query(None),
-    start_date: str | None = Query(None),
-    end_date: str | None = Query(None),
-    sort_by: str | None = Query(None),
-    sort_order: str = Query("desc"),
-    session: Session = Depends(get_session),
+    sort_by: str | None = Query(None, pattern=TRIP_SORT_PATTERN),
+    sort_order: str = Query("desc", pattern="^(?i:asc|desc)$"),
+    expand: str | None = Query(None, pattern=EXPAND_PATTERN),
+    include_total: bool = Query(False),
+    accept: str | None = Header(None),
+    filters: TripFilters = Depends(trip_filters),
+    session: Session = Depends(get_listing_session),
 ) -> List[TripOut]:
-    query = session.query(Trip)
-    
+    """
+    One page of the filtered trips.
+
+    With ``include_total=true`` the response carries ``X-Total-Count``, from
+    the derived tables, a cache, or a count capped at ``API_TOTAL_COUNT_CAP``
+    (``X-Total-Count-Approximate: true`` when the total is an estimate).
+    ``sort_by`` takes the fields of ``TRIP_SORT_ORDERS`` only, each backed by
+    an index, so a page costs an index scan instead of a sort.
+    """
     # Apply filters
-    if vendor_id:
-        query = query.filter(Trip.vendor_id == vendor_id)
+    query = session.query(Trip).filter(*trip_filter_clauses(filters))
     
     if search:
-        # Search by trip_id or vendor_id
-        search_filters = [Trip.vendor_id.like(f"%{search}%")]
-        # Try to search by trip_id if search is numeric
-        try:
-            trip_id_val = int(search)
-            search_filters.append(Trip.trip_id == trip_id_val)
-        except ValueError:
-            pass
-        
-        query = query.filter(or_(*search_filters))
-    
-    if start_date:
-        query = query.filter(Trip.pickup_datetime >= start_date)
-    
-    if end_date:
-        query = query.filter(Trip.pickup_datetime <= end_date)
+        # Search by trip_id, vendor or pickup zone/borough
+        query = query.filter(trip_search_clause(session, search))
     
     # Apply sorting
-    if sort_by:
-        sort_column = getattr(Trip, sort_by, None)
-        if sort_column:
-            if sort_order.lower() == "asc":
-                query = query.order_by(sort_column.asc())
-            else:
-                query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(Trip.pickup_datetime.desc())
-    else:
-        query = query.order_by(Trip.pickup_datetime.desc())
-
-    trips = query.offset(offset).limit(limit).all()
-    return trips
-
-
-@api_router.get("/trips/{trip_id}", response_model=TripOut, tags=["Trips"])
+    query = query.order_by(*trip_order_by(sort_by, sort_order))
+
+    total = count_trips(session, filters, search or None) if include_total else None
+    return _with_total(_trip_page(query, offset, limit, accept, session, expand), total)
+
+
+@api_router.get("/trips/export", tags=["Trips"])
+def export_trips(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    search: str | None = Query(None),
+    batch_size: int = Query(5_000, ge=100, le=50_000),
+    filters: TripFilters = Depends(trip_filters),
+    session: Session = Depends(get_session),
+) -> StreamingResponse:
+    """Stream every matching trip as NDJSON or CSV in constant memory."""
+    statement = select(*TRIP_COLUMNS).where(*trip_filter_clauses(filters))
+    if search:
+        statement = statement.where(trip_search_clause(session, search))
+    statement = statement.order_by(Trip.trip_id)
+
+    media_type, filename = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        iter_export(stream_rows(statement, batch_size=batch_size), format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@api_router.get(
+    "/trips/{trip_id}",
+    response_model=Union[TripOut, TripWithZonesOut],
+    response_model_exclude_unset=True,
+    tags=["Trips"],
+)
 def get_trip(
     trip_id: int,
+    expand: str | None = Query(None, pattern=EXPAND_PATTERN),
     session: Session = Depends(get_session),
 ) -> TripOut:
     trip = session.query(Trip).filter(Trip.trip_id == trip_id).first()
     if trip is None:
         raise HTTPException(status_code=404, detail="Trip not found")
-    return trip
+    payload = TripOut.model_validate(trip)
+    if expand == "zones":
+        locations = get_dimensions(session).locations
+        pickup_borough, pickup_zone = zone_values(locations.get(trip.pickup_id))
+        dropoff_borough, dropoff_zone = zone_values(locations.get(trip.dropoff_id))
+        payload = TripWithZonesOut(
+            **payload.model_dump(exclude_unset=True),
+            pickup_borough=pickup_borough,
+            pickup_zone=pickup_zone,
+            dropoff_borough=dropoff_borough,
+            dropoff_zone=dropoff_zone,
+        )
+    return payload
 
 
 @api_router.get("/insights/overview", response_model=InsightOverviewOut, tags=["Insights"])
 def insights_overview(
-    session: Session = Depends(get_session),
+    filters: TripFilters = Depends(trip_filters),
+    session: Session = Depends(get_analytics_session),
 ) -> InsightOverviewOut:
-    total_trips, avg_base_fare, avg_extra = (
-        session.query(
-            func.count(Trip.trip_id),
-            func.avg(Trip.base_passenger_fare),
-            func.avg(Trip.total_extra_charges),
-        )
-        .one()
-    )
-
-    unique_vendors = session.query(func.count(func.distinct(Vendor.vendor_id))).scalar() or 0
-    unique_locations = session.query(func.count(func.distinct(Location.location_id))).scalar() or 0
-
-    return InsightOverviewOut(
-        total_trips=total_trips or 0,
-        unique_vendors=unique_vendors,
-        unique_locations=unique_locations,
-        avg_base_fare=float(avg_base_fare) if avg_base_fare is not None else None,
-        avg_extra_charges=float(avg_extra) if avg_extra is not None else None,
-    )
+    totals = summarize_trips(session, filters)
+    return _overview_out(totals, count_dimensions(session, filters))
 
 
 @api_router.get(
-    "/insights/top-vendors", response_model=List[VendorPerformanceOut], tags=["Insights"]
+    "/insights/top-vendors",
+    response_model=List[VendorPerformanceOut],
+    response_model_exclude_unset=True,
+    tags=["Insights"],
 )
 def insights_top_vendors(
     limit: int = Query(5, ge=1, le=50),
-    session: Session = Depends(get_session),
+    approx: bool = Query(False),
+    filters: TripFilters = Depends(trip_filters),
+    session: Session = Depends(get_analytics_session),
 ) -> List[VendorPerformanceOut]:
-    results = (
-        session.query(
-            Trip.vendor_id,
-            func.count(Trip.trip_id).label("trip_count"),
-            func.avg(Trip.base_passenger_fare).label("avg_base_fare"),
-            func.sum(Trip.base_passenger_fare).label("total_revenue"),
-        )
-        .group_by(Trip.vendor_id)
-        .order_by(func.count(Trip.trip_id).desc())
-        .limit(limit)
-        .all()
-    )
-
+    if approx and samples_available(session):
+        return [
+            VendorPerformanceOut(
+                vendor_id=row["vendor_id"],
+                trip_count=row["trip_count"],
+                avg_base_fare=row["avg_base_fare"],
+                total_revenue=row["total_revenue"],
+                approximation=_approximation_out(
+                    row, row["confidence_intervals"], VendorPerformanceOut
+                ),
+            )
+            for row in estimate_vendor_performance(session, filters, limit)
+        ]
     payload = [
-        VendorPerformanceOut(
-            vendor_id=row.vendor_id,
-            trip_count=row.trip_count or 0,
-            avg_base_fare=float(row.avg_base_fare) if row.avg_base_fare is not None else None,
-            total_revenue=float(row.total_revenue) if row.total_revenue is not None else None,
-        )
-        for row in results
+        VendorPerformanceOut(**row)
+        for row in vendor_performance(session, filters, limit)
     ]
     return payload
 
 
+@api_router.get(
+    "/insights/hourly-trips", response_model=HourlyTripCountsOut, tags=["Insights"]
+)
+def insights_hourly_trips(
+    filters: TripFilters = Depends(trip_filters),
+    session: Session = Depends(get_analytics_session),
+) -> HourlyTripCountsOut:
+    return HourlyTripCountsOut(**hourly_trip_counts(session, filters))
+
+
+@api_router.get(
+    "/insights/distance-fare", response_model=DistanceFareHistogramOut, tags=["Insights"]
+)
+def insights_distance_fare(
+    miles_bins: int = Query(20, ge=1, le=200),
+    fare_bins: int = Query(20, ge=1, le=200),
+    max_miles: float | None = Query(None, gt=0),
+    max_fare: float | None = Query(None, gt=0),
+    filters: TripFilters = Depends(trip_filters),
+    session: Session = Depends(get_analytics_session),
+) -> DistanceFareHistogramOut:
+    histogram = distance_fare_histogram(
+        session,
+        filters,
+        miles_bins=miles_bins,
+        fare_bins=fare_bins,
+        max_miles=max_miles,
+        max_fare=max_fare,
+    )
+    return DistanceFareHistogramOut(**histogram)
+
+
+@api_router.get("/insights/od-matrix", response_model=OdMatrixOut, tags=["Insights"])
+def insights_od_matrix(
+    limit: int = Query(50, ge=1, le=1_000),
+    level: str = Query("zone", pattern="^(zone|borough)$"),
+    vendor_id: str | None = Query(None),
+    hour: int | None = Query(None, ge=0, le=23),
+    month: str | None = Query(None, pattern=MONTH_PATTERN),
+    pickup_id: int | None = Query(None),
+    dropoff_id: int | None = Query(None),
+    session: Session = Depends(get_analytics_session),
+) -> OdMatrixOut:
+    """
+    Top pickup -> dropoff pairs by trip count, from the ETL's OD matrix.
+
+    ``pickup_id`` returns one zone's row (where its trips go), ``dropoff_id``
+    its column (where trips to it come from); ``level=borough`` rolls zones
+    up to boroughs.
+    """
+    matrix = od_matrix(
+        session,
+        level=level,
+        vendor_id=vendor_id,
+        hour_of_day=hour,
+        month=_month_start(month),
+        pickup_id=pickup_id,
+        dropoff_id=dropoff_id,
+        limit=limit,
+    )
+    return OdMatrixOut(**matrix)
+
+
+@api_router.get("/insights/distribution", response_model=DistributionOut, tags=["Insights"])
+def insights_distribution(
+    metric: str = Query(..., pattern="^(base_passenger_fare|trip_duration_hours|average_speed_mph)$"),
+    percentiles: List[float] = Query([50, 90, 95]),
+    vendor_id: str | None = Query(None),
+    pickup_id: int | None = Query(None),
+    start_month: str | None = Query(None, pattern=MONTH_PATTERN),
+    end_month: str | None = Query(None, pattern=MONTH_PATTERN),
+    session: Session = Depends(get_analytics_session),
+) -> DistributionOut:
+    """
+    Histogram and percentiles (e.g. p50/p90/p95) of a trip metric.
+
+    Merged from the ETL's per vendor, pickup zone and month histograms;
+    percentiles are accurate to within one log-spaced bin (about 12%).
+    """
+    if any(not 0 <= q <= 100 for q in percentiles):
+        raise HTTPException(status_code=422, detail="percentiles must be between 0 and 100")
+    distribution = metric_distribution(
+        session,
+        metric,
+        percentiles,
+        vendor_id=vendor_id,
+        pickup_id=pickup_id,
+        start_month=_month_start(start_month),
+        end_month=_month_start(end_month),
+    )
+    return DistributionOut(**distribution)
+
+
+@api_router.get("/insights/timeseries", response_model=TimeseriesOut, tags=["Insights"])
+def insights_timeseries(
+    bucket: str = Query("day", pattern="^(minute|hour|day|week)$"),
+    max_points: int = Query(500, ge=3, le=10_000),
+    downsample_by: str = Query("trip_count", pattern="^(trip_count|revenue|avg_fare|avg_speed_mph)$"),
+    filters: TripFilters = Depends(trip_filters),
+    session: Session = Depends(get_analytics_session),
+) -> TimeseriesOut:
+    """
+    Trips, revenue, mean fare and mean speed per minute, hour, day or week.
+
+    Hour and longer buckets come from ``trip_rollups`` when the filters fit
+    its grain. Series longer than ``max_points`` buckets are downsampled with
+    Largest-Triangle-Three-Buckets over ``downsample_by``; minute buckets need
+    ``start_date`` and ``end_date`` at most seven days apart.
+    """
+    if bucket == "minute" and (
+        filters.start is None or filters.end is None or filters.end - filters.start > MAX_MINUTE_SPAN
+    ):
+        raise HTTPException(
+            status_code=422,
+            detail="bucket=minute needs start_date and end_date at most 7 days apart",
+        )
+    return TimeseriesOut(
+        **trip_timeseries(session, filters, bucket, max_points=max_points, downsample_by=downsample_by)
+    )
+
+
 @api_router.get("/insights/algorithm-performance", tags=["Insights"])
-def algorithm_performance_stats(session: Session = Depends(get_session)):
+def algorithm_performance_stats(
+    filters: TripFilters = Depends(trip_filters),
+    session: Session = Depends(get_analytics_session),
+):
     """Returns custom algorithm performance statistics"""
-    from sqlalchemy import func
-    
-    # Get total trips
-    total_trips = session.query(func.count(Trip.trip_id)).scalar() or 0
-    
-    # Count outliers (if is_fare_outlier column exists)
-    try:
-        outlier_trips = session.query(func.count(Trip.trip_id)).filter(
-            Trip.is_fare_outlier == True
-        ).scalar() or 0
-    except:
-        # Column doesn't exist yet - algorithm hasn't been run
-        outlier_trips = 0
-    
-    # Get fare statistics for algorithm validation
-    fare_stats = session.query(
-        func.min(Trip.base_passenger_fare).label('min_fare'),
-        func.max(Trip.base_passenger_fare).label('max_fare'),
-        func.avg(Trip.base_passenger_fare).label('avg_fare'),
-        func.count(Trip.base_passenger_fare).label('fare_count')
-    ).first()
-    
-    return {
-        "algorithm_status": "Custom IQR Outlier Detection",
-        "total_trips_analyzed": total_trips,
-        "outliers_detected": outlier_trips,
-        "outlier_percentage": round((outlier_trips / total_trips * 100), 2) if total_trips > 0 else 0,
-        "fare_statistics": {
-            "min_fare": float(fare_stats.min_fare) if fare_stats.min_fare else 0,
-            "max_fare": float(fare_stats.max_fare) if fare_stats.max_fare else 0,
-            "avg_fare": float(fare_stats.avg_fare) if fare_stats.avg_fare else 0,
-            "total_with_fares": fare_stats.fare_count or 0
+    return _algorithm_performance(summarize_trips(session, filters))
+
+
+@api_router.get(
+    "/dashboard",
+    response_model=DashboardOut,
+    response_model_exclude_unset=True,
+    tags=["Insights"],
+)
+def dashboard(
+    vendor_limit: int = Query(10, ge=1, le=50),
+    filters: TripFilters = Depends(trip_filters),
+    _: None = Depends(admit_analytic_query),
+) -> DashboardOut:
+    """
+    Overview, trip summary, top vendors and algorithm statistics in one call.
+
+    The four views share a single aggregate scan; it runs concurrently with
+    the dimension counts and the vendor ranking on separate pooled sessions.
+    The whole bundle takes a single analytic admission slot.
+    """
+    results = run_concurrently(
+        {
+            "totals": lambda session: summarize_trips(session, filters),
+            "dimensions": lambda session: count_dimensions(session, filters),
+            "vendors": lambda session: vendor_performance(session, filters, vendor_limit),
         },
-        "algorithm_complexity": "O(n log n) - Manual QuickSort + IQR Detection",
-        "data_quality_score": max(0, 100 - ((outlier_trips / total_trips * 100) if total_trips > 0 else 0))
-    }
+        timeout_seconds=ANALYTICS_TIMEOUT_SECONDS,
+    )
+    totals = results["totals"]
+    return DashboardOut(
+        overview=_overview_out(totals, results["dimensions"]),
+        summary=_summary_out(totals),
+        top_vendors=[VendorPerformanceOut(**row) for row in results["vendors"]],
+        algorithm_performance=_algorithm_performance(totals),
+    )
 
 
 _all_ = ["api_router"]
\ No newline at end of file
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -22,6 +22,11 @@ class LocationOut(BaseModel):
     service_zone: Optional[str] = None
 
 
+class SearchResultsOut(BaseModel):
+    vendors: List[VendorOut]
+    locations: List[LocationOut]
+
+
 class TripOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -42,6 +47,28 @@ class TripOut(BaseModel):
     total_extra_charges: Optional[float] = None
 
 
+class TripWithZonesOut(TripOut):
+    """A trip requested with ``expand=zones``: pickup/dropoff borough and zone names."""
+
+    pickup_borough: Optional[str] = None
+    pickup_zone: Optional[str] = None
+    dropoff_borough: Optional[str] = None
+    dropoff_zone: Optional[str] = None
+
+
+class ConfidenceIntervalOut(BaseModel):
+    lower: float
+    upper: float
+
+
+class ApproximationOut(BaseModel):
+    """Present on ``approx=true`` answers estimated from ``trip_samples``."""
+
+    confidence_level: float
+    sample_size: int
+    confidence_intervals: Dict[str, ConfidenceIntervalOut]
+
+
 class TripSummaryOut(BaseModel):
     total_trips: int
     avg_trip_miles: Optional[float] = None
@@ -49,6 +76,7 @@ class TripSummaryOut(BaseModel):
     avg_speed_mph: Optional[float] = None
     total_revenue: Optional[float] = None
     total_driver_pay: Optional[float] = None
+    approximation: Optional[ApproximationOut] = None
 
 
 class InsightOverviewOut(BaseModel):
@@ -63,4 +91,76 @@ class VendorPerformanceOut(BaseModel):
     vendor_id: str
     trip_count: int
     avg_base_fare: Optional[float] = None
-    total_revenue: Optional[float] = None
\ No newline at end of file
+    total_revenue: Optional[float] = None
+    approximation: Optional[ApproximationOut] = None
+
+
+class HourlyTripCountsOut(BaseModel):
+    total_trips: int
+    by_hour: List[int]
+    by_weekday: List[int]
+    by_weekday_hour: List[List[int]]
+
+
+class DistanceFareBinOut(BaseModel):
+    miles_bin: int
+    fare_bin: int
+    count: int
+
+
+class DistanceFareHistogramOut(BaseModel):
+    miles_edges: List[float]
+    fare_edges: List[float]
+    bins: List[DistanceFareBinOut]
+    total_trips: int
+    out_of_range_trips: int
+
+
+class OdPairOut(BaseModel):
+    pickup_id: Optional[int] = None
+    dropoff_id: Optional[int] = None
+    pickup_borough: Optional[str] = None
+    pickup_zone: Optional[str] = None
+    dropoff_borough: Optional[str] = None
+    dropoff_zone: Optional[str] = None
+    trip_count: int
+    avg_base_fare: Optional[float] = None
+    avg_trip_duration_hours: Optional[float] = None
+    avg_speed_mph: Optional[float] = None
+
+
+class OdMatrixOut(BaseModel):
+    level: str
+    total_trips: int
+    total_pairs: int
+    pairs: List[OdPairOut]
+
+
+class DistributionOut(BaseModel):
+    metric: str
+    total_trips: int
+    edges: List[float]
+    counts: List[int]
+    percentiles: Dict[str, Optional[float]]
+
+
+class TimeseriesPointOut(BaseModel):
+    bucket_start: datetime
+    trip_count: int
+    revenue: Optional[float] = None
+    avg_fare: Optional[float] = None
+    avg_speed_mph: Optional[float] = None
+
+
+class TimeseriesOut(BaseModel):
+    bucket: str
+    total_buckets: int
+    downsampled: bool
+    points: List[TimeseriesPointOut]
+
+
+class DashboardOut(BaseModel):
+    overview: InsightOverviewOut
+    summary: TripSummaryOut
+    top_vendors: List[VendorPerformanceOut]
+    algorithm_performance: Dict[str, Any]
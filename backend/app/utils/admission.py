@@ -0,0 +1,65 @@
+"""Admission control for the expensive analytic endpoints."""
+
+from __future__ import annotations
+
+import threading
+from typing import Generator
+
+from fastapi import HTTPException
+
+from backend.app.db.config import ANALYTICS_CONCURRENCY, ANALYTICS_RETRY_AFTER_SECONDS
+
+
+class AdmissionLimiter:
+    """
+    Admit at most ``limit`` concurrent holders and refuse the rest at once.
+
+    Refusing instead of queueing keeps a burst of heavy requests from
+    occupying every worker thread and pooled connection while they wait.
+    """
+
+    def __init__(self, limit: int, retry_after_seconds: int) -> None:
+        self.limit = limit
+        self.retry_after_seconds = retry_after_seconds
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self._active = 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def try_acquire(self) -> bool:
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._active += 1
+        return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
+
+    def admit(self) -> Generator[None, None, None]:
+        """FastAPI dependency: hold a slot for the request or answer 503."""
+        if not self.try_acquire():
+            raise HTTPException(
+                status_code=503,
+                detail="Too many analytic queries in progress; retry shortly",
+                headers={"Retry-After": str(self.retry_after_seconds)},
+            )
+        try:
+            yield
+        finally:
+            self.release()
+
+
+analytics_limiter = AdmissionLimiter(ANALYTICS_CONCURRENCY, ANALYTICS_RETRY_AFTER_SECONDS)
+
+
+def admit_analytic_query() -> Generator[None, None, None]:
+    yield from analytics_limiter.admit()
+
+
+__all__ = ["AdmissionLimiter", "analytics_limiter", "admit_analytic_query"]
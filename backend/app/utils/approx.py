@@ -0,0 +1,234 @@
+"""Approximate trip aggregates estimated from the ETL's stratified sample."""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from backend.app.db.timeouts import rollback
+from backend.app.models import TripSample, TripSampleStratum
+from backend.app.utils.queries import TripFilters, derived_table_complete, trip_filter_clauses
+
+
+# Two-sided normal quantile for the reported confidence intervals.
+CONFIDENCE_LEVEL = 0.95
+_Z = 1.959963984540054
+
+SUMMARY_METRICS = (
+    "trip_miles",
+    "trip_duration_hours",
+    "average_speed_mph",
+    "base_passenger_fare",
+    "driver_pay",
+)
+
+
+@dataclass
+class _Stratum:
+    """Sums over the sampled rows of one stratum that fall in the filter."""
+
+    vendor_id: str
+    population: int
+    sampled: int
+    rows: int = 0
+    weighted_rows: float = 0.0
+    # metric -> (non-null count, sum, sum of squares, weighted sum, weighted count)
+    metrics: Dict[str, Tuple[float, float, float, float, float]] = field(default_factory=dict)
+
+    @property
+    def expansion(self) -> float:
+        # N^2 (1 - n/N) / n: the factor in front of the stratum variance.
+        if self.sampled < 2 or self.sampled >= self.population:
+            return 0.0
+        return self.population ** 2 * (1 - self.sampled / self.population) / self.sampled
+
+    def variance(self, total: float, squares: float) -> float:
+        """Sample variance of a variable that is 0 outside the filter."""
+        if self.sampled < 2:
+            return 0.0
+        return max(0.0, (squares - total * total / self.sampled) / (self.sampled - 1))
+
+
+def samples_available(session: Session) -> bool:
+    """True when ``trip_samples`` is populated and drawn from every trip."""
+    try:
+        return (
+            derived_table_complete(session, "trip_samples")
+            and session.query(TripSampleStratum.stratum_id).first() is not None
+        )
+    except SQLAlchemyError:
+        # Databases loaded before samples existed have no such table.
+        rollback(session)
+        return False
+
+
+def _interval(value: float, variance: float) -> Dict[str, float]:
+    margin = _Z * math.sqrt(variance)
+    return {"lower": value - margin, "upper": value + margin}
+
+
+def _load_strata(session: Session, filters: TripFilters, metrics: Iterable[str]) -> List[_Stratum]:
+    metrics = tuple(metrics)
+    sizes = {
+        (vendor_id, month): (int(population or 0), int(sampled or 0))
+        for vendor_id, month, population, sampled in session.query(
+            TripSampleStratum.vendor_id,
+            TripSampleStratum.sample_month,
+            func.sum(TripSampleStratum.population_count),
+            func.sum(TripSampleStratum.sample_count),
+        ).group_by(TripSampleStratum.vendor_id, TripSampleStratum.sample_month)
+    }
+
+    columns = [
+        TripSample.vendor_id,
+        TripSample.sample_month,
+        func.count(),
+        func.sum(TripSample.weight),
+    ]
+    for name in metrics:
+        value = getattr(TripSample, name)
+        columns += [
+            func.count(value),
+            func.sum(value),
+            func.sum(value * value),
+            func.sum(TripSample.weight * value),
+            func.sum(case((value.isnot(None), TripSample.weight), else_=0)),
+        ]
+    rows = (
+        session.query(*columns)
+        .filter(*trip_filter_clauses(filters, TripSample))
+        .group_by(TripSample.vendor_id, TripSample.sample_month)
+        .all()
+    )
+
+    strata = []
+    for row in rows:
+        population, sampled = sizes.get((row[0], row[1]), (0, 0))
+        stratum = _Stratum(
+            vendor_id=row[0],
+            population=population,
+            sampled=sampled,
+            rows=int(row[2] or 0),
+            weighted_rows=float(row[3] or 0),
+        )
+        for index, name in enumerate(metrics):
+            sums = row[4 + 5 * index: 9 + 5 * index]
+            stratum.metrics[name] = tuple(float(value or 0) for value in sums)
+        strata.append(stratum)
+    return strata
+
+
+def _count(strata: List[_Stratum]) -> Tuple[float, Dict[str, float]]:
+    estimate = sum(stratum.weighted_rows for stratum in strata)
+    variance = sum(
+        stratum.expansion * stratum.variance(stratum.rows, stratum.rows) for stratum in strata
+    )
+    interval = _interval(estimate, variance)
+    interval["lower"] = max(0.0, interval["lower"])
+    return estimate, interval
+
+
+def _total(strata: List[_Stratum], metric: str) -> Tuple[float | None, Dict[str, float] | None]:
+    if not any(stratum.metrics[metric][0] for stratum in strata):
+        return None, None
+    estimate = sum(stratum.metrics[metric][3] for stratum in strata)
+    variance = 0.0
+    for stratum in strata:
+        _, total, squares, _, _ = stratum.metrics[metric]
+        variance += stratum.expansion * stratum.variance(total, squares)
+    return estimate, _interval(estimate, variance)
+
+
+def _mean(strata: List[_Stratum], metric: str) -> Tuple[float | None, Dict[str, float] | None]:
+    """Ratio estimate of the mean, with a linearized (Taylor) variance."""
+    weighted_count = sum(stratum.metrics[metric][4] for stratum in strata)
+    if not weighted_count:
+        return None, None
+    estimate = sum(stratum.metrics[metric][3] for stratum in strata) / weighted_count
+    variance = 0.0
+    for stratum in strata:
+        count, total, squares, _, _ = stratum.metrics[metric]
+        # Residuals d = y - R * 1[y not null]; their sum and sum of squares.
+        residual = total - estimate * count
+        residual_squares = squares - 2 * estimate * total + estimate * estimate * count
+        variance += stratum.expansion * stratum.variance(residual, residual_squares)
+    return estimate, _interval(estimate, variance / weighted_count ** 2)
+
+
+def estimate_summary(session: Session, filters: TripFilters) -> Dict[str, Any]:
+    """
+    Estimate the ``summarize_trips`` count, averages and totals from the sample.
+
+    Returns the same keys as ``summarize_trips`` for the estimated values,
+    plus ``confidence_intervals`` (key -> lower/upper) and ``sample_size``.
+    """
+    strata = _load_strata(session, filters, SUMMARY_METRICS)
+    total_trips, trips_interval = _count(strata)
+    estimates: Dict[str, Any] = {"total_trips": int(round(total_trips))}
+    intervals: Dict[str, Dict[str, float]] = {"total_trips": trips_interval}
+
+    for key, metric in (
+        ("avg_trip_miles", "trip_miles"),
+        ("avg_trip_duration_hours", "trip_duration_hours"),
+        ("avg_speed_mph", "average_speed_mph"),
+        ("avg_base_fare", "base_passenger_fare"),
+    ):
+        estimates[key], intervals[key] = _mean(strata, metric)
+    for key, metric in (
+        ("total_revenue", "base_passenger_fare"),
+        ("total_driver_pay", "driver_pay"),
+    ):
+        estimates[key], intervals[key] = _total(strata, metric)
+
+    estimates["confidence_intervals"] = {
+        key: interval for key, interval in intervals.items() if interval is not None
+    }
+    estimates["sample_size"] = sum(stratum.rows for stratum in strata)
+    return estimates
+
+
+def estimate_vendor_performance(
+    session: Session, filters: TripFilters, limit: int
+) -> List[Dict[str, Any]]:
+    """Sample-based ``vendor_performance``: estimated counts and fares per vendor."""
+    by_vendor: Dict[str, List[_Stratum]] = {}
+    for stratum in _load_strata(session, filters, ("base_passenger_fare",)):
+        by_vendor.setdefault(stratum.vendor_id, []).append(stratum)
+
+    results = []
+    for vendor_id, strata in by_vendor.items():
+        trip_count, count_interval = _count(strata)
+        avg_fare, fare_interval = _mean(strata, "base_passenger_fare")
+        revenue, revenue_interval = _total(strata, "base_passenger_fare")
+        intervals = {
+            "trip_count": count_interval,
+            "avg_base_fare": fare_interval,
+            "total_revenue": revenue_interval,
+        }
+        results.append(
+            {
+                "vendor_id": vendor_id,
+                "trip_count": int(round(trip_count)),
+                "avg_base_fare": avg_fare,
+                "total_revenue": revenue,
+                "confidence_intervals": {
+                    key: interval for key, interval in intervals.items() if interval is not None
+                },
+                "sample_size": sum(stratum.rows for stratum in strata),
+            }
+        )
+    results.sort(key=lambda item: (-item["trip_count"], item["vendor_id"]))
+    return results[:limit]
+
+
+__all__ = [
+    "CONFIDENCE_LEVEL",
+    "estimate_summary",
+    "estimate_vendor_performance",
+    "samples_available",
+]
@@ -0,0 +1,71 @@
+"""Route class serving aggregate GET responses from the host-wide shared cache."""
+
+from __future__ import annotations
+
+from typing import Callable, Coroutine, FrozenSet
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from backend.app.db.config import SessionLocal
+from backend.app.utils.dimensions import get_dimensions
+from backend.app.utils.metrics import SHARED_CACHE_LOOKUPS
+from backend.app.utils.shared_cache import shared_cache
+
+
+def _current_generation() -> int:
+    # Re-checked against the database at most every GENERATION_CHECK_SECONDS.
+    with SessionLocal() as session:
+        return get_dimensions(session).generation
+
+
+def cache_key(request: Request) -> str:
+    """Path plus query parameters sorted by name (repeated values keep their order)."""
+    params = sorted(request.query_params.multi_items(), key=lambda item: item[0])
+    return f"{request.url.path}?{urlencode(params)}"
+
+
+class SharedCacheRoute(APIRoute):
+    """
+    ``APIRoute`` whose JSON responses are shared between workers when cached.
+
+    Only paths listed in ``cached_paths`` are cached, and only successful GET
+    responses. A hit is answered before dependencies run, so it takes neither
+    an analytic admission slot nor a database connection. Entries belong to
+    the ETL generation they were computed from and go away with it.
+    """
+
+    cached_paths: FrozenSet[str] = frozenset()
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        handler = super().get_route_handler()
+        if shared_cache is None or self.path not in self.cached_paths:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method != "GET":
+                return await handler(request)
+            generation = await run_in_threadpool(_current_generation)
+            key = cache_key(request)
+            payload = shared_cache.get(generation, key)
+            if payload is not None:
+                SHARED_CACHE_LOOKUPS.inc(self.path, "hit")
+                return Response(
+                    content=payload,
+                    media_type="application/json",
+                    headers={"X-Cache": "hit"},
+                )
+            SHARED_CACHE_LOOKUPS.inc(self.path, "miss")
+            response = await handler(request)
+            body = getattr(response, "body", None)
+            if response.status_code == 200 and body is not None:
+                await run_in_threadpool(shared_cache.put, generation, key, bytes(body))
+            response.headers["X-Cache"] = "miss"
+            return response
+
+        return cached_handler
+
+
+__all__ = ["SharedCacheRoute", "cache_key"]
@@ -0,0 +1,237 @@
+"""
+Total counts for paginated trip listings, without a full ``COUNT(*)``.
+
+In order of preference a total comes from
+
+1. the derived tables: ``SUM(trip_count)`` over ``trip_rollups`` when the
+   filter fits the rollup grain, or over ``od_matrix`` for undated dropoff
+   filters. Exact, and a few thousand rows at most;
+2. a count of at most ``API_TOTAL_COUNT_CAP + 1`` matching trips. Exact
+   when it stays under the cap;
+3. past the cap, an estimate flagged approximate: the rollups with the
+   date bounds widened to whole hours, else the query planner's row
+   estimate (PostgreSQL, MySQL), never less than the capped count.
+
+Results are cached per ETL generation and filter signature, in the process
+and, with ``API_SHARED_CACHE_DIR`` set, across workers.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import timedelta
+from typing import Any, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from backend.app.db.config import TOTAL_COUNT_CAP
+from backend.app.db.timeouts import rollback
+from backend.app.models import OdMatrixCell, Trip, TripRollup
+from backend.app.utils.dimensions import get_dimensions
+from backend.app.utils.queries import (
+    TripFilters,
+    derived_table_complete,
+    rollup_filter_clauses,
+    rollups_available,
+    trip_filter_clauses,
+    trip_search_clause,
+)
+from backend.app.utils.shared_cache import shared_cache
+
+
+# Filter signatures remembered per process.
+COUNT_CACHE_SIZE = 4_096
+
+
+@dataclass(frozen=True)
+class TripCount:
+    total: int
+    approximate: bool
+    source: str  # "rollups", "od_matrix", "count", "estimate" or "combined"
+
+
+def _od_matrix_clauses(session: Session, filters: TripFilters) -> List[Any] | None:
+    """``od_matrix`` answers dropoff filters, but only without date bounds."""
+    if filters.start is not None or filters.end is not None:
+        return None
+    try:
+        if (
+            not derived_table_complete(session, "od_matrix")
+            or session.query(OdMatrixCell.cell_id).first() is None
+        ):
+            return None
+    except SQLAlchemyError:
+        rollback(session)
+        return None
+    return trip_filter_clauses(
+        TripFilters(filters.vendor_id, filters.pickup_id, filters.dropoff_id), OdMatrixCell
+    )
+
+
+def _derived_count(session: Session, filters: TripFilters) -> TripCount | None:
+    clauses = rollup_filter_clauses(filters)
+    if clauses is not None and rollups_available(session):
+        total = session.query(func.sum(TripRollup.trip_count)).filter(*clauses).scalar()
+        return TripCount(int(total or 0), False, "rollups")
+    clauses = _od_matrix_clauses(session, filters)
+    if clauses is not None:
+        total = session.query(func.sum(OdMatrixCell.trip_count)).filter(*clauses).scalar()
+        return TripCount(int(total or 0), False, "od_matrix")
+    return None
+
+
+def _widened_rollup_estimate(session: Session, filters: TripFilters) -> Optional[int]:
+    """Rollup total with the date bounds widened to the enclosing hours."""
+    if filters.dropoff_id is not None:
+        return None
+    start = filters.start.replace(minute=0, second=0, microsecond=0) if filters.start else None
+    end = filters.end
+    if end is not None and not (filters.end_exclusive and end == end.replace(minute=0, second=0, microsecond=0)):
+        end = end.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    widened = _derived_count(session, replace(filters, start=start, end=end, end_exclusive=True))
+    return widened.total if widened is not None else None
+
+
+def _planner_estimate(session: Session, statement: Any) -> Optional[int]:
+    """Rows the planner expects ``statement`` to return; None where unavailable."""
+    dialect = session.get_bind().dialect
+    compiled = statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    connection = session.connection()
+    try:
+        if dialect.name == "postgresql":
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+            return int(plan[0]["Plan"]["Plan Rows"])
+        if dialect.name in ("mysql", "mariadb"):
+            row = connection.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).mappings().first()
+            if row is None or row.get("rows") is None:
+                return None
+            return int(row["rows"] * float(row.get("filtered") or 100) / 100)
+    except (SQLAlchemyError, LookupError, TypeError, ValueError):
+        rollback(session)
+    return None
+
+
+def _scanned_count(session: Session, filters: TripFilters, search: str | None, cap: int) -> TripCount:
+    clauses = trip_filter_clauses(filters)
+    if search:
+        clauses.append(trip_search_clause(session, search))
+    matching = select(Trip.trip_id).where(*clauses)
+    counted = session.execute(
+        select(func.count()).select_from(matching.limit(cap + 1).subquery())
+    ).scalar_one()
+    if counted <= cap:
+        return TripCount(counted, False, "count")
+    estimate = None if search else _widened_rollup_estimate(session, filters)
+    if estimate is None:
+        estimate = _planner_estimate(session, matching)
+    # Planner estimates can undershoot; the capped count is a firm lower bound.
+    return TripCount(max(estimate or 0, counted), True, "estimate")
+
+
+class TripCountCache:
+    """Least recently used ``TripCount`` entries keyed by (generation, signature)."""
+
+    def __init__(self, size: int = COUNT_CACHE_SIZE) -> None:
+        self._size = size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[int, str], TripCount]" = OrderedDict()
+
+    def get(self, generation: int, signature: str) -> TripCount | None:
+        with self._lock:
+            count = self._entries.get((generation, signature))
+            if count is not None:
+                self._entries.move_to_end((generation, signature))
+            return count
+
+    def put(self, generation: int, signature: str, count: TripCount) -> None:
+        with self._lock:
+            self._entries[(generation, signature)] = count
+            self._entries.move_to_end((generation, signature))
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = TripCountCache()
+
+
+def _signature(filters: TripFilters, search: str | None) -> str:
+    return "count:" + orjson.dumps(
+        [
+            filters.vendor_id,
+            filters.pickup_id,
+            filters.dropoff_id,
+            filters.start.isoformat() if filters.start else None,
+            filters.end.isoformat() if filters.end else None,
+            filters.end_exclusive,
+            search,
+        ]
+    ).decode("utf-8")
+
+
+def count_trips(
+    session: Session,
+    filters: TripFilters,
+    search: str | None = None,
+    cap: int = TOTAL_COUNT_CAP,
+) -> TripCount:
+    """Total of the trips a listing with ``filters`` (and ``search``) pages through."""
+    generation = get_dimensions(session).generation
+    signature = _signature(filters, search)
+    count = count_cache.get(generation, signature)
+    if count is not None:
+        return count
+    if shared_cache is not None:
+        payload = shared_cache.get(generation, signature)
+        if payload is not None:
+            count = TripCount(**orjson.loads(payload))
+            count_cache.put(generation, signature, count)
+            return count
+
+    count = None if search else _derived_count(session, filters)
+    if count is None:
+        count = _scanned_count(session, filters, search, cap)
+
+    count_cache.put(generation, signature, count)
+    if shared_cache is not None:
+        shared_cache.put(
+            generation,
+            signature,
+            orjson.dumps({"total": count.total, "approximate": count.approximate, "source": count.source}),
+        )
+    return count
+
+
+def count_location_trips(session: Session, location_id: int, role: str) -> TripCount:
+    """Total for ``/locations/{id}/trips``; ``both`` counts round trips once."""
+    if role == "pickup":
+        return count_trips(session, TripFilters(pickup_id=location_id))
+    if role == "dropoff":
+        return count_trips(session, TripFilters(dropoff_id=location_id))
+    pickups = count_trips(session, TripFilters(pickup_id=location_id))
+    dropoffs = count_trips(session, TripFilters(dropoff_id=location_id))
+    round_trips = count_trips(session, TripFilters(pickup_id=location_id, dropoff_id=location_id))
+    approximate = pickups.approximate or dropoffs.approximate or round_trips.approximate
+    return TripCount(
+        max(0, pickups.total + dropoffs.total - round_trips.total),
+        approximate,
+        "combined",
+    )
+
+
+__all__ = [
+    "COUNT_CACHE_SIZE",
+    "TripCount",
+    "TripCountCache",
+    "count_cache",
+    "count_location_trips",
+    "count_trips",
+]
@@ -204,6 +204,52 @@ def find_top_k_trips_by_duration(trips: List[Dict], k: int = 10) -> List[Dict]:
     return result[::-1]
 
 
+def largest_triangle_three_buckets(points: List[Tuple[float, float]], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets downsampling of an x-sorted series.
+    Returns the indices of the ``threshold`` points to keep (at least 3).
+
+    Pseudo-code:
+    1. Keep the first and last point
+    2. Split the points in between into threshold - 2 buckets
+    3. From each bucket keep the point forming the largest triangle with the
+       point kept before it and the average point of the next bucket
+
+    Time: O(n), Space: O(threshold)
+    """
+    n = len(points)
+    if threshold < 3:
+        raise ValueError("threshold must be at least 3")
+    if n <= threshold:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(x for x, _ in points[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y for _, y in points[avg_start:avg_end]) / (avg_end - avg_start)
+
+        ax, ay = points[a]
+        max_area = -1.0
+        next_a = int(i * every) + 1
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                next_a = j
+
+        selected.append(next_a)
+        a = next_a
+
+    selected.append(n - 1)
+    return selected
+
+
 if __name__ == "__main__":
     print("=" * 60)
     print("Testing Custom Algorithms")
@@ -0,0 +1,150 @@
+"""In-process cache of the vendor and location dimension tables.
+
+With ``API_SHARED_CACHE_DIR`` set, each generation's tables are read from the
+database once per host and every worker builds its snapshot from the shared
+copy.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import orjson
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from backend.app.db.timeouts import rollback
+from backend.app.models import EtlRun, Location, Vendor
+from backend.app.schemas import LocationOut, VendorOut
+from backend.app.utils.search import SearchIndex
+from backend.app.utils.shared_cache import shared_cache
+
+
+# How often a process asks the database whether the ETL has loaded new data.
+GENERATION_CHECK_SECONDS = 30
+
+# Shared cache key of the serialized vendor and location tables.
+SHARED_DIMENSIONS_KEY = "dimensions"
+
+
+def current_generation(session: Session) -> int:
+    """Latest ETL run id, or 0 for databases loaded before runs were recorded."""
+    try:
+        return session.query(func.max(EtlRun.run_id)).scalar() or 0
+    except SQLAlchemyError:
+        rollback(session)
+        return 0
+
+
+@dataclass(frozen=True)
+class Dimensions:
+    generation: int
+    vendors: Dict[str, VendorOut]
+    locations: Dict[int, LocationOut]
+    search_index: SearchIndex
+
+
+def _query_tables(session: Session) -> tuple[list[VendorOut], list[LocationOut]]:
+    vendors = [
+        VendorOut.model_validate(vendor)
+        for vendor in session.query(Vendor).order_by(Vendor.vendor_id)
+    ]
+    locations = [
+        LocationOut.model_validate(location)
+        for location in session.query(Location).order_by(Location.location_id)
+    ]
+    return vendors, locations
+
+
+def _shared_tables(session: Session, generation: int) -> tuple[list[VendorOut], list[LocationOut]]:
+    def build() -> bytes:
+        vendors, locations = _query_tables(session)
+        return orjson.dumps(
+            {
+                "vendors": [vendor.model_dump() for vendor in vendors],
+                "locations": [location.model_dump() for location in locations],
+            }
+        )
+
+    tables = orjson.loads(shared_cache.refresh(generation, SHARED_DIMENSIONS_KEY, build))
+    return (
+        [VendorOut(**vendor) for vendor in tables["vendors"]],
+        [LocationOut(**location) for location in tables["locations"]],
+    )
+
+
+def load_dimensions(session: Session) -> Dimensions:
+    generation = current_generation(session)
+    if shared_cache is not None:
+        vendor_rows, location_rows = _shared_tables(session, generation)
+    else:
+        vendor_rows, location_rows = _query_tables(session)
+    vendors = {vendor.vendor_id: vendor for vendor in vendor_rows}
+    locations = {location.location_id: location for location in location_rows}
+    search_index = SearchIndex(
+        ((vendor.vendor_id, vendor.vendor_name) for vendor in vendors.values()),
+        ((loc.location_id, loc.zone, loc.borough) for loc in locations.values()),
+    )
+    return Dimensions(generation, vendors, locations, search_index)
+
+
+class DimensionCache:
+    """
+    Holds one immutable ``Dimensions`` snapshot per process.
+
+    Loaded at startup, and swapped for a fresh snapshot when the ETL data
+    generation changes (checked at most every ``check_seconds``).
+    """
+
+    def __init__(self, check_seconds: float = GENERATION_CHECK_SECONDS) -> None:
+        self._check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._dimensions: Optional[Dimensions] = None
+        self._checked_at = 0.0
+
+    def load(self, session: Session) -> Dimensions:
+        dimensions = load_dimensions(session)
+        with self._lock:
+            self._dimensions = dimensions
+            self._checked_at = time.monotonic()
+        return dimensions
+
+    def get(self, session: Session) -> Dimensions:
+        dimensions = self._dimensions
+        if dimensions is None:
+            return self.load(session)
+        if time.monotonic() - self._checked_at < self._check_seconds:
+            return dimensions
+
+        with self._lock:
+            if time.monotonic() - self._checked_at < self._check_seconds:
+                return self._dimensions
+            self._checked_at = time.monotonic()
+        if current_generation(session) != dimensions.generation:
+            return self.load(session)
+        return dimensions
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dimensions = None
+
+
+dimension_cache = DimensionCache()
+
+
+def get_dimensions(session: Session) -> Dimensions:
+    return dimension_cache.get(session)
+
+
+__all__ = [
+    "Dimensions",
+    "DimensionCache",
+    "current_generation",
+    "dimension_cache",
+    "get_dimensions",
+    "load_dimensions",
+]
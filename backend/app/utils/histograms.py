@@ -0,0 +1,84 @@
+"""Log-spaced histogram bins shared by the ETL and the distribution endpoint.
+
+The ETL counts trips per bin with ``bin_index``; the API merges those counts
+and reads percentiles back with ``percentile``. Both sides must use the same
+``BinScheme`` per metric, so it lives here rather than in either of them.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class BinScheme:
+    """
+    ``bins`` log-spaced bins between ``low`` and ``high``, plus two catch-alls.
+
+    Bin 0 holds values below ``low`` (including zero and negatives), bins
+    1..``bins`` are log-spaced, and bin ``bins + 1`` holds values of at least
+    ``high``. Every log bin spans the same ratio, so the relative error of a
+    percentile is bounded by the bin width wherever it falls.
+    """
+
+    low: float
+    high: float
+    bins: int
+
+    @property
+    def size(self) -> int:
+        return self.bins + 2
+
+    @property
+    def ratio(self) -> float:
+        return (self.high / self.low) ** (1 / self.bins)
+
+    @property
+    def edges(self) -> List[float]:
+        """``size + 1`` edges; the overflow bin is closed one ratio above ``high``."""
+        ratio = self.ratio
+        return [0.0] + [self.low * ratio ** i for i in range(self.bins + 1)] + [self.high * ratio]
+
+    def bin_index(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        scaled = np.log(np.maximum(values, self.low) / self.low) / math.log(self.ratio)
+        inner = np.clip(np.floor(scaled).astype(np.int64) + 1, 1, self.bins)
+        return np.where(values < self.low, 0, np.where(values >= self.high, self.bins + 1, inner))
+
+    def percentile(self, counts: Sequence[int], q: float) -> float | None:
+        """
+        The ``q``-th percentile (0-100) of the values counted in ``counts``.
+
+        Interpolates inside the bin that holds the target rank: linearly in
+        the underflow bin, geometrically in the log-spaced ones.
+        """
+        total = sum(counts)
+        if total == 0:
+            return None
+        target = total * q / 100
+        edges = self.edges
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= target:
+                fraction = (target - seen) / count
+                lower, upper = edges[index], edges[index + 1]
+                if index == 0:
+                    return lower + fraction * (upper - lower)
+                return lower * (upper / lower) ** fraction
+            seen += count
+        return edges[-1]
+
+
+# Fare in dollars, duration in hours (one minute to a day), speed in mph.
+HISTOGRAM_SCHEMES = {
+    "base_passenger_fare": BinScheme(low=1.0, high=1_000.0, bins=60),
+    "trip_duration_hours": BinScheme(low=1 / 60, high=24.0, bins=60),
+    "average_speed_mph": BinScheme(low=0.5, high=200.0, bins=60),
+}
+
+
+__all__ = ["BinScheme", "HISTOGRAM_SCHEMES"]
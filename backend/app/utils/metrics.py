@@ -0,0 +1,251 @@
+"""In-process request and SQL metrics rendered in the Prometheus text format."""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Sequence, Tuple
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge read from ``callback`` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]) -> None:
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        return self.header() + [f"{self.name} {_format_number(self.callback())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts incl. +Inf, sum)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(labels) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._series[labels] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted(
+                (labels, (list(counts), total)) for labels, (counts, total) in self._series.items()
+            )
+        lines = self.header()
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    self.labelnames, labels, f'le="{_format_number(upper)}"'
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_number(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time from request start to response start, per route.",
+        ("method", "route"),
+    )
+)
+REQUESTS = registry.register(
+    Counter(
+        "http_requests_total",
+        "Requests served, per route and status code.",
+        ("method", "route", "status"),
+    )
+)
+REQUEST_QUERIES = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "SQL statements executed per request.",
+        ("method", "route"),
+        buckets=COUNT_BUCKETS,
+    )
+)
+REQUEST_DB_TIME = registry.register(
+    Histogram(
+        "http_request_db_seconds",
+        "Time spent executing SQL per request.",
+        ("method", "route"),
+    )
+)
+STATEMENT_LATENCY = registry.register(
+    Histogram("db_statement_duration_seconds", "Duration of individual SQL statements.")
+)
+STATEMENT_ERRORS = registry.register(
+    Counter("db_statement_errors_total", "SQL statements that raised an error.")
+)
+POOL_WAIT = registry.register(
+    Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time spent waiting for a pooled connection.",
+        buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0),
+    )
+)
+POOL_TIMEOUTS = registry.register(
+    Counter("db_pool_checkout_timeouts_total", "Checkouts that gave up after the pool timeout.")
+)
+SHARED_CACHE_LOOKUPS = registry.register(
+    Counter(
+        "shared_cache_lookups_total",
+        "Aggregate responses looked up in the shared cache, by result.",
+        ("route", "result"),
+    )
+)
+
+
+@dataclass
+class RequestStats:
+    """SQL work attributed to the current request (shared with its worker threads)."""
+
+    query_count: int = 0
+    db_seconds: float = 0.0
+    statements: List[Tuple[float, str]] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    # Statements kept for the slow-request log: the slowest few.
+    KEEP_STATEMENTS = 5
+
+    def record(self, seconds: float, statement: str) -> None:
+        with self._lock:
+            self.query_count += 1
+            self.db_seconds += seconds
+            self.statements.append((seconds, statement))
+            if len(self.statements) > self.KEEP_STATEMENTS * 2:
+                self.statements.sort(reverse=True)
+                del self.statements[self.KEEP_STATEMENTS:]
+
+    def slowest(self) -> List[Tuple[float, str]]:
+        with self._lock:
+            return sorted(self.statements, reverse=True)[: self.KEEP_STATEMENTS]
+
+
+current_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def record_statement(seconds: float, statement: str) -> None:
+    STATEMENT_LATENCY.observe(seconds)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.record(seconds, statement)
+
+
+__all__ = [
+    "PROMETHEUS_CONTENT_TYPE",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "RequestStats",
+    "registry",
+    "current_request_stats",
+    "record_statement",
+    "REQUEST_LATENCY",
+    "REQUESTS",
+    "REQUEST_QUERIES",
+    "REQUEST_DB_TIME",
+    "STATEMENT_LATENCY",
+    "STATEMENT_ERRORS",
+    "POOL_WAIT",
+    "POOL_TIMEOUTS",
+    "SHARED_CACHE_LOOKUPS",
+]
@@ -0,0 +1,874 @@
+"""Shared trip filters and aggregate queries for the API routes."""
+
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Sequence
+
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, case, extract, false, func, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, aliased
+
+from backend.app.db.config import QUERY_WORKERS, SessionLocal, engine
+from backend.app.db.timeouts import rollback, set_statement_timeout
+from backend.app.models import (
+    DerivedRefresh,
+    Location,
+    MetricHistogramBin,
+    OdMatrixCell,
+    Trip,
+    TripRollup,
+    Vendor,
+)
+from backend.app.utils.custom_algorithms import largest_triangle_three_buckets
+from backend.app.utils.dimensions import get_dimensions
+from backend.app.utils.histograms import HISTOGRAM_SCHEMES
+
+
+@dataclass(frozen=True)
+class TripFilters:
+    """
+    Filters shared by the trip listing and aggregate endpoints.
+
+    ``start`` is inclusive. ``end`` is exclusive when the client sent a bare
+    date (the whole day is included) and inclusive when it sent a timestamp.
+    """
+
+    vendor_id: str | None = None
+    pickup_id: int | None = None
+    dropoff_id: int | None = None
+    start: datetime | None = None
+    end: datetime | None = None
+    end_exclusive: bool = False
+
+    @property
+    def is_empty(self) -> bool:
+        return (
+            self.vendor_id is None
+            and self.pickup_id is None
+            and self.dropoff_id is None
+            and self.start is None
+            and self.end is None
+        )
+
+
+def _parse_bound(value: str, name: str, upper: bool) -> tuple[datetime, bool]:
+    """Parse a ``start_date``/``end_date`` value, returning (bound, exclusive)."""
+    try:
+        if len(value) == 10:
+            day = date.fromisoformat(value)
+            if upper:
+                return datetime.combine(day + timedelta(days=1), time.min), True
+            return datetime.combine(day, time.min), False
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid {name}: {value!r}")
+    return parsed.replace(tzinfo=None), False
+
+
+def trip_filters(
+    vendor_id: str | None = Query(None),
+    pickup_id: int | None = Query(None),
+    dropoff_id: int | None = Query(None),
+    start_date: str | None = Query(None),
+    end_date: str | None = Query(None),
+) -> TripFilters:
+    """FastAPI dependency collecting the common trip filter parameters."""
+    start = end = None
+    end_exclusive = False
+    if start_date:
+        start, _ = _parse_bound(start_date, "start_date", upper=False)
+    if end_date:
+        end, end_exclusive = _parse_bound(end_date, "end_date", upper=True)
+    return TripFilters(
+        vendor_id=vendor_id or None,
+        pickup_id=pickup_id,
+        dropoff_id=dropoff_id,
+        start=start,
+        end=end,
+        end_exclusive=end_exclusive,
+    )
+
+
+def trip_filter_clauses(filters: TripFilters, model: Any = Trip) -> List[Any]:
+    """
+    Translate ``filters`` into WHERE clauses over ``Trip``.
+
+    ``model`` may be any mapped class with the same filter columns
+    (``vendor_id``, ``pickup_id``, ``dropoff_id``, ``pickup_datetime``).
+    """
+    clauses: List[Any] = []
+    if filters.vendor_id is not None:
+        clauses.append(model.vendor_id == filters.vendor_id)
+    if filters.pickup_id is not None:
+        clauses.append(model.pickup_id == filters.pickup_id)
+    if filters.dropoff_id is not None:
+        clauses.append(model.dropoff_id == filters.dropoff_id)
+    if filters.start is not None:
+        clauses.append(model.pickup_datetime >= filters.start)
+    if filters.end is not None:
+        if filters.end_exclusive:
+            clauses.append(model.pickup_datetime < filters.end)
+        else:
+            clauses.append(model.pickup_datetime <= filters.end)
+    return clauses
+
+
+def trip_search_clause(session: Session, search: str) -> Any:
+    """
+    Match ``search`` against vendor and pickup zone/borough names, or a trip id.
+
+    The term is resolved against the in-memory dimension index first, so the
+    predicate sent to ``trips`` is an indexed ``IN`` list, never a ``LIKE``.
+    """
+    matches = get_dimensions(session).search_index.lookup(search)
+    search_filters = []
+    if matches.vendor_ids:
+        search_filters.append(Trip.vendor_id.in_(matches.vendor_ids))
+    if matches.location_ids:
+        search_filters.append(Trip.pickup_id.in_(matches.location_ids))
+    # Try to search by trip_id if search is numeric
+    try:
+        trip_id_val = int(search)
+        search_filters.append(Trip.trip_id == trip_id_val)
+    except ValueError:
+        pass
+    if not search_filters:
+        return false()
+    return or_(*search_filters)
+
+
+# ``sort_by`` values of the trip listing and the columns each orders by, all
+# in the requested direction. Every order matches an index on ``trips``, with
+# trip_id last so equal values page deterministically.
+TRIP_SORT_ORDERS: Dict[str, tuple] = {
+    "pickup_datetime": (Trip.pickup_datetime, Trip.trip_id),
+    "trip_id": (Trip.trip_id,),
+    "vendor_id": (Trip.vendor_id, Trip.pickup_datetime, Trip.trip_id),
+    "trip_miles": (Trip.trip_miles, Trip.trip_id),
+    "trip_duration_hours": (Trip.trip_duration_hours, Trip.trip_id),
+    "average_speed_mph": (Trip.average_speed_mph, Trip.trip_id),
+    "base_passenger_fare": (Trip.base_passenger_fare, Trip.trip_id),
+    "driver_pay": (Trip.driver_pay, Trip.trip_id),
+}
+TRIP_SORT_PATTERN = "^(" + "|".join(TRIP_SORT_ORDERS) + ")$"
+
+
+def trip_order_by(sort_by: str | None, sort_order: str = "desc") -> List[Any]:
+    """ORDER BY clauses for a ``TRIP_SORT_ORDERS`` key (newest first by default)."""
+    columns = TRIP_SORT_ORDERS[sort_by or "pickup_datetime"]
+    if sort_order.lower() == "asc":
+        return [column.asc() for column in columns]
+    return [column.desc() for column in columns]
+
+
+def _is_hour_aligned(value: datetime) -> bool:
+    return value.minute == 0 and value.second == 0 and value.microsecond == 0
+
+
+def rollup_filter_clauses(filters: TripFilters) -> List[Any] | None:
+    """
+    Translate ``filters`` into WHERE clauses over ``TripRollup``.
+
+    Returns ``None`` when the rollup grain cannot answer the filter exactly
+    (dropoff filters, or date bounds that do not fall on an hour boundary).
+    """
+    if filters.dropoff_id is not None:
+        return None
+    if filters.start is not None and not _is_hour_aligned(filters.start):
+        return None
+    if filters.end is not None and not (filters.end_exclusive and _is_hour_aligned(filters.end)):
+        return None
+
+    clauses: List[Any] = []
+    if filters.vendor_id is not None:
+        clauses.append(TripRollup.vendor_id == filters.vendor_id)
+    if filters.pickup_id is not None:
+        clauses.append(TripRollup.pickup_id == filters.pickup_id)
+    if filters.start is not None:
+        clauses.append(TripRollup.pickup_hour >= filters.start)
+    if filters.end is not None:
+        clauses.append(TripRollup.pickup_hour < filters.end)
+    return clauses
+
+
+def derived_table_complete(session: Session, job: str) -> bool:
+    """
+    True when the derived table of refresh ``job`` covers every trip.
+
+    A full load and ``python -m etl.refresh`` record the job's watermark in
+    ``derived_refreshes`` once the table is built from all of ``trips``. A
+    database loaded before the table existed has no watermark, however many
+    rows appending loads have added to it since.
+    """
+    return session.query(DerivedRefresh.job).filter(DerivedRefresh.job == job).first() is not None
+
+
+def rollups_available(session: Session) -> bool:
+    """True when ``trip_rollups`` is populated and covers every trip."""
+    try:
+        return (
+            derived_table_complete(session, "trip_rollups")
+            and session.query(TripRollup.rollup_id).first() is not None
+        )
+    except SQLAlchemyError:
+        # Databases loaded before rollups existed have no such table.
+        rollback(session)
+        return False
+
+
+def _rollup_clauses(session: Session, filters: TripFilters) -> List[Any] | None:
+    clauses = rollup_filter_clauses(filters)
+    if clauses is None or not rollups_available(session):
+        return None
+    return clauses
+
+
+def _as_float(value: Any) -> float | None:
+    return float(value) if value is not None else None
+
+
+def _ratio(total: Any, count: Any) -> float | None:
+    if not count or total is None:
+        return None
+    return float(total) / float(count)
+
+
+def summarize_trips(session: Session, filters: TripFilters) -> Dict[str, Any]:
+    """
+    Count, averages, totals and fare statistics over the filtered trips.
+
+    Everything comes from one scan so the summary, overview and algorithm
+    performance views can share it. Served from ``trip_rollups`` whenever the filter fits the rollup grain,
+    otherwise from ``trips`` through the filter-leading indexes.
+    """
+    rollup_clauses = _rollup_clauses(session, filters)
+    if rollup_clauses is not None:
+        row = (
+            session.query(
+                func.sum(TripRollup.trip_count),
+                func.sum(TripRollup.trip_miles_sum),
+                func.sum(TripRollup.trip_miles_count),
+                func.sum(TripRollup.trip_duration_hours_sum),
+                func.sum(TripRollup.trip_duration_hours_count),
+                func.sum(TripRollup.average_speed_mph_sum),
+                func.sum(TripRollup.average_speed_mph_count),
+                func.sum(TripRollup.base_passenger_fare_sum),
+                func.sum(TripRollup.base_passenger_fare_count),
+                func.sum(TripRollup.driver_pay_sum),
+                func.sum(TripRollup.driver_pay_count),
+                func.sum(TripRollup.total_extra_charges_sum),
+                func.sum(TripRollup.total_extra_charges_count),
+                func.min(TripRollup.base_passenger_fare_min),
+                func.max(TripRollup.base_passenger_fare_max),
+                func.sum(TripRollup.fare_outlier_count),
+            )
+            .filter(*rollup_clauses)
+            .one()
+        )
+        (
+            total_trips,
+            miles_sum, miles_count,
+            duration_sum, duration_count,
+            speed_sum, speed_count,
+            fare_sum, fare_count,
+            pay_sum, pay_count,
+            extras_sum, extras_count,
+            min_fare, max_fare, outlier_trips,
+        ) = row
+        return {
+            "total_trips": int(total_trips or 0),
+            "avg_trip_miles": _ratio(miles_sum, miles_count),
+            "avg_trip_duration_hours": _ratio(duration_sum, duration_count),
+            "avg_speed_mph": _ratio(speed_sum, speed_count),
+            "total_revenue": _as_float(fare_sum) if fare_count else None,
+            "total_driver_pay": _as_float(pay_sum) if pay_count else None,
+            "avg_base_fare": _ratio(fare_sum, fare_count),
+            "avg_extra_charges": _ratio(extras_sum, extras_count),
+            "fare_count": int(fare_count or 0),
+            "min_fare": _as_float(min_fare),
+            "max_fare": _as_float(max_fare),
+            "outlier_trips": int(outlier_trips or 0),
+        }
+
+    (
+        total_trips,
+        avg_miles,
+        avg_duration_hours,
+        avg_speed,
+        total_revenue,
+        total_driver_pay,
+        avg_base_fare,
+        avg_extra,
+        fare_count,
+        min_fare,
+        max_fare,
+        outlier_trips,
+    ) = (
+        session.query(
+            func.count(Trip.trip_id),
+            func.avg(Trip.trip_miles),
+            func.avg(Trip.trip_duration_hours),
+            func.avg(Trip.average_speed_mph),
+            func.sum(Trip.base_passenger_fare),
+            func.sum(Trip.driver_pay),
+            func.avg(Trip.base_passenger_fare),
+            func.avg(Trip.total_extra_charges),
+            func.count(Trip.base_passenger_fare),
+            func.min(Trip.base_passenger_fare),
+            func.max(Trip.base_passenger_fare),
+            func.sum(case((Trip.is_fare_outlier.is_(True), 1), else_=0)),
+        )
+        .filter(*trip_filter_clauses(filters))
+        .one()
+    )
+    return {
+        "total_trips": int(total_trips or 0),
+        "avg_trip_miles": _as_float(avg_miles),
+        "avg_trip_duration_hours": _as_float(avg_duration_hours),
+        "avg_speed_mph": _as_float(avg_speed),
+        "total_revenue": _as_float(total_revenue),
+        "total_driver_pay": _as_float(total_driver_pay),
+        "avg_base_fare": _as_float(avg_base_fare),
+        "avg_extra_charges": _as_float(avg_extra),
+        "fare_count": int(fare_count or 0),
+        "min_fare": _as_float(min_fare),
+        "max_fare": _as_float(max_fare),
+        "outlier_trips": int(outlier_trips or 0),
+    }
+
+
+def count_dimensions(session: Session, filters: TripFilters) -> tuple[int, int]:
+    """
+    Return (unique_vendors, unique_locations).
+
+    Unfiltered, these are the sizes of the dimension tables. With filters they
+    are the distinct vendors and pickup zones among the matching trips.
+    """
+    if filters.is_empty:
+        unique_vendors = session.query(func.count(func.distinct(Vendor.vendor_id))).scalar() or 0
+        unique_locations = session.query(func.count(func.distinct(Location.location_id))).scalar() or 0
+        return unique_vendors, unique_locations
+
+    rollup_clauses = _rollup_clauses(session, filters)
+    if rollup_clauses is not None:
+        unique_vendors, unique_locations = (
+            session.query(
+                func.count(func.distinct(TripRollup.vendor_id)),
+                func.count(func.distinct(TripRollup.pickup_id)),
+            )
+            .filter(*rollup_clauses)
+            .filter(TripRollup.trip_count > 0)
+            .one()
+        )
+    else:
+        unique_vendors, unique_locations = (
+            session.query(
+                func.count(func.distinct(Trip.vendor_id)),
+                func.count(func.distinct(Trip.pickup_id)),
+            )
+            .filter(*trip_filter_clauses(filters))
+            .one()
+        )
+    return unique_vendors or 0, unique_locations or 0
+
+
+def vendor_performance(session: Session, filters: TripFilters, limit: int) -> List[Dict[str, Any]]:
+    """Busiest vendors among the filtered trips, with fare statistics."""
+    rollup_clauses = _rollup_clauses(session, filters)
+    if rollup_clauses is not None:
+        trip_count = func.sum(TripRollup.trip_count)
+        results = (
+            session.query(
+                TripRollup.vendor_id,
+                trip_count.label("trip_count"),
+                func.sum(TripRollup.base_passenger_fare_sum).label("fare_sum"),
+                func.sum(TripRollup.base_passenger_fare_count).label("fare_count"),
+            )
+            .filter(*rollup_clauses)
+            .group_by(TripRollup.vendor_id)
+            .order_by(trip_count.desc())
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "vendor_id": row.vendor_id,
+                "trip_count": int(row.trip_count or 0),
+                "avg_base_fare": _ratio(row.fare_sum, row.fare_count),
+                "total_revenue": _as_float(row.fare_sum) if row.fare_count else None,
+            }
+            for row in results
+        ]
+
+    results = (
+        session.query(
+            Trip.vendor_id,
+            func.count(Trip.trip_id).label("trip_count"),
+            func.avg(Trip.base_passenger_fare).label("avg_base_fare"),
+            func.sum(Trip.base_passenger_fare).label("total_revenue"),
+        )
+        .filter(*trip_filter_clauses(filters))
+        .group_by(Trip.vendor_id)
+        .order_by(func.count(Trip.trip_id).desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "vendor_id": row.vendor_id,
+            "trip_count": row.trip_count or 0,
+            "avg_base_fare": _as_float(row.avg_base_fare),
+            "total_revenue": _as_float(row.total_revenue),
+        }
+        for row in results
+    ]
+
+
+def _as_date(value: Any) -> date:
+    # SQLite returns DATE() as text, the server databases as a date object.
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def hourly_trip_counts(session: Session, filters: TripFilters) -> Dict[str, Any]:
+    """
+    Trip counts by pickup hour-of-day, weekday (Monday first) and both.
+
+    The database groups by (day, hour); the weekday fold happens here so the
+    SQL stays portable and the result set is at most 24 rows per day.
+    """
+    rollup_clauses = _rollup_clauses(session, filters)
+    if rollup_clauses is not None:
+        rows = (
+            session.query(TripRollup.pickup_hour, func.sum(TripRollup.trip_count))
+            .filter(*rollup_clauses)
+            .filter(TripRollup.pickup_hour.isnot(None))
+            .group_by(TripRollup.pickup_hour)
+            .all()
+        )
+        buckets = [(hour.date(), hour.hour, count) for hour, count in rows]
+    else:
+        day = func.date(Trip.pickup_datetime)
+        hour = extract("hour", Trip.pickup_datetime)
+        rows = (
+            session.query(day, hour, func.count(Trip.trip_id))
+            .filter(*trip_filter_clauses(filters))
+            .filter(Trip.pickup_datetime.isnot(None))
+            .group_by(day, hour)
+            .all()
+        )
+        buckets = [(_as_date(day_value), int(hour_value), count) for day_value, hour_value, count in rows]
+
+    by_weekday_hour = [[0] * 24 for _ in range(7)]
+    for day_value, hour_value, count in buckets:
+        by_weekday_hour[day_value.weekday()][hour_value] += int(count or 0)
+
+    by_hour = [sum(day_counts[hour] for day_counts in by_weekday_hour) for hour in range(24)]
+    by_weekday = [sum(day_counts) for day_counts in by_weekday_hour]
+    return {
+        "total_trips": sum(by_weekday),
+        "by_hour": by_hour,
+        "by_weekday": by_weekday,
+        "by_weekday_hour": by_weekday_hour,
+    }
+
+
+def _bin_index(column: Any, upper: float, bins: int) -> Any:
+    # Values equal to the upper edge belong to the last bin.
+    width = upper / bins
+    return case(
+        (column >= upper, bins - 1),
+        else_=func.floor(column / width),
+    )
+
+
+def distance_fare_histogram(
+    session: Session,
+    filters: TripFilters,
+    miles_bins: int,
+    fare_bins: int,
+    max_miles: float | None = None,
+    max_fare: float | None = None,
+) -> Dict[str, Any]:
+    """
+    2D histogram of ``trip_miles`` x ``base_passenger_fare`` over the filtered trips.
+
+    Both axes start at zero. When an upper bound is not given it defaults to
+    the largest value among trips not flagged as fare outliers, so a handful
+    of extreme fares do not squash every other trip into the first bin.
+    Only non-empty bins are returned.
+    """
+    clauses = trip_filter_clauses(filters) + [
+        Trip.trip_miles.isnot(None),
+        Trip.base_passenger_fare.isnot(None),
+    ]
+
+    total_trips, outlier_free_miles, outlier_free_fare = (
+        session.query(
+            func.count(Trip.trip_id),
+            func.max(case((Trip.is_fare_outlier.is_(True), None), else_=Trip.trip_miles)),
+            func.max(case((Trip.is_fare_outlier.is_(True), None), else_=Trip.base_passenger_fare)),
+        )
+        .filter(*clauses)
+        .one()
+    )
+    if max_miles is None:
+        max_miles = float(outlier_free_miles or 0) or 1.0
+    if max_fare is None:
+        max_fare = float(outlier_free_fare or 0) or 1.0
+
+    miles_bin = _bin_index(Trip.trip_miles, max_miles, miles_bins).label("miles_bin")
+    fare_bin = _bin_index(Trip.base_passenger_fare, max_fare, fare_bins).label("fare_bin")
+    in_range = and_(
+        Trip.trip_miles >= 0,
+        Trip.trip_miles <= max_miles,
+        Trip.base_passenger_fare >= 0,
+        Trip.base_passenger_fare <= max_fare,
+    )
+    rows = (
+        session.query(miles_bin, fare_bin, func.count(Trip.trip_id))
+        .filter(*clauses)
+        .filter(in_range)
+        .group_by(miles_bin, fare_bin)
+        .all()
+    )
+
+    bins = [
+        {"miles_bin": int(m), "fare_bin": int(f), "count": int(count)}
+        for m, f, count in rows
+    ]
+    binned = sum(item["count"] for item in bins)
+    return {
+        "miles_edges": [round(max_miles * i / miles_bins, 4) for i in range(miles_bins + 1)],
+        "fare_edges": [round(max_fare * i / fare_bins, 4) for i in range(fare_bins + 1)],
+        "bins": sorted(bins, key=lambda item: (item["miles_bin"], item["fare_bin"])),
+        "total_trips": int(total_trips or 0),
+        "out_of_range_trips": int(total_trips or 0) - binned,
+    }
+
+
+def od_matrix(
+    session: Session,
+    level: str = "zone",
+    vendor_id: str | None = None,
+    hour_of_day: int | None = None,
+    month: date | None = None,
+    pickup_id: int | None = None,
+    dropoff_id: int | None = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """
+    Busiest pickup -> dropoff pairs from the precomputed ``od_matrix`` table.
+
+    ``pickup_id`` / ``dropoff_id`` slice one row / column of the matrix, the
+    other arguments select the cells summed into each pair. At
+    ``level="borough"`` zones are rolled up by joining the cells to
+    ``locations``; zone names at ``level="zone"`` come from the dimension
+    cache. ``trips`` is never read.
+    """
+    clauses = []
+    if vendor_id is not None:
+        clauses.append(OdMatrixCell.vendor_id == vendor_id)
+    if hour_of_day is not None:
+        clauses.append(OdMatrixCell.hour_of_day == hour_of_day)
+    if month is not None:
+        clauses.append(OdMatrixCell.pickup_month == month)
+    if pickup_id is not None:
+        clauses.append(OdMatrixCell.pickup_id == pickup_id)
+    if dropoff_id is not None:
+        clauses.append(OdMatrixCell.dropoff_id == dropoff_id)
+
+    metrics = [
+        func.sum(OdMatrixCell.trip_count).label("trip_count"),
+        func.sum(OdMatrixCell.base_passenger_fare_sum).label("fare_sum"),
+        func.sum(OdMatrixCell.base_passenger_fare_count).label("fare_count"),
+        func.sum(OdMatrixCell.trip_duration_hours_sum).label("duration_sum"),
+        func.sum(OdMatrixCell.trip_duration_hours_count).label("duration_count"),
+        func.sum(OdMatrixCell.average_speed_mph_sum).label("speed_sum"),
+        func.sum(OdMatrixCell.average_speed_mph_count).label("speed_count"),
+    ]
+    trip_count = metrics[0]
+    if level == "borough":
+        pickup = aliased(Location)
+        dropoff = aliased(Location)
+        keys = [pickup.borough.label("pickup_borough"), dropoff.borough.label("dropoff_borough")]
+        query = (
+            session.query(*keys, *metrics)
+            .outerjoin(pickup, pickup.location_id == OdMatrixCell.pickup_id)
+            .outerjoin(dropoff, dropoff.location_id == OdMatrixCell.dropoff_id)
+        )
+    else:
+        keys = [OdMatrixCell.pickup_id, OdMatrixCell.dropoff_id]
+        query = session.query(*keys, *metrics)
+    grouped = query.filter(*clauses).group_by(*keys)
+    rows = grouped.order_by(trip_count.desc(), *keys).limit(limit).all()
+    pair_totals = grouped.subquery()
+    total_trips, total_pairs = (
+        session.query(func.sum(pair_totals.c.trip_count), func.count())
+        .select_from(pair_totals)
+        .one()
+    )
+
+    locations = get_dimensions(session).locations if level == "zone" else {}
+    pairs = []
+    for row in rows:
+        pair = {
+            "trip_count": int(row.trip_count or 0),
+            "avg_base_fare": _ratio(row.fare_sum, row.fare_count),
+            "avg_trip_duration_hours": _ratio(row.duration_sum, row.duration_count),
+            "avg_speed_mph": _ratio(row.speed_sum, row.speed_count),
+        }
+        if level == "borough":
+            pair.update(pickup_borough=row.pickup_borough, dropoff_borough=row.dropoff_borough)
+        else:
+            pickup_location = locations.get(row.pickup_id)
+            dropoff_location = locations.get(row.dropoff_id)
+            pair.update(
+                pickup_id=row.pickup_id,
+                dropoff_id=row.dropoff_id,
+                pickup_borough=pickup_location.borough if pickup_location else None,
+                pickup_zone=pickup_location.zone if pickup_location else None,
+                dropoff_borough=dropoff_location.borough if dropoff_location else None,
+                dropoff_zone=dropoff_location.zone if dropoff_location else None,
+            )
+        pairs.append(pair)
+
+    return {
+        "level": level,
+        "total_trips": int(total_trips or 0),
+        "total_pairs": int(total_pairs or 0),
+        "pairs": pairs,
+    }
+
+
+def metric_distribution(
+    session: Session,
+    metric: str,
+    percentiles: Sequence[float],
+    vendor_id: str | None = None,
+    pickup_id: int | None = None,
+    start_month: date | None = None,
+    end_month: date | None = None,
+) -> Dict[str, Any]:
+    """
+    Histogram and percentiles of ``metric`` from the precomputed ``metric_histograms``.
+
+    The selected (vendor, pickup zone, month) cells are merged with one
+    ``SUM ... GROUP BY bin_index`` (at most a few dozen rows); percentiles
+    are then read off the merged counts, so no trip values are sorted.
+    """
+    scheme = HISTOGRAM_SCHEMES[metric]
+    clauses = [MetricHistogramBin.metric == metric]
+    if vendor_id is not None:
+        clauses.append(MetricHistogramBin.vendor_id == vendor_id)
+    if pickup_id is not None:
+        clauses.append(MetricHistogramBin.pickup_id == pickup_id)
+    if start_month is not None:
+        clauses.append(MetricHistogramBin.pickup_month >= start_month)
+    if end_month is not None:
+        clauses.append(MetricHistogramBin.pickup_month <= end_month)
+
+    counts = [0] * scheme.size
+    rows = (
+        session.query(MetricHistogramBin.bin_index, func.sum(MetricHistogramBin.trip_count))
+        .filter(*clauses)
+        .group_by(MetricHistogramBin.bin_index)
+        .all()
+    )
+    for bin_index, count in rows:
+        counts[int(bin_index)] += int(count or 0)
+
+    return {
+        "metric": metric,
+        "total_trips": sum(counts),
+        "edges": [round(edge, 4) for edge in scheme.edges],
+        "counts": counts,
+        "percentiles": {f"p{q:g}": scheme.percentile(counts, q) for q in percentiles},
+    }
+
+
+TIMESERIES_BUCKETS = ("minute", "hour", "day", "week")
+TIMESERIES_METRICS = ("trip_count", "revenue", "avg_fare", "avg_speed_mph")
+
+
+def _bucket_start(day: date, hour: int, minute: int, bucket: str) -> datetime:
+    if bucket == "week":
+        return datetime.combine(day - timedelta(days=day.weekday()), time.min)
+    if bucket == "day":
+        return datetime.combine(day, time.min)
+    return datetime.combine(day, time(hour, minute if bucket == "minute" else 0))
+
+
+def trip_timeseries(
+    session: Session,
+    filters: TripFilters,
+    bucket: str,
+    max_points: int | None = None,
+    downsample_by: str = "trip_count",
+) -> Dict[str, Any]:
+    """
+    Trip count, revenue, mean fare and mean speed per pickup ``bucket``.
+
+    The database groups by hour (``trip_rollups`` when the filter fits the
+    rollup grain) or, for ``trips``, by day, hour and minute as far as the
+    bucket needs; weeks (Monday first) are folded here. Empty buckets are
+    omitted. With ``max_points`` the series is reduced to that many buckets
+    by LTTB over ``downsample_by``, keeping its peaks and troughs.
+    """
+    rollup_clauses = None if bucket == "minute" else _rollup_clauses(session, filters)
+    if rollup_clauses is not None:
+        rows = (
+            session.query(
+                TripRollup.pickup_hour,
+                func.sum(TripRollup.trip_count),
+                func.sum(TripRollup.base_passenger_fare_sum),
+                func.sum(TripRollup.base_passenger_fare_count),
+                func.sum(TripRollup.average_speed_mph_sum),
+                func.sum(TripRollup.average_speed_mph_count),
+            )
+            .filter(*rollup_clauses)
+            .filter(TripRollup.pickup_hour.isnot(None))
+            .group_by(TripRollup.pickup_hour)
+            .all()
+        )
+        groups = [(hour.date(), hour.hour, 0, *totals) for hour, *totals in rows]
+    else:
+        keys = [func.date(Trip.pickup_datetime)]
+        if bucket in ("hour", "minute"):
+            keys.append(extract("hour", Trip.pickup_datetime))
+        if bucket == "minute":
+            keys.append(extract("minute", Trip.pickup_datetime))
+        rows = (
+            session.query(
+                *keys,
+                func.count(Trip.trip_id),
+                func.sum(Trip.base_passenger_fare),
+                func.count(Trip.base_passenger_fare),
+                func.sum(Trip.average_speed_mph),
+                func.count(Trip.average_speed_mph),
+            )
+            .filter(*trip_filter_clauses(filters))
+            .filter(Trip.pickup_datetime.isnot(None))
+            .group_by(*keys)
+            .all()
+        )
+        width = len(keys)
+        groups = [
+            (
+                _as_date(row[0]),
+                int(row[1]) if width > 1 else 0,
+                int(row[2]) if width > 2 else 0,
+                *row[width:],
+            )
+            for row in rows
+        ]
+
+    totals: Dict[datetime, List[float]] = {}
+    for day_value, hour_value, minute_value, *values in groups:
+        start = _bucket_start(day_value, hour_value, minute_value, bucket)
+        running = totals.setdefault(start, [0.0] * 5)
+        for index, value in enumerate(values):
+            running[index] += float(value or 0)
+
+    points = [
+        {
+            "bucket_start": start,
+            "trip_count": int(count),
+            "revenue": fare_sum if fare_count else None,
+            "avg_fare": _ratio(fare_sum, fare_count),
+            "avg_speed_mph": _ratio(speed_sum, speed_count),
+        }
+        for start, (count, fare_sum, fare_count, speed_sum, speed_count) in sorted(totals.items())
+    ]
+    total_buckets = len(points)
+    if max_points is not None and total_buckets > max_points:
+        series = [
+            (point["bucket_start"].timestamp(), point[downsample_by] or 0.0) for point in points
+        ]
+        points = [points[index] for index in largest_triangle_three_buckets(series, max_points)]
+
+    return {
+        "bucket": bucket,
+        "total_buckets": total_buckets,
+        "downsampled": len(points) < total_buckets,
+        "points": points,
+    }
+
+
+def stream_rows(statement: Any, batch_size: int = 5_000) -> Iterator[Sequence[Any]]:
+    """
+    Execute ``statement`` on a server-side cursor and yield row batches.
+
+    Runs on its own pooled connection so it can outlive the request's session
+    while a streaming response is sent; memory stays bounded by ``batch_size``.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=batch_size
+        ).execute(statement)
+        for partition in result.partitions():
+            yield partition
+
+
+# Shared by every request that fans out. ``API_THREADPOOL_SIZE`` leaves
+# ``QUERY_WORKERS`` pooled connections for it, so fan-out cannot starve requests.
+_query_executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="query")
+
+
+def _run_in_session(job: Callable[[Session], Any], timeout_seconds: float | None) -> Any:
+    with SessionLocal() as session:
+        if timeout_seconds is not None:
+            set_statement_timeout(session, timeout_seconds)
+        return job(session)
+
+
+def run_concurrently(
+    jobs: Dict[str, Callable[[Session], Any]], timeout_seconds: float | None = None
+) -> Dict[str, Any]:
+    """
+    Run independent query functions at the same time, one pooled session each.
+
+    Wall time is roughly that of the slowest job instead of the sum. With
+    ``timeout_seconds`` every statement of every job is cancelled after that.
+    """
+    # Each job runs in a copy of the caller's context so its SQL is still
+    # attributed to the calling request's metrics.
+    futures = {
+        name: _query_executor.submit(
+            contextvars.copy_context().run, _run_in_session, job, timeout_seconds
+        )
+        for name, job in jobs.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+
+__all__ = [
+    "TripFilters",
+    "trip_filters",
+    "trip_filter_clauses",
+    "trip_search_clause",
+    "TRIP_SORT_ORDERS",
+    "TRIP_SORT_PATTERN",
+    "trip_order_by",
+    "stream_rows",
+    "rollup_filter_clauses",
+    "derived_table_complete",
+    "rollups_available",
+    "summarize_trips",
+    "count_dimensions",
+    "vendor_performance",
+    "hourly_trip_counts",
+    "distance_fare_histogram",
+    "od_matrix",
+    "metric_distribution",
+    "trip_timeseries",
+    "run_concurrently",
+]
@@ -0,0 +1,100 @@
+"""In-memory text search over the vendor and location dimensions."""
+
+from __future__ import annotations
+
+import bisect
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_TOKEN_RE.findall(text.casefold()))
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass
+class SearchMatches:
+    vendor_ids: List[str] = field(default_factory=list)
+    location_ids: List[int] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.vendor_ids or self.location_ids)
+
+
+class SearchIndex:
+    """
+    Prefix and trigram index over vendor ids/names and zone/borough names.
+
+    Every word of a query must match a document, either as the prefix of one
+    of its tokens (sorted token list + bisect) or, for words of three or more
+    characters, as a substring (trigram posting lists, then verified).
+    Lookups touch only the few hundred dimension rows, never ``trips``.
+    """
+
+    def __init__(
+        self,
+        vendors: Iterable[Tuple[str, Optional[str]]],
+        locations: Iterable[Tuple[int, Optional[str], Optional[str]]],
+    ) -> None:
+        self._documents: List[Tuple[str, object, str]] = []
+        for vendor_id, vendor_name in vendors:
+            text = _normalize(f"{vendor_id} {vendor_name or ''}")
+            self._documents.append(("vendor", vendor_id, text))
+        for location_id, zone, borough in locations:
+            text = _normalize(f"{zone or ''} {borough or ''}")
+            self._documents.append(("location", location_id, text))
+
+        self._tokens: List[Tuple[str, int]] = []
+        self._postings: Dict[str, Set[int]] = {}
+        for doc_id, (_, _, text) in enumerate(self._documents):
+            for token in set(text.split()):
+                self._tokens.append((token, doc_id))
+            for gram in _trigrams(text):
+                self._postings.setdefault(gram, set()).add(doc_id)
+        self._tokens.sort()
+
+    def _prefix_hits(self, word: str) -> Set[int]:
+        hits: Set[int] = set()
+        position = bisect.bisect_left(self._tokens, (word, -1))
+        while position < len(self._tokens) and self._tokens[position][0].startswith(word):
+            hits.add(self._tokens[position][1])
+            position += 1
+        return hits
+
+    def _substring_hits(self, word: str) -> Set[int]:
+        if len(word) < 3:
+            return set()
+        postings = [self._postings.get(gram, set()) for gram in _trigrams(word)]
+        candidates = set.intersection(*postings) if postings else set()
+        return {doc_id for doc_id in candidates if word in self._documents[doc_id][2]}
+
+    def lookup(self, term: str) -> SearchMatches:
+        words = _normalize(term).split()
+        if not words:
+            return SearchMatches()
+
+        matched: Optional[Set[int]] = None
+        for word in words:
+            hits = self._prefix_hits(word) | self._substring_hits(word)
+            matched = hits if matched is None else matched & hits
+            if not matched:
+                return SearchMatches()
+
+        matches = SearchMatches()
+        for doc_id in sorted(matched):
+            kind, key, _ = self._documents[doc_id]
+            if kind == "vendor":
+                matches.vendor_ids.append(key)
+            else:
+                matches.location_ids.append(key)
+        return matches
+
+
+__all__ = ["SearchIndex", "SearchMatches"]
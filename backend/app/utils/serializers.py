@@ -0,0 +1,182 @@
+"""Encoders that turn trip query rows into response bodies."""
+
+from __future__ import annotations
+
+import csv
+import io
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Mapping, Sequence
+
+import orjson
+import pyarrow as pa
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, String, type_coerce
+
+from backend.app.models import Trip
+from backend.app.schemas import LocationOut, TripOut, TripWithZonesOut
+
+
+def _plain_column(column: Any) -> Any:
+    # Numeric columns come back as float instead of Decimal; the conversion
+    # runs in SQLAlchemy's result processor, not per value in Python.
+    if isinstance(column.type, Numeric):
+        return type_coerce(
+            column,
+            Numeric(column.type.precision, column.type.scale, asdecimal=False),
+        ).label(column.key)
+    return column
+
+
+# Columns in ``TripOut`` field order, so every encoding matches the JSON shape.
+TRIP_FIELDS: List[str] = list(TripOut.model_fields)
+TRIP_COLUMNS = [_plain_column(getattr(Trip, name)) for name in TRIP_FIELDS]
+
+# Zone names ``TripWithZonesOut`` adds when a listing is requested with ``expand=zones``.
+EXPANDED_TRIP_FIELDS: List[str] = list(TripWithZonesOut.model_fields)
+ZONE_FIELDS: List[str] = EXPANDED_TRIP_FIELDS[len(TRIP_FIELDS):]
+
+_PICKUP_INDEX = TRIP_FIELDS.index("pickup_id")
+_DROPOFF_INDEX = TRIP_FIELDS.index("dropoff_id")
+
+
+def zone_values(location: LocationOut | None) -> tuple:
+    """(borough, zone) for a cached location, or NULLs for unknown ids."""
+    if location is None:
+        return (None, None)
+    return (location.borough, location.zone)
+
+
+def with_zones(
+    rows: Sequence[Sequence[Any]], locations: Mapping[int, LocationOut]
+) -> List[tuple]:
+    """
+    Append pickup/dropoff borough and zone to ``TRIP_COLUMNS`` rows.
+
+    Names come from the in-process location dictionary, so expanding a page
+    costs two dict lookups per row rather than a join against ``locations``.
+    """
+    return [
+        (
+            *row,
+            *zone_values(locations.get(row[_PICKUP_INDEX])),
+            *zone_values(locations.get(row[_DROPOFF_INDEX])),
+        )
+        for row in rows
+    ]
+
+
+def encode_json(rows: Sequence[Sequence[Any]], fields: Sequence[str] = TRIP_FIELDS) -> bytes:
+    """
+    JSON array of objects for rows selected with ``TRIP_COLUMNS``.
+
+    Produces the same document FastAPI renders through ``List[TripOut]``
+    without building and validating a model per row.
+    """
+    return orjson.dumps([dict(zip(fields, row)) for row in rows])
+
+
+def encode_ndjson(rows: Iterable[Sequence[Any]]) -> bytes:
+    """One JSON object per row, newline terminated."""
+    return b"".join(
+        orjson.dumps(dict(zip(TRIP_FIELDS, row)), option=orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(rows: Iterable[Sequence[Any]], header: bool = False) -> bytes:
+    """CSV lines for ``rows``; empty cells for NULLs."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(TRIP_FIELDS)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "trips.ndjson"),
+    "csv": ("text/csv", "trips.csv"),
+}
+
+
+def iter_export(batches: Iterable[Sequence[Sequence[Any]]], fmt: str) -> Iterator[bytes]:
+    """Encode streamed row batches as ``fmt`` chunks, one chunk per batch."""
+    if fmt == "csv":
+        yield encode_csv([], header=True)
+        for batch in batches:
+            yield encode_csv(batch)
+    else:
+        for batch in batches:
+            yield encode_ndjson(batch)
+
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _arrow_type(column: Any) -> pa.DataType:
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Numeric):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, String):
+        return pa.string()
+    raise TypeError(f"No Arrow type for column {column.key!r} ({column_type!r})")
+
+
+TRIP_ARROW_SCHEMA = pa.schema(
+    [pa.field(name, _arrow_type(column)) for name, column in zip(TRIP_FIELDS, TRIP_COLUMNS)]
+)
+EXPANDED_TRIP_ARROW_SCHEMA = pa.schema(
+    list(TRIP_ARROW_SCHEMA) + [pa.field(name, pa.string()) for name in ZONE_FIELDS]
+)
+
+
+def wants_arrow(accept: str | None) -> bool:
+    """True when the ``Accept`` header asks for an Arrow IPC stream."""
+    return bool(accept) and ARROW_STREAM_MEDIA_TYPE in accept
+
+
+def encode_arrow(rows: Sequence[Sequence[Any]], schema: pa.Schema = TRIP_ARROW_SCHEMA) -> bytes:
+    """
+    Encode ``rows`` (tuples in ``schema`` order) as an Arrow IPC stream.
+
+    Rows are transposed into one array per column, so the payload is columnar
+    and clients can load it without parsing an object per trip.
+    """
+    columns = list(zip(*rows)) if rows else [() for _ in schema]
+    arrays = [pa.array(values, type=field.type) for field, values in zip(schema, columns)]
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+    return sink.getvalue().to_pybytes()
+
+
+__all__ = [
+    "TRIP_FIELDS",
+    "TRIP_COLUMNS",
+    "ZONE_FIELDS",
+    "EXPANDED_TRIP_FIELDS",
+    "EXPANDED_TRIP_ARROW_SCHEMA",
+    "EXPORT_FORMATS",
+    "ARROW_STREAM_MEDIA_TYPE",
+    "TRIP_ARROW_SCHEMA",
+    "wants_arrow",
+    "encode_arrow",
+    "encode_json",
+    "encode_ndjson",
+    "encode_csv",
+    "iter_export",
+    "with_zones",
+    "zone_values",
+]
@@ -0,0 +1,164 @@
+"""
+Cache shared by every API worker on a host, kept in memory-mapped files.
+
+Entries live under ``<API_SHARED_CACHE_DIR>/<database>/gen-<N>/``, one file
+per key, where ``N`` is the ETL data generation they were computed from.
+Workers read entries through ``mmap``, so the bytes sit once in the OS page
+cache however many workers map them, and a freshly started worker serves
+whatever its siblings have already computed. Files are written to a
+temporary name and renamed into place, so readers never see a partial entry.
+
+When the generation changes, a single writer (whichever worker takes the
+refresh lock first) creates the new generation's directory, stores the
+shared dimension snapshot there and removes older generations; the others
+wait on the lock and then read what it wrote. Each generation keeps its
+byte total in a small counter file, updated under that file's lock, so
+``put`` enforces ``max_bytes`` without listing the directory.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development servers only.
+    fcntl = None
+
+from backend.app.db.config import DATABASE_URL, SHARED_CACHE_DIR, SHARED_CACHE_MAX_BYTES
+
+
+_GENERATION_PREFIX = "gen-"
+
+# Per generation: the bytes its entries take, as an 8-byte little-endian integer.
+_SIZE_FILE = "size"
+
+
+class SharedCache:
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _generation_dir(self, generation: int) -> Path:
+        return self.directory / f"{_GENERATION_PREFIX}{generation}"
+
+    def _entry_path(self, generation: int, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self._generation_dir(generation) / f"{digest}.bin"
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _locked(path: Path) -> Iterator[BinaryIO]:
+        """``path`` opened for reading and writing (created if missing), exclusively locked."""
+        # Unbuffered, so a write is in the file before the lock is released.
+        with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT), "r+b", buffering=0) as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield handle
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _refresh_lock(self) -> contextlib.AbstractContextManager:
+        return self._locked(self.directory / "refresh.lock")
+
+    def get(self, generation: int, key: str) -> Optional[bytes]:
+        try:
+            with open(self._entry_path(generation, key), "rb") as handle:
+                if os.fstat(handle.fileno()).st_size == 0:
+                    return b""
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[:]
+        except FileNotFoundError:
+            return None
+
+    def put(self, generation: int, key: str, payload: bytes) -> bool:
+        """
+        Store ``payload``; False when the generation is gone or the cache is full.
+
+        Only ``refresh`` creates generation directories, so a worker still on
+        an old generation cannot resurrect one the writer already removed.
+        """
+        directory = self._generation_dir(generation)
+        path = self._entry_path(generation, key)
+        if not directory.is_dir():
+            return False
+        try:
+            with self._locked(directory / _SIZE_FILE) as counter:
+                used = int.from_bytes(counter.read(8), "little")
+                try:
+                    replaced = path.stat().st_size
+                except FileNotFoundError:
+                    replaced = 0
+                total = used - replaced + len(payload)
+                if total > self.max_bytes:
+                    return False
+                fd, temp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as handle:
+                        handle.write(payload)
+                    os.replace(temp_name, path)
+                except OSError:
+                    with contextlib.suppress(OSError):
+                        os.unlink(temp_name)
+                    return False
+                counter.seek(0)
+                counter.write(total.to_bytes(8, "little"))
+        except FileNotFoundError:
+            # The writer removed this generation meanwhile.
+            return False
+        return True
+
+    def refresh(self, generation: int, key: str, build: Callable[[], bytes]) -> bytes:
+        """
+        The ``key`` entry of ``generation``, built by a single writer if missing.
+
+        The writer also creates the generation's directory and removes the
+        directories of older generations.
+        """
+        payload = self.get(generation, key)
+        if payload is not None:
+            return payload
+        with self._refresh_lock():
+            payload = self.get(generation, key)
+            if payload is not None:
+                return payload
+            self._generation_dir(generation).mkdir(exist_ok=True)
+            payload = build()
+            self.put(generation, key, payload)
+            self._remove_older(generation)
+        return payload
+
+    def _remove_older(self, generation: int) -> None:
+        for path in self.directory.glob(f"{_GENERATION_PREFIX}*"):
+            suffix = path.name[len(_GENERATION_PREFIX):]
+            if suffix.isdigit() and int(suffix) < generation:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def clear(self) -> None:
+        with self._refresh_lock():
+            for path in self.directory.glob(f"{_GENERATION_PREFIX}*"):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _open_shared_cache() -> Optional[SharedCache]:
+    if not SHARED_CACHE_DIR:
+        return None
+    # Separate databases (e.g. staging and a local copy) must not share entries.
+    database = hashlib.sha256(DATABASE_URL.encode("utf-8")).hexdigest()[:16]
+    return SharedCache(Path(SHARED_CACHE_DIR) / database, SHARED_CACHE_MAX_BYTES)
+
+
+shared_cache = _open_shared_cache()
+
+
+__all__ = ["SharedCache", "shared_cache"]
@@ -0,0 +1,254 @@
+"""
+Wall time, throughput and peak memory of the ETL stages at several input sizes.
+
+Benchmarks ``extract_data``, ``transform_data`` (default and ``compact=True``),
+``apply_fare_outlier_detection``, ``find_extreme_trips`` and ``load_trips`` on
+input from ``etl.synthetic``, writes the results as JSON and compares them with
+a stored baseline. A stage/size whose time or peak memory grew by more than
+``--threshold`` is a regression, and the command exits with status 1.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.etl --sizes 100000 1000000 10000000
+    python -m benchmarks.etl --sizes 100000 --update-baseline
+
+``load_trips`` runs against a throwaway SQLite file unless ``--database-url``
+names another database (e.g. a local PostgreSQL); its tables are dropped and
+recreated, so never point it at real data. Baselines are machine specific:
+refresh them with ``--update-baseline`` on the box that runs the comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "etl.json"
+STAGES = (
+    "extract_data",
+    "transform_data",
+    "transform_data_compact",
+    "apply_fare_outlier_detection",
+    "find_extreme_trips",
+    "load_trips",
+)
+
+
+def _zone_lookup() -> pd.DataFrame:
+    ids = np.arange(1, 266)
+    return pd.DataFrame(
+        {
+            "LocationID": ids,
+            "Borough": np.array(["Manhattan", "Brooklyn", "Queens", "Bronx"])[ids % 4],
+            "Zone": [f"Zone {i}" for i in ids],
+            "service_zone": "Boro Zone",
+        }
+    )
+
+
+def _measure(
+    run: Callable[[], object],
+    rows: int,
+    repeat: int,
+    trace_memory: bool,
+    setup: Callable[[], None] | None = None,
+) -> Dict[str, float]:
+    """
+    Best wall time of ``repeat`` untraced runs, plus one traced run for peak memory.
+
+    The peak counts only what ``run`` allocates beyond what ``setup`` left behind.
+    """
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+    seconds = min(timings)
+    result = {
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+    }
+    if trace_memory:
+        # tracemalloc sees numpy/pandas buffers but slows Python code down,
+        # so the peak is taken from a separate run.
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                if setup:
+                    setup()
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                run()
+            _, peak = tracemalloc.get_traced_memory()
+            peak -= before
+        finally:
+            tracemalloc.stop()
+        result["peak_mb"] = round(peak / 2**20, 2)
+    return result
+
+
+def run_benchmarks(
+    sizes, stages, repeat: int, trace_memory: bool, workdir: Path
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    from app.db.config import SessionLocal, engine
+    from app.models import Base
+    from app.utils.algorithm_integration import apply_fare_outlier_detection, find_extreme_trips
+    from etl.extract import extract_data
+    from etl.load import load_locations, load_trips, load_vendors
+    from etl.synthetic import generate
+    from etl.transform import transform_data
+
+    raw_dir = workdir / "data" / "raw"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    results: Dict[str, Dict[str, Dict[str, float]]] = {stage: {} for stage in stages}
+
+    for rows in sizes:
+        print(f"Preparing {rows:,} rows...", flush=True)
+        for stale in raw_dir.glob("*.parquet"):
+            stale.unlink()
+        generate(raw_dir, rows)
+        # extract_data reads data/raw relative to the working directory.
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.chdir(workdir):
+            raw = extract_data(n_rows_per_file=rows)
+            transformed = transform_data(raw)
+        trips = transformed.reset_index(drop=True)
+        trips["trip_id"] = np.arange(1, len(trips) + 1)
+        trips["trip_duration"] = trips["trip_duration"].astype(float).round().astype("Int64")
+
+        def extract():
+            with contextlib.chdir(workdir):
+                return extract_data(n_rows_per_file=rows)
+
+        # The compact transform consumes its input; each run gets a fresh copy.
+        compact_input = {}
+
+        def copy_raw():
+            compact_input["raw"] = raw.copy()
+
+        def reset_database():
+            Base.metadata.drop_all(bind=engine)
+            Base.metadata.create_all(bind=engine)
+            with SessionLocal() as session:
+                load_locations(session, _zone_lookup())
+                load_vendors(session, trips)
+
+        def load():
+            with SessionLocal() as session:
+                load_trips(session, trips, batch_size=1_000)
+
+        runs = {
+            "extract_data": extract,
+            "transform_data": lambda: transform_data(raw),
+            "transform_data_compact": lambda: transform_data(compact_input.pop("raw"), compact=True),
+            "apply_fare_outlier_detection": lambda: apply_fare_outlier_detection(
+                trips.drop(columns="is_fare_outlier")
+            ),
+            "find_extreme_trips": lambda: find_extreme_trips(trips),
+            "load_trips": load,
+        }
+        for stage in stages:
+            stage_rows = len(raw) if stage.startswith(("extract", "transform")) else len(trips)
+            setup = {"load_trips": reset_database, "transform_data_compact": copy_raw}.get(stage)
+            result = _measure(runs[stage], stage_rows, repeat, trace_memory, setup)
+            result["rows"] = stage_rows
+            results[stage][str(rows)] = result
+            print(
+                f"  {stage:<30}{result['seconds']:>10.3f}s"
+                f"{result['rows_per_second'] or 0:>14,.0f} rows/s"
+                + (f"{result['peak_mb']:>10.1f} MB" if "peak_mb" in result else ""),
+                flush=True,
+            )
+    return results
+
+
+def compare(results, baseline, threshold: float) -> list[str]:
+    """Stage/size pairs whose time or peak memory grew by more than ``threshold``."""
+    regressions = []
+    for stage, by_size in results.items():
+        for size, current in by_size.items():
+            reference = baseline.get("results", {}).get(stage, {}).get(size)
+            if not reference:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                before, after = reference.get(metric), current.get(metric)
+                if before and after and after > before * (1 + threshold):
+                    regressions.append(
+                        f"{stage} @ {int(size):,} rows: {metric} {before} -> {after} "
+                        f"(+{(after / before - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+                        help="Input rows per run.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per stage; the best counts.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced peak-memory run.")
+    parser.add_argument("--database-url", help="Database for load_trips (default: a temporary SQLite file).")
+    parser.add_argument("--output", type=Path, help="JSON file for the results.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed growth in time or memory before a run counts as a regression.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline.")
+    args = parser.parse_args()
+
+    # transform_data's pandas deprecation warnings would drown the report.
+    warnings.simplefilter("ignore", FutureWarning)
+    workdir = Path(tempfile.mkdtemp(prefix="etl-bench-"))
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir / 'bench.db'}"
+
+    results = run_benchmarks(args.sizes, args.stages, args.repeat, not args.no_memory, workdir)
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
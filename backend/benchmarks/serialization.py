@@ -0,0 +1,156 @@
+"""
+Per-request CPU cost of serializing 1,000-row trip pages.
+
+Compares the previous list endpoint pipeline (ORM entities validated through
+``List[TripOut]`` and rendered by FastAPI's JSON response) with the column
+tuple fast path used by the routes now (orjson and Arrow IPC encoders).
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.serialization --rows 50000 --page-size 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _seed(session, n_rows: int) -> None:
+    from backend.app.models import Location, Trip, Vendor
+    import random
+
+    rng = random.Random(42)
+    session.add_all([Vendor(vendor_id=v) for v in ("HV0003", "HV0005", "1", "2")])
+    session.add_all([Location(location_id=i, zone=f"Zone {i}") for i in range(1, 266)])
+    start = datetime(2025, 1, 1)
+    rows = []
+    for _ in range(n_rows):
+        pickup = start + timedelta(seconds=rng.randrange(31 * 24 * 3600))
+        hours = round(rng.uniform(0.05, 1.5), 2)
+        miles = round(rng.uniform(0.3, 25), 2)
+        rows.append(
+            {
+                "vendor_id": rng.choice(("HV0003", "HV0005", "1", "2")),
+                "pickup_id": rng.randint(1, 265),
+                "dropoff_id": rng.randint(1, 265),
+                "request_datetime": pickup - timedelta(minutes=4),
+                "pickup_datetime": pickup,
+                "dropoff_datetime": pickup + timedelta(hours=hours),
+                "trip_miles": miles,
+                "trip_duration_hours": hours,
+                "trip_duration": int(hours * 3600),
+                "average_speed_mph": round(miles / hours, 2),
+                "base_passenger_fare": round(3 + miles * 2.4, 2),
+                "driver_pay": round(miles * 1.7, 2),
+                "total_extra_charges": round(rng.uniform(0, 8), 2),
+            }
+        )
+    session.commit()
+    session.bulk_insert_mappings(Trip, rows)
+    session.commit()
+
+
+def _cpu_ms(fn: Callable[[], bytes], repeat: int) -> tuple[float, int]:
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        start = time.process_time()
+        size = len(fn())
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples), size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=50_000, help="Trips to seed.")
+    parser.add_argument("--page-size", type=int, default=1_000, help="Rows per request.")
+    parser.add_argument("--repeat", type=int, default=30, help="Requests per pipeline.")
+    parser.add_argument("--output", type=Path, help="Optional JSON file for the results.")
+    args = parser.parse_args()
+
+    db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from pydantic import TypeAdapter
+
+    from backend.app.db.config import SessionLocal, engine
+    from backend.app.models import Base, Trip
+    from backend.app.schemas import TripOut
+    from backend.app.utils.serializers import TRIP_COLUMNS, encode_arrow, encode_json
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        _seed(session, args.rows)
+
+    adapter = TypeAdapter(List[TripOut])
+    pages = max(1, args.rows // args.page_size)
+
+    def page_query(session, request_no: int):
+        offset = (request_no % pages) * args.page_size
+        return session.query(Trip).order_by(Trip.pickup_datetime.desc()).offset(offset).limit(args.page_size)
+
+    counter = {"n": 0}
+
+    def orm_pydantic() -> bytes:
+        # What FastAPI does for ``response_model=List[TripOut]``.
+        counter["n"] += 1
+        with SessionLocal() as session:
+            trips = page_query(session, counter["n"]).all()
+            validated = adapter.validate_python(trips, from_attributes=True)
+            content = adapter.dump_python(validated, mode="json")
+            return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def tuples_json() -> bytes:
+        counter["n"] += 1
+        with SessionLocal() as session:
+            rows = page_query(session, counter["n"]).with_entities(*TRIP_COLUMNS).all()
+            return encode_json(rows)
+
+    def tuples_arrow() -> bytes:
+        counter["n"] += 1
+        with SessionLocal() as session:
+            rows = page_query(session, counter["n"]).with_entities(*TRIP_COLUMNS).all()
+            return encode_arrow(rows)
+
+    # Warm-up, and a check that both JSON pipelines render the same document.
+    reference = orm_pydantic()
+    counter["n"] = 0
+    if json.loads(reference) != json.loads(tuples_json()):
+        raise SystemExit("fast path JSON differs from the TripOut rendering")
+    results = {}
+    for name, fn in (
+        ("orm+pydantic (before)", orm_pydantic),
+        ("tuples+orjson (after)", tuples_json),
+        ("tuples+arrow (after)", tuples_arrow),
+    ):
+        counter["n"] = 0
+        cpu_ms, size = _cpu_ms(fn, args.repeat)
+        results[name] = {"cpu_ms_per_request": round(cpu_ms, 3), "response_bytes": size}
+
+    baseline = results["orm+pydantic (before)"]["cpu_ms_per_request"]
+    print(f"{args.page_size:,}-row pages over {args.rows:,} trips, median of {args.repeat} requests")
+    print(f"{'pipeline':<24}{'CPU ms/req':>12}{'bytes':>12}{'speedup':>10}")
+    for name, result in results.items():
+        speedup = baseline / result["cpu_ms_per_request"] if result["cpu_ms_per_request"] else float("inf")
+        result["speedup"] = round(speedup, 2)
+        print(f"{name:<24}{result['cpu_ms_per_request']:>12.2f}{result['response_bytes']:>12,}{speedup:>9.1f}x")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
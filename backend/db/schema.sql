@@ -1,6 +1,14 @@
 -- Urban Mobility Database Schema
 -- Normalized schema for NYC Taxi Trip data
 
+DROP TABLE IF EXISTS derived_refreshes;
+DROP TABLE IF EXISTS partition_changes;
+DROP TABLE IF EXISTS etl_runs;
+DROP TABLE IF EXISTS od_matrix;
+DROP TABLE IF EXISTS metric_histograms;
+DROP TABLE IF EXISTS trip_sample_strata;
+DROP TABLE IF EXISTS trip_samples;
+DROP TABLE IF EXISTS trip_rollups;
 DROP TABLE IF EXISTS trips;
 DROP TABLE IF EXISTS locations;
 DROP TABLE IF EXISTS vendors;
@@ -47,9 +55,157 @@ CREATE TABLE trips (
     FOREIGN KEY (pickup_id) REFERENCES locations(location_id),
     FOREIGN KEY (dropoff_id) REFERENCES locations(location_id),
     
-    INDEX idx_vendor (vendor_id),
-    INDEX idx_pickup (pickup_id),
-    INDEX idx_dropoff (dropoff_id),
-    INDEX idx_pickup_datetime (pickup_datetime)
+    -- Filter column first, pickup_datetime second: filtered date ranges and
+    -- the default newest-first ordering become index range scans.
+    INDEX idx_vendor_pickup_datetime (vendor_id, pickup_datetime),
+    INDEX idx_pickup_pickup_datetime (pickup_id, pickup_datetime),
+    INDEX idx_dropoff_pickup_datetime (dropoff_id, pickup_datetime),
+    INDEX idx_pickup_datetime (pickup_datetime),
+    -- Sort orders of GET /api/trips?sort_by=...; trip_id breaks ties.
+    INDEX idx_trip_miles (trip_miles, trip_id),
+    INDEX idx_trip_duration_hours (trip_duration_hours, trip_id),
+    INDEX idx_average_speed_mph (average_speed_mph, trip_id),
+    INDEX idx_base_passenger_fare (base_passenger_fare, trip_id),
+    INDEX idx_driver_pay (driver_pay, trip_id)
     
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Hourly pre-aggregates per vendor and pickup zone (built by the ETL).
+-- Rows are additive: each load appends the rollups of its own batch, so
+-- readers always SUM over (pickup_hour, vendor_id, pickup_id).
+CREATE TABLE trip_rollups (
+    rollup_id INT PRIMARY KEY AUTO_INCREMENT,
+
+    pickup_hour DATETIME DEFAULT NULL,
+    vendor_id VARCHAR(10) NOT NULL,
+    pickup_id INT NOT NULL,
+
+    trip_count INT NOT NULL DEFAULT 0,
+    trip_miles_sum DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    trip_miles_count INT NOT NULL DEFAULT 0,
+    trip_duration_hours_sum DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    trip_duration_hours_count INT NOT NULL DEFAULT 0,
+    average_speed_mph_sum DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    average_speed_mph_count INT NOT NULL DEFAULT 0,
+    base_passenger_fare_sum DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    base_passenger_fare_count INT NOT NULL DEFAULT 0,
+    driver_pay_sum DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    driver_pay_count INT NOT NULL DEFAULT 0,
+    total_extra_charges_sum DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    total_extra_charges_count INT NOT NULL DEFAULT 0,
+    base_passenger_fare_min DECIMAL(8, 2) DEFAULT NULL,
+    base_passenger_fare_max DECIMAL(8, 2) DEFAULT NULL,
+    fare_outlier_count INT NOT NULL DEFAULT 0,
+
+    INDEX idx_rollup_hour_vendor (pickup_hour, vendor_id),
+    INDEX idx_rollup_vendor_hour (vendor_id, pickup_hour),
+    INDEX idx_rollup_pickup_hour (pickup_id, pickup_hour)
+
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Sparse origin-destination matrix per month, hour of day and vendor (built
+-- by the ETL). Only observed pickup/dropoff pairs are stored; rows are
+-- additive like trip_rollups and read with SUM.
+CREATE TABLE od_matrix (
+    cell_id INT PRIMARY KEY AUTO_INCREMENT,
+
+    pickup_month DATE DEFAULT NULL,
+    hour_of_day TINYINT DEFAULT NULL,
+    vendor_id VARCHAR(10) NOT NULL,
+    pickup_id INT NOT NULL,
+    dropoff_id INT NOT NULL,
+
+    trip_count INT NOT NULL DEFAULT 0,
+    base_passenger_fare_sum DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    base_passenger_fare_count INT NOT NULL DEFAULT 0,
+    trip_duration_hours_sum DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    trip_duration_hours_count INT NOT NULL DEFAULT 0,
+    average_speed_mph_sum DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    average_speed_mph_count INT NOT NULL DEFAULT 0,
+
+    INDEX idx_od_pickup_dropoff (pickup_id, dropoff_id),
+    INDEX idx_od_dropoff_pickup (dropoff_id, pickup_id),
+    INDEX idx_od_vendor_hour (vendor_id, hour_of_day),
+    INDEX idx_od_month (pickup_month)
+
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Stratified random sample of trips for approximate (approx=true) queries.
+-- Strata are (vendor_id, sample_month); weight = trips each row stands for.
+CREATE TABLE trip_samples (
+    sample_id INT PRIMARY KEY AUTO_INCREMENT,
+
+    vendor_id VARCHAR(10) NOT NULL,
+    sample_month DATE DEFAULT NULL,
+    weight DOUBLE NOT NULL,
+
+    pickup_id INT NOT NULL,
+    dropoff_id INT NOT NULL,
+    pickup_datetime DATETIME DEFAULT NULL,
+    trip_miles DECIMAL(6, 2) DEFAULT NULL,
+    trip_duration_hours DECIMAL(5, 2) DEFAULT NULL,
+    average_speed_mph DECIMAL(5, 2) DEFAULT NULL,
+    base_passenger_fare DECIMAL(8, 2) DEFAULT NULL,
+    driver_pay DECIMAL(8, 2) DEFAULT NULL,
+    total_extra_charges DECIMAL(8, 2) DEFAULT NULL,
+    is_fare_outlier BOOLEAN DEFAULT FALSE,
+
+    INDEX idx_sample_vendor_month (vendor_id, sample_month),
+    INDEX idx_sample_pickup_datetime (pickup_id, pickup_datetime),
+    INDEX idx_sample_dropoff_datetime (dropoff_id, pickup_datetime)
+
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Population (N) and sample (n) size per trip_samples stratum, used for
+-- the variance of the estimates.
+CREATE TABLE trip_sample_strata (
+    stratum_id INT PRIMARY KEY AUTO_INCREMENT,
+    vendor_id VARCHAR(10) NOT NULL,
+    sample_month DATE DEFAULT NULL,
+    population_count INT NOT NULL,
+    sample_count INT NOT NULL,
+
+    INDEX idx_stratum_vendor_month (vendor_id, sample_month)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Log-binned histograms of fare, duration and speed per (vendor, pickup zone,
+-- month); bin edges are defined in app/utils/histograms.py. Only non-empty
+-- bins are stored and rows are additive (merged with SUM).
+CREATE TABLE metric_histograms (
+    histogram_id INT PRIMARY KEY AUTO_INCREMENT,
+    metric VARCHAR(32) NOT NULL,
+    pickup_month DATE DEFAULT NULL,
+    vendor_id VARCHAR(10) NOT NULL,
+    pickup_id INT NOT NULL,
+    bin_index SMALLINT NOT NULL,
+    trip_count INT NOT NULL DEFAULT 0,
+
+    INDEX idx_histogram_metric_vendor_month (metric, vendor_id, pickup_month),
+    INDEX idx_histogram_metric_pickup_month (metric, pickup_id, pickup_month)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- One row per completed ETL load; MAX(run_id) is the data generation the
+-- API uses to refresh its in-process caches.
+CREATE TABLE etl_runs (
+    run_id INT PRIMARY KEY AUTO_INCREMENT,
+    started_at DATETIME NOT NULL,
+    finished_at DATETIME NOT NULL,
+    trips_loaded INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Pickup months each ETL run added trips to; etl.refresh rebuilds the
+-- derived tables of the months changed since its watermark.
+CREATE TABLE partition_changes (
+    change_id INT PRIMARY KEY AUTO_INCREMENT,
+    run_id INT NOT NULL,
+    pickup_month DATE NULL,
+    trips_loaded INT NOT NULL DEFAULT 0,
+    INDEX idx_partition_change_run (run_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Per refresh job, the last ETL run whose changes it has applied.
+CREATE TABLE derived_refreshes (
+    job VARCHAR(32) PRIMARY KEY,
+    last_run_id INT NOT NULL DEFAULT 0,
+    refreshed_at DATETIME NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
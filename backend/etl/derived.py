@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete
+
+from app.models import (
+    MetricHistogramBin,
+    OdMatrixCell,
+    Trip,
+    TripRollup,
+    TripSample,
+    TripSampleStratum,
+)
+from app.utils.histograms import HISTOGRAM_SCHEMES
+
+
+# Trip metrics pre-aggregated into ``trip_rollups`` as ``<column>_sum`` and
+# ``<column>_count`` pairs, so averages over any slice stay exact.
+ROLLUP_METRICS = (
+    "trip_miles",
+    "trip_duration_hours",
+    "average_speed_mph",
+    "base_passenger_fare",
+    "driver_pay",
+    "total_extra_charges",
+)
+
+ROLLUP_GRAIN = ["pickup_hour", "vendor_id", "pickup_id"]
+
+# Metrics averaged per origin-destination cell in ``od_matrix``.
+OD_METRICS = ("base_passenger_fare", "trip_duration_hours", "average_speed_mph")
+
+OD_GRAIN = ["pickup_month", "hour_of_day", "vendor_id", "pickup_id", "dropoff_id"]
+
+HISTOGRAM_GRAIN = ["metric", "pickup_month", "vendor_id", "pickup_id", "bin_index"]
+
+# ``trip_samples`` keeps this share of every (vendor, month) stratum, but never
+# fewer than ``SAMPLE_MIN_PER_STRATUM`` trips (or the whole stratum if smaller).
+SAMPLE_FRACTION = 0.01
+SAMPLE_MIN_PER_STRATUM = 200
+SAMPLE_STRATA = ["vendor_id", "sample_month"]
+SAMPLE_METRICS = (
+    "trip_miles",
+    "trip_duration_hours",
+    "average_speed_mph",
+    "base_passenger_fare",
+    "driver_pay",
+    "total_extra_charges",
+)
+
+
+def _column_limit(column: str) -> float:
+    """Largest absolute value a ``Numeric`` trip column can hold."""
+    numeric = Trip.__table__.c[column].type
+    return 10 ** (numeric.precision - numeric.scale) - 10 ** -numeric.scale
+
+
+def stored_metric(trip_df: pd.DataFrame, column: str) -> pd.Series:
+    """
+    Return ``column`` as the database will store it.
+
+    Mirrors ``load._safe_decimal``: values are rounded to the column scale and
+    anything that does not fit the column (or is not finite) becomes NaN.
+    """
+    numeric = Trip.__table__.c[column].type
+    values = pd.to_numeric(trip_df[column], errors="coerce").astype(float).round(numeric.scale)
+    return values.where(values.abs() <= _column_limit(column))
+
+
+def build_trip_rollups(trip_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate a cleaned trip frame to the ``trip_rollups`` grain.
+
+    Parameters
+    ----------
+    trip_df : pd.DataFrame
+        Trips as loaded by ``load_trips`` (``PULocationID`` etc. column names).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per (pickup_hour, vendor_id, pickup_id) with counts and sums.
+    """
+    frame = pd.DataFrame(
+        {
+            "pickup_hour": pd.to_datetime(trip_df["pickup_datetime"], errors="coerce").dt.floor("h"),
+            "vendor_id": trip_df["vendor_id"].astype(str),
+            "pickup_id": trip_df["PULocationID"].astype("int64"),
+        }
+    )
+    aggregations = {"trip_count": ("vendor_id", "size")}
+    for column in ROLLUP_METRICS:
+        values = stored_metric(trip_df, column)
+        frame[f"{column}_sum"] = values.fillna(0)
+        frame[f"{column}_count"] = values.notna().astype("int64")
+        aggregations[f"{column}_sum"] = (f"{column}_sum", "sum")
+        aggregations[f"{column}_count"] = (f"{column}_count", "sum")
+
+    fares = stored_metric(trip_df, "base_passenger_fare")
+    frame["base_passenger_fare_value"] = fares
+    aggregations["base_passenger_fare_min"] = ("base_passenger_fare_value", "min")
+    aggregations["base_passenger_fare_max"] = ("base_passenger_fare_value", "max")
+    if "is_fare_outlier" in trip_df:
+        outliers = trip_df["is_fare_outlier"].fillna(False).astype(bool)
+    else:
+        outliers = pd.Series(False, index=trip_df.index)
+    frame["fare_outlier_count"] = outliers.astype("int64")
+    aggregations["fare_outlier_count"] = ("fare_outlier_count", "sum")
+
+    rollups = frame.groupby(ROLLUP_GRAIN, dropna=False, sort=False).agg(**aggregations)
+    rollups = rollups.reset_index()
+    for column in ROLLUP_METRICS:
+        rollups[f"{column}_sum"] = rollups[f"{column}_sum"].round(2)
+    return rollups
+
+
+def merge_trip_rollups(rollups: pd.DataFrame) -> pd.DataFrame:
+    """Combine ``build_trip_rollups`` frames of disjoint trip chunks (concatenated)."""
+    aggregations = {"trip_count": "sum"}
+    for column in ROLLUP_METRICS:
+        aggregations[f"{column}_sum"] = "sum"
+        aggregations[f"{column}_count"] = "sum"
+    aggregations["base_passenger_fare_min"] = "min"
+    aggregations["base_passenger_fare_max"] = "max"
+    aggregations["fare_outlier_count"] = "sum"
+    merged = rollups.groupby(ROLLUP_GRAIN, dropna=False, sort=False).agg(aggregations).reset_index()
+    for column in ROLLUP_METRICS:
+        merged[f"{column}_sum"] = merged[f"{column}_sum"].round(2)
+    return merged
+
+
+def build_od_matrix(trip_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate a cleaned trip frame to the sparse ``od_matrix`` grain.
+
+    Parameters
+    ----------
+    trip_df : pd.DataFrame
+        Trips as loaded by ``load_trips``.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per observed (pickup_month, hour_of_day, vendor_id,
+        pickup_id, dropoff_id) with a trip count and metric sums/counts.
+    """
+    pickup = pd.to_datetime(trip_df["pickup_datetime"], errors="coerce")
+    frame = pd.DataFrame(
+        {
+            "pickup_month": pickup.dt.to_period("M").dt.start_time.dt.date,
+            "hour_of_day": pickup.dt.hour.astype("Int64"),
+            "vendor_id": trip_df["vendor_id"].astype(str),
+            "pickup_id": trip_df["PULocationID"].astype("int64"),
+            "dropoff_id": trip_df["DOLocationID"].astype("int64"),
+        }
+    )
+    aggregations = {"trip_count": ("vendor_id", "size")}
+    for column in OD_METRICS:
+        values = stored_metric(trip_df, column)
+        frame[f"{column}_sum"] = values.fillna(0)
+        frame[f"{column}_count"] = values.notna().astype("int64")
+        aggregations[f"{column}_sum"] = (f"{column}_sum", "sum")
+        aggregations[f"{column}_count"] = (f"{column}_count", "sum")
+
+    cells = frame.groupby(OD_GRAIN, dropna=False, sort=False).agg(**aggregations)
+    cells = cells.reset_index()
+    for column in OD_METRICS:
+        cells[f"{column}_sum"] = cells[f"{column}_sum"].round(2)
+    return cells
+
+
+def merge_od_matrix(cells: pd.DataFrame) -> pd.DataFrame:
+    """Combine ``build_od_matrix`` frames of disjoint trip chunks (concatenated)."""
+    sums = ["trip_count"] + [f"{column}_{part}" for column in OD_METRICS for part in ("sum", "count")]
+    merged = cells.groupby(OD_GRAIN, dropna=False, sort=False)[sums].sum().reset_index()
+    for column in OD_METRICS:
+        merged[f"{column}_sum"] = merged[f"{column}_sum"].round(2)
+    return merged
+
+
+def build_metric_histograms(trip_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count trips per histogram bin for each metric in ``HISTOGRAM_SCHEMES``.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per non-empty (metric, pickup_month, vendor_id, pickup_id,
+        bin_index) with its trip count. Missing values are not counted.
+    """
+    pickup = pd.to_datetime(trip_df["pickup_datetime"], errors="coerce")
+    keys = pd.DataFrame(
+        {
+            "pickup_month": pickup.dt.to_period("M").dt.start_time.dt.date,
+            "vendor_id": trip_df["vendor_id"].astype(str),
+            "pickup_id": trip_df["PULocationID"].astype("int64"),
+        }
+    )
+    frames = []
+    for metric, scheme in HISTOGRAM_SCHEMES.items():
+        values = stored_metric(trip_df, metric)
+        present = values.notna()
+        frame = keys[present].copy()
+        frame["metric"] = metric
+        frame["bin_index"] = scheme.bin_index(values[present].to_numpy())
+        frames.append(frame)
+    combined = pd.concat(frames, ignore_index=True)
+    return (
+        combined.groupby(HISTOGRAM_GRAIN, dropna=False, sort=False)
+        .size()
+        .rename("trip_count")
+        .reset_index()
+    )
+
+
+def merge_metric_histograms(bins: pd.DataFrame) -> pd.DataFrame:
+    """Combine ``build_metric_histograms`` frames of disjoint trip chunks (concatenated)."""
+    return bins.groupby(HISTOGRAM_GRAIN, dropna=False, sort=False)["trip_count"].sum().reset_index()
+
+
+def _sample_target(population, fraction: float, min_per_stratum: int):
+    return np.minimum(population, np.maximum(min_per_stratum, np.ceil(population * fraction)))
+
+
+def _sample_frame(trip_df: pd.DataFrame) -> pd.DataFrame:
+    """A cleaned trip frame with the ``trip_samples`` columns."""
+    pickup = pd.to_datetime(trip_df["pickup_datetime"], errors="coerce")
+    frame = pd.DataFrame(
+        {
+            "vendor_id": trip_df["vendor_id"].astype(str),
+            "sample_month": pickup.dt.to_period("M").dt.start_time.dt.date,
+            "pickup_id": trip_df["PULocationID"].astype("int64"),
+            "dropoff_id": trip_df["DOLocationID"].astype("int64"),
+            "pickup_datetime": pickup,
+        }
+    )
+    for column in SAMPLE_METRICS:
+        frame[column] = stored_metric(trip_df, column)
+    if "is_fare_outlier" in trip_df:
+        frame["is_fare_outlier"] = trip_df["is_fare_outlier"].fillna(False).astype(bool)
+    else:
+        frame["is_fare_outlier"] = False
+    return frame
+
+
+def build_trip_sample(
+    trip_df: pd.DataFrame,
+    fraction: float = SAMPLE_FRACTION,
+    min_per_stratum: int = SAMPLE_MIN_PER_STRATUM,
+    seed: int | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Draw a stratified random sample of a cleaned trip frame.
+
+    Each (vendor_id, pickup month) stratum of N trips keeps
+    n = min(N, max(min_per_stratum, ceil(fraction * N))) trips chosen
+    uniformly at random, and every kept row gets weight N / n.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        ``trip_samples`` rows and ``trip_sample_strata`` rows (N and n).
+    """
+    frame = _sample_frame(trip_df)
+    strata = frame.groupby(SAMPLE_STRATA, dropna=False, sort=False)
+    population = strata["vendor_id"].transform("size")
+    target = _sample_target(population, fraction, min_per_stratum)
+
+    rng = np.random.default_rng(seed)
+    draw = pd.Series(rng.random(len(frame)), index=frame.index)
+    rank = draw.groupby([frame[key] for key in SAMPLE_STRATA], dropna=False).rank(method="first")
+    keep = rank <= target
+    sample = frame[keep].copy()
+    sample["weight"] = (population / target)[keep]
+
+    sizes = pd.concat(
+        [
+            strata.size().rename("population_count"),
+            sample.groupby(SAMPLE_STRATA, dropna=False, sort=False).size().rename("sample_count"),
+        ],
+        axis=1,
+    ).reset_index()
+    return sample, sizes
+
+
+class StratifiedSampler:
+    """
+    ``build_trip_sample`` for the trips of one pickup month, fed in chunks.
+
+    The strata populations (trips per vendor) must be known up front. Every
+    row draws a uniform key and each stratum keeps the rows with the
+    smallest keys seen so far, up to its sample size: once every chunk is
+    in, a uniform sample, and never more than the sample plus one chunk in
+    memory.
+    """
+
+    def __init__(
+        self,
+        month,
+        populations: dict[str, int],
+        fraction: float = SAMPLE_FRACTION,
+        min_per_stratum: int = SAMPLE_MIN_PER_STRATUM,
+        seed: int | None = None,
+    ) -> None:
+        self.month = month
+        self.populations = pd.Series(populations, dtype="int64")
+        self.targets = _sample_target(self.populations, fraction, min_per_stratum)
+        self._rng = np.random.default_rng(seed)
+        self._kept: pd.DataFrame | None = None
+
+    def add(self, trip_df: pd.DataFrame) -> None:
+        frame = _sample_frame(trip_df)
+        frame["draw"] = self._rng.random(len(frame))
+        if self._kept is not None:
+            frame = pd.concat([self._kept, frame], ignore_index=True)
+        rank = frame.groupby("vendor_id", sort=False)["draw"].rank(method="first")
+        self._kept = frame[rank <= frame["vendor_id"].map(self.targets)]
+
+    def result(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """``trip_samples`` and ``trip_sample_strata`` rows, as ``build_trip_sample`` returns them."""
+        if self._kept is None:
+            sample = pd.DataFrame()
+            sampled = pd.Series(0, index=self.populations.index)
+        else:
+            sample = self._kept.drop(columns="draw")
+            vendors = sample["vendor_id"]
+            sample["weight"] = vendors.map(self.populations) / vendors.map(self.targets)
+            sampled = vendors.value_counts().reindex(self.populations.index, fill_value=0)
+        sizes = pd.DataFrame(
+            {
+                "vendor_id": self.populations.index,
+                "sample_month": self.month,
+                "population_count": self.populations.to_numpy(),
+                "sample_count": sampled.to_numpy(),
+            }
+        )
+        return sample, sizes
+
+
+def _records(frame: pd.DataFrame) -> list[dict]:
+    records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    for record in records:
+        for key, value in record.items():
+            if hasattr(value, "to_pydatetime"):
+                record[key] = value.to_pydatetime()
+    return records
+
+
+def _insert_frame(session, model, frame: pd.DataFrame, batch_size: int) -> int:
+    records = _records(frame)
+    for start in range(0, len(records), batch_size):
+        session.bulk_insert_mappings(model, records[start:start + batch_size])
+        session.commit()
+    return len(records)
+
+
+def replace_rows(session, model, clause, frame: pd.DataFrame, batch_size: int = 5_000) -> int:
+    """
+    Replace the ``model`` rows matching ``clause`` with ``frame``.
+
+    Nothing is committed, so the caller can swap a whole partition in one
+    transaction and readers keep seeing the old rows until it commits.
+    """
+    session.execute(delete(model).where(clause))
+    records = _records(frame)
+    for start in range(0, len(records), batch_size):
+        session.bulk_insert_mappings(model, records[start:start + batch_size])
+    return len(records)
+
+
+def load_trip_rollups(session, trip_df: pd.DataFrame, batch_size: int = 5_000) -> None:
+    inserted = _insert_frame(session, TripRollup, build_trip_rollups(trip_df), batch_size)
+    print(f"Inserted {inserted:,} trip rollups.")
+
+
+def load_metric_histograms(session, trip_df: pd.DataFrame, batch_size: int = 5_000) -> None:
+    inserted = _insert_frame(session, MetricHistogramBin, build_metric_histograms(trip_df), batch_size)
+    print(f"Inserted {inserted:,} histogram bins.")
+
+
+def load_trip_sample(session, trip_df: pd.DataFrame, batch_size: int = 5_000) -> None:
+    sample, strata = build_trip_sample(trip_df)
+    inserted = _insert_frame(session, TripSample, sample, batch_size)
+    _insert_frame(session, TripSampleStratum, strata, batch_size)
+    print(f"Inserted {inserted:,} sampled trips in {len(strata):,} strata.")
+
+
+def load_od_matrix(session, trip_df: pd.DataFrame, batch_size: int = 5_000) -> None:
+    inserted = _insert_frame(session, OdMatrixCell, build_od_matrix(trip_df), batch_size)
+    print(f"Inserted {inserted:,} origin-destination cells.")
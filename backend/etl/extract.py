@@ -1,43 +1,278 @@
 #!/usr/bin/env python3
+"""
+Read the raw TLC parquet files in ``data/raw``.
+
+``start``/``end`` (pickup time, end exclusive) and ``vendors`` narrow the
+extract before anything is decoded: row groups whose min/max statistics
+rule them out are skipped, and the rest are filtered in Arrow before they
+become pandas frames. ``vendors`` match the ETL's ``vendor_id``: the HVFHS
+license number, else the dispatching base, else the taxi ``VendorID``.
+
+``sample`` decides which matching rows of each file make up its
+``n_rows_per_file`` (``None`` reads them all):
+
+- ``head``: the leading rows. Cheap, but a month's first days only.
+- ``random``: whole row groups picked at random from the file metadata;
+  only those are read and decoded.
+- ``stratified``: the row groups ordered by the min pickup time in their
+  statistics, split into equal strata and one picked at random from each,
+  so the sample spans the month.
+- ``reservoir``: a uniform sample of single rows, in one streaming pass
+  over the file (reservoir sampling). Reads everything, but holds no more
+  than the sample and one batch.
+
+``random`` and ``stratified`` cut a sample larger than ``n_rows_per_file``
+down to a uniform subset of its rows; with ``start``/``end``/``vendors``
+they pick among the row groups that may match, so a sample can come out
+smaller. ``seed`` makes a sample repeatable.
+"""
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
+import numpy as np
 import pandas as pd
+from dataclasses import dataclass
 from pathlib import Path
 
 
-def extract_data(n_rows_per_file=100000):
-    raw_dir = Path("data/raw")
-    files = list(raw_dir.glob("*.parquet"))
-    if not files:
-        raise FileNotFoundError("No parquet files found in data/raw")
+SAMPLE_MODES = ("head", "random", "stratified", "reservoir")
 
-    print(f"Extracting data from {len(files)} file(s)...")
-    df_list = []
+# Pickup timestamp column of each TLC source (FHV/FHVHV, yellow, green).
+PICKUP_COLUMNS = ("pickup_datetime", "tpep_pickup_datetime", "lpep_pickup_datetime")
 
-    for f in files:
-        parquet_file = pq.ParquetFile(f)
+# Columns ``vendor_id`` is taken from, first non-null wins (as in transform_data).
+VENDOR_COLUMNS = ("hvfhs_license_num", "dispatching_base_num", "VendorID")
 
-        # Read only the first batch or up to n_rows_per_file rows
-        batches = []
-        rows_read = 0
-        for batch in parquet_file.iter_batches(batch_size=n_rows_per_file):
-            batches.append(batch.to_pandas())
-            rows_read += len(batch)
-            if rows_read >= n_rows_per_file:
-                break
+# Rows decoded at a time by the reservoir pass and filtered head reads.
+RESERVOIR_BATCH_SIZE = 65_536
 
-        df_sample = pd.concat(batches, ignore_index=True)
-        df_list.append(df_sample)
 
-    df = pd.concat(df_list, ignore_index=True)
-    print(f"Extracted {len(df):,} records.")
-    return df
+@dataclass(frozen=True)
+class _Filter:
+    start: object = None
+    end: object = None
+    vendors: frozenset = frozenset()
+
+    def __bool__(self):
+        return self.start is not None or self.end is not None or bool(self.vendors)
+
+
+def pickup_column(schema):
+    """Name of the pickup timestamp column in a parquet schema, or None."""
+    return next((name for name in PICKUP_COLUMNS if name in schema.names), None)
+
+
+def _column_statistics(metadata, column):
+    index = next(i for i in range(metadata.num_columns) if metadata.schema.column(i).path == column)
+    return [metadata.row_group(i).column(index).statistics for i in range(metadata.num_row_groups)]
+
+
+def row_group_stats(metadata, column):
+    """(min, max) of ``column`` per row group; None where a group has no statistics."""
+    if column is None:
+        return [None] * metadata.num_row_groups
+    return [
+        (statistics.min, statistics.max) if statistics is not None and statistics.has_min_max else None
+        for statistics in _column_statistics(metadata, column)
+    ]
+
+
+def _vendor_value(value, arrow_type):
+    """``value`` as the column's type, or None when no row can hold it."""
+    if pa.types.is_integer(arrow_type):
+        value = value[:-2] if value.endswith(".0") else value
+        return int(value) if value.lstrip("-").isdigit() else None
+    return value
+
 
+def _may_match(parquet_file, row_filter):
+    """Row groups whose statistics do not rule out a matching row."""
+    metadata = parquet_file.metadata
+    schema = parquet_file.schema_arrow
+    groups = list(range(metadata.num_row_groups))
+    if row_filter.start is not None or row_filter.end is not None:
+        column = pickup_column(schema)
+        if column is None:
+            return []
+        stats = row_group_stats(metadata, column)
+        groups = [
+            i for i in groups
+            if stats[i] is None
+            or not (
+                (row_filter.end is not None and stats[i][0] >= row_filter.end)
+                or (row_filter.start is not None and stats[i][1] < row_filter.start)
+            )
+        ]
+    present = [name for name in VENDOR_COLUMNS if name in schema.names]
+    if row_filter.vendors and present:
+        # Only the first column decides where it has no nulls; otherwise the
+        # fallback columns may hold the vendor and the group has to be read.
+        column = present[0]
+        values = [_vendor_value(v, schema.field(column).type) for v in row_filter.vendors]
+        values = [v for v in values if v is not None]
+        statistics = _column_statistics(metadata, column)
+        groups = [
+            i for i in groups
+            if statistics[i] is None
+            or not statistics[i].has_min_max
+            or not statistics[i].has_null_count
+            or statistics[i].null_count > 0
+            or any(statistics[i].min <= v <= statistics[i].max for v in values)
+        ]
+    return groups
 
 
+def _apply(table, row_filter):
+    """Rows of ``table`` matching ``row_filter``, filtered in Arrow."""
+    if not row_filter or table.num_rows == 0:
+        return table
+    masks = []
+    if row_filter.start is not None or row_filter.end is not None:
+        pickups = table[pickup_column(table.schema)]
+        if row_filter.start is not None:
+            masks.append(pc.greater_equal(pickups, pa.scalar(row_filter.start, pickups.type)))
+        if row_filter.end is not None:
+            masks.append(pc.less(pickups, pa.scalar(row_filter.end, pickups.type)))
+    if row_filter.vendors:
+        present = [table[name] for name in VENDOR_COLUMNS if name in table.schema.names]
+        if not present:
+            return table.slice(0, 0)
+        vendor_ids = pc.coalesce(*[pc.utf8_trim_whitespace(pc.cast(column, pa.string())) for column in present])
+        masks.append(pc.is_in(vendor_ids, value_set=pa.array(sorted(row_filter.vendors), pa.string())))
+    mask = masks[0]
+    for other in masks[1:]:
+        mask = pc.and_(mask, other)
+    return table.filter(mask)
 
 
+def _head(parquet_file, n_rows, groups, row_filter):
+    # Read only the first batch or up to n_rows rows
+    batches = []
+    rows_read = 0
+    batch_size = RESERVOIR_BATCH_SIZE if row_filter else n_rows
+    for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=groups):
+        if row_filter:
+            batch = _apply(pa.Table.from_batches([batch]), row_filter).slice(0, n_rows - rows_read)
+        batches.append(batch.to_pandas())
+        rows_read += len(batch)
+        if rows_read >= n_rows:
+            break
+    return pd.concat(batches, ignore_index=True)
 
 
+def _groups_needed(metadata, groups, n_rows):
+    mean_rows = sum(metadata.row_group(i).num_rows for i in groups) / len(groups)
+    return min(len(groups), max(1, int(np.ceil(n_rows / mean_rows))))
 
 
-    
+def _random_groups(metadata, groups, n_rows, rng):
+    """``groups`` in random order until they hold ``n_rows``."""
+    chosen, rows = [], 0
+    for i in rng.permutation(groups):
+        chosen.append(int(i))
+        rows += metadata.row_group(int(i)).num_rows
+        if rows >= n_rows:
+            break
+    return sorted(chosen)
+
+
+def _stratified_groups(metadata, groups, n_rows, rng, column):
+    """One random row group from each of as many pickup-time strata as ``n_rows`` needs."""
+    starts = row_group_stats(metadata, column)
+    # Groups without statistics keep their place in the file, which TLC writes in time order.
+    ordered = sorted(groups, key=lambda i: (starts[i] is None, starts[i][0] if starts[i] is not None else i))
+    strata = np.array_split(ordered, _groups_needed(metadata, ordered, n_rows))
+    return sorted(int(rng.choice(stratum)) for stratum in strata if len(stratum))
+
+
+def _subsample(table, n_rows, rng):
+    if table.num_rows <= n_rows:
+        return table
+    return table.take(pa.array(np.sort(rng.choice(table.num_rows, n_rows, replace=False))))
+
+
+def _reservoir(parquet_file, n_rows, rng, groups=None, row_filter=_Filter()):
+    """Uniform sample of ``n_rows`` matching rows (algorithm R, one batch at a time)."""
+    reservoir = None
+    seen = 0
+    for batch in parquet_file.iter_batches(batch_size=RESERVOIR_BATCH_SIZE, row_groups=groups):
+        table = _apply(pa.Table.from_batches([batch]), row_filter)
+        size = table.num_rows
+        fill = min(size, max(0, n_rows - seen))
+        if fill:
+            head = table.slice(0, fill)
+            reservoir = head if reservoir is None else pa.concat_tables([reservoir, head])
+        if fill < size:
+            # Row t of the stream (0-based) replaces slot j, uniform in [0, t], when j < n_rows.
+            slots = rng.integers(0, np.arange(seen + fill, seen + size) + 1)
+            rows = np.flatnonzero(slots < n_rows) + fill
+            slots = slots[slots < n_rows]
+            # A slot hit twice in one batch ends up with the later row.
+            _, last = np.unique(slots[::-1], return_index=True)
+            picked = len(slots) - 1 - last
+            keep = np.ones(n_rows, dtype=bool)
+            keep[slots[picked]] = False
+            reservoir = pa.concat_tables([reservoir.filter(pa.array(keep)), table.take(pa.array(rows[picked]))])
+            if reservoir.column(0).num_chunks > 64:
+                reservoir = reservoir.combine_chunks()
+        seen += size
+    if reservoir is None:
+        return parquet_file.schema_arrow.empty_table()
+    return reservoir
+
+
+def _read(parquet_file, n_rows, sample, rng, row_filter):
+    groups = _may_match(parquet_file, row_filter) if row_filter else list(range(parquet_file.metadata.num_row_groups))
+    if not groups:
+        return None
+    if n_rows is None:
+        return _apply(parquet_file.read_row_groups(groups), row_filter).to_pandas()
+    if sample == "head":
+        return _head(parquet_file, n_rows, groups, row_filter)
+    if sample == "reservoir":
+        table = _reservoir(parquet_file, n_rows, rng, groups, row_filter)
+    else:
+        metadata = parquet_file.metadata
+        if sample == "random":
+            chosen = _random_groups(metadata, groups, n_rows, rng)
+        else:
+            chosen = _stratified_groups(metadata, groups, n_rows, rng, pickup_column(parquet_file.schema_arrow))
+        table = _subsample(_apply(parquet_file.read_row_groups(chosen), row_filter), n_rows, rng)
+    return table.to_pandas()
+
+
+def extract_data(n_rows_per_file=100000, sample="head", seed=None, start=None, end=None, vendors=None):
+    if sample not in SAMPLE_MODES:
+        raise ValueError(f"sample must be one of {SAMPLE_MODES}, got {sample!r}")
+
+    raw_dir = Path("data/raw")
+    files = list(raw_dir.glob("*.parquet"))
+    if not files:
+        raise FileNotFoundError("No parquet files found in data/raw")
+
+    print(f"Extracting data from {len(files)} file(s)...")
+    rng = np.random.default_rng(seed)
+    row_filter = _Filter(start, end, frozenset(str(vendor) for vendor in vendors or ()))
+    df_list = []
+    skipped = []
+
+    for f in sorted(files):
+        parquet_file = pq.ParquetFile(f)
+        if parquet_file.metadata.num_rows == 0:
+            continue
+        df_sample = _read(parquet_file, n_rows_per_file, sample, rng, row_filter)
+        if df_sample is None or df_sample.empty:
+            print(f"  {f.name}: no matching rows.")
+            skipped.append(parquet_file.schema_arrow.empty_table().to_pandas())
+            continue
+        df_list.append(df_sample)
+
+    if not df_list:
+        raise ValueError("No rows in data/raw match the extract filters")
+    df = pd.concat(df_list, ignore_index=True)
+    # transform_data expects the columns of every source, matched or not.
+    for empty in skipped:
+        for column in empty.columns.difference(df.columns, sort=False):
+            df[column] = empty[column].reindex(df.index)
+    print(f"Extracted {len(df):,} records ({sample} sample).")
+    return df
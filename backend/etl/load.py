@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
 import pandas as pd
@@ -8,7 +9,27 @@ from sqlalchemy import delete
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.db.config import SessionLocal, engine
-from app.models import Location, Trip, Vendor, Base
+from app.models import (
+    Base,
+    DerivedRefresh,
+    EtlRun,
+    Location,
+    MetricHistogramBin,
+    OdMatrixCell,
+    PartitionChange,
+    Trip,
+    TripRollup,
+    TripSample,
+    TripSampleStratum,
+    Vendor,
+)
+
+from .derived import (
+    load_metric_histograms,
+    load_od_matrix,
+    load_trip_rollups,
+    load_trip_sample,
+)
 
 
 DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "cleaned"
@@ -67,9 +88,13 @@ def _normalize_vendor_id(value) -> str | None:
 
 
 def load_locations(session, lookup_df: pd.DataFrame) -> None:
+    # Appending loads (--no-reset) keep the rows already there.
+    existing = {location_id for (location_id,) in session.query(Location.location_id)}
     records = []
 
     for row in lookup_df.itertuples(index=False):
+        if int(row.LocationID) in existing:
+            continue
         records.append(
             Location(
                 location_id=int(row.LocationID),
@@ -86,7 +111,8 @@ def load_locations(session, lookup_df: pd.DataFrame) -> None:
 
 def load_vendors(session, trip_df: pd.DataFrame) -> None:
     vendor_series = trip_df["vendor_id"].dropna().astype(str).str.strip()
-    vendor_ids = sorted({vendor for vendor in vendor_series if vendor})
+    existing = {vendor_id for (vendor_id,) in session.query(Vendor.vendor_id)}
+    vendor_ids = sorted({vendor for vendor in vendor_series if vendor} - existing)
     records = [
         Vendor(
             vendor_id=vendor_id,
@@ -99,7 +125,7 @@ def load_vendors(session, trip_df: pd.DataFrame) -> None:
     print(f"Inserted {len(records):,} vendors.")
 
 
-def load_trips(session, trip_df: pd.DataFrame, batch_size: int = 1_000) -> None:
+def load_trips(session, trip_df: pd.DataFrame, batch_size: int = 1_000) -> int:
     total = 0
     batch: list[Trip] = []
 
@@ -143,38 +169,92 @@ def load_trips(session, trip_df: pd.DataFrame, batch_size: int = 1_000) -> None:
         total += len(batch)
 
     print(f"Inserted {total:,} trips.")
+    return total
+
+
+def record_etl_run(session, started_at: datetime, trips_loaded: int) -> int:
+    """Record a finished load; bumps the data generation the API watches."""
+    run = EtlRun(started_at=started_at, finished_at=datetime.now(), trips_loaded=trips_loaded)
+    session.add(run)
+    session.commit()
+    print(f"Recorded ETL run {run.run_id}.")
+    return run.run_id
+
+
+def record_partition_changes(session, run_id: int, trip_df: pd.DataFrame) -> None:
+    """Record the pickup months this run added trips to, for ``etl.refresh``."""
+    pickup = pd.to_datetime(trip_df["pickup_datetime"], errors="coerce")
+    months = pickup.dt.to_period("M").dt.start_time.dt.date
+    counts = months.value_counts(dropna=False)
+    session.add_all(
+        PartitionChange(
+            run_id=run_id,
+            pickup_month=None if pd.isna(month) else month,
+            trips_loaded=int(count),
+        )
+        for month, count in counts.items()
+    )
+    session.commit()
 
 
 def create_tables() -> None:
-    """Create all database tables if they don't exist."""
+    """Create all database tables if they don't exist, and indexes added since they were."""
     Base.metadata.create_all(bind=engine)
+    # create_all leaves existing tables alone, indexes included.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     print("Database tables created/verified.")
 
 
 def reset_tables(session) -> None:
+    session.execute(delete(TripRollup))
+    session.execute(delete(OdMatrixCell))
+    session.execute(delete(TripSample))
+    session.execute(delete(TripSampleStratum))
+    session.execute(delete(MetricHistogramBin))
+    session.execute(delete(PartitionChange))
+    session.execute(delete(DerivedRefresh))
     session.execute(delete(Trip))
     session.execute(delete(Location))
     session.execute(delete(Vendor))
     session.commit()
 
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Load cleaned CSV data into the database.")
-    parser.add_argument(
-        "--no-reset",
-        action="store_true",
-        help="Append to existing tables instead of clearing them first.",
-    )
-    parser.add_argument(
-        "--batch-size",
-        type=int,
-        default=1_000,
-        help="Number of trip rows to insert per batch.",
+def read_zone_lookup(path: Path = ZONE_LOOKUP_PATH) -> pd.DataFrame:
+    if not path.exists():
+        raise FileNotFoundError(f"Missing taxi zone lookup at {path}")
+    return (
+        pd.read_csv(path)
+        .rename(columns=lambda col: col.strip())
+        .drop_duplicates(subset=["LocationID"])
     )
-    return parser.parse_args()
+
+
+def read_cleaned_trips(path: Path = EXTRACTED_PATH) -> pd.DataFrame:
+    """The transformed CSV, with the rows and dtypes the loaders expect."""
+    if not path.exists():
+        raise FileNotFoundError(f"Missing extracted CSV at {path}")
+    trip_df = pd.read_csv(
+        path,
+        dtype={"vendor_id": "string"},
+        parse_dates=["request_datetime", "on_scene_datetime", "pickup_datetime", "dropoff_datetime"],
+        low_memory=False,
+    ).replace("", pd.NA)
+
+    # Ensure required fields are present and valid
+    trip_df["vendor_id"] = trip_df["vendor_id"].apply(_normalize_vendor_id)
+    trip_df = trip_df.dropna(subset=["vendor_id", "PULocationID", "DOLocationID"])
+    trip_df = trip_df[trip_df["vendor_id"].astype(str).str.len() > 0]
+    trip_df["PULocationID"] = trip_df["PULocationID"].astype("Int64")
+    trip_df["DOLocationID"] = trip_df["DOLocationID"].astype("Int64")
+    trip_df["trip_duration"] = trip_df["trip_duration"].round().astype("Int64")
+    return trip_df
 
 
 def load_data(no_reset: bool = False, batch_size: int = 1_000) -> None:
+    started_at = datetime.now()
+
     # Create tables if they don't exist
     create_tables()
     
@@ -185,30 +265,8 @@ def load_data(no_reset: bool = False, batch_size: int = 1_000) -> None:
             print("Clearing existing data...")
             reset_tables(session)
 
-        if not ZONE_LOOKUP_PATH.exists():
-            raise FileNotFoundError(f"Missing taxi zone lookup at {ZONE_LOOKUP_PATH}")
-        if not EXTRACTED_PATH.exists():
-            raise FileNotFoundError(f"Missing extracted CSV at {EXTRACTED_PATH}")
-
-        lookup_df = (
-            pd.read_csv(ZONE_LOOKUP_PATH)
-            .rename(columns=lambda col: col.strip())
-            .drop_duplicates(subset=["LocationID"])
-        )
-        trip_df = pd.read_csv(
-            EXTRACTED_PATH,
-            dtype={"vendor_id": "string"},
-            parse_dates=["request_datetime", "on_scene_datetime", "pickup_datetime", "dropoff_datetime"],
-            low_memory=False,
-        ).replace("", pd.NA)
-
-        # Ensure required fields are present and valid
-        trip_df["vendor_id"] = trip_df["vendor_id"].apply(_normalize_vendor_id)
-        trip_df = trip_df.dropna(subset=["vendor_id", "PULocationID", "DOLocationID"])
-        trip_df = trip_df[trip_df["vendor_id"].astype(str).str.len() > 0]
-        trip_df["PULocationID"] = trip_df["PULocationID"].astype("Int64")
-        trip_df["DOLocationID"] = trip_df["DOLocationID"].astype("Int64")
-        trip_df["trip_duration"] = trip_df["trip_duration"].round().astype("Int64")
+        lookup_df = read_zone_lookup()
+        trip_df = read_cleaned_trips()
 
         print("Loading locations...")
         load_locations(session, lookup_df)
@@ -217,7 +275,30 @@ def load_data(no_reset: bool = False, batch_size: int = 1_000) -> None:
         load_vendors(session, trip_df)
 
         print("Loading trips...")
-        load_trips(session, trip_df, batch_size=batch_size)
+        trips_loaded = load_trips(session, trip_df, batch_size=batch_size)
+
+        print("Loading trip rollups...")
+        load_trip_rollups(session, trip_df)
+
+        print("Loading origin-destination matrix...")
+        load_od_matrix(session, trip_df)
+
+        print("Loading stratified trip sample...")
+        load_trip_sample(session, trip_df)
+
+        print("Loading metric histograms...")
+        load_metric_histograms(session, trip_df)
+
+        run_id = record_etl_run(session, started_at, trips_loaded)
+        record_partition_changes(session, run_id, trip_df)
+        if not no_reset:
+            # Imported here so ``python -m etl.refresh`` does not import itself
+            # twice through the package ``__init__``.
+            from .refresh import REFRESH_JOBS, mark_refreshed
+            from .rescore import RESCORE_JOB
+
+            # Built and flagged from the complete data just now; nothing to refresh yet.
+            mark_refreshed(session, run_id, [*REFRESH_JOBS, RESCORE_JOB])
 
         print("Database load complete.")
     except SQLAlchemyError as exc:
@@ -0,0 +1,100 @@
+"""
+Per-step memory accounting for the ETL: frame size and process peak RSS.
+
+``MemoryReport.step`` records, after a pipeline step, the frame's size
+(``memory_usage(deep=True)``) and the process's peak resident set size so
+far. On Linux the peak is reset when the report starts (``/proc/self/clear_refs``),
+so it covers just the steps being reported; elsewhere it is the peak since the
+process started.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is not reported.
+    resource = None
+
+
+_PROC_STATUS = Path("/proc/self/status")
+_PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+
+def reset_peak_rss() -> bool:
+    """Reset the process's peak RSS to its current RSS; False where unsupported."""
+    try:
+        _PROC_CLEAR_REFS.write_text("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None where unknown."""
+    try:
+        for line in _PROC_STATUS.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+@dataclass
+class MemoryStep:
+    name: str
+    rows: int
+    seconds: float
+    frame_bytes: int
+    peak_rss_bytes: Optional[int]
+
+
+@dataclass
+class MemoryReport:
+    title: str
+    steps: List[MemoryStep] = field(default_factory=list)
+    peak_reset: bool = False
+
+    def __post_init__(self) -> None:
+        self.peak_reset = reset_peak_rss()
+        self._started = self._last = time.perf_counter()
+
+    def step(self, name: str, df: pd.DataFrame) -> None:
+        now = time.perf_counter()
+        self.steps.append(MemoryStep(name, len(df), now - self._last, frame_bytes(df), peak_rss_bytes()))
+        self._last = time.perf_counter()  # frame_bytes is not part of the next step
+
+    @property
+    def peak_rss(self) -> Optional[int]:
+        peaks = [step.peak_rss_bytes for step in self.steps if step.peak_rss_bytes is not None]
+        return max(peaks) if peaks else None
+
+    def format(self) -> str:
+        scope = "since report start" if self.peak_reset else "since process start"
+        lines = [
+            f"{self.title} (peak RSS {scope})",
+            f"  {'step':<28}{'rows':>12}{'seconds':>10}{'frame MB':>11}{'peak RSS MB':>13}",
+        ]
+        for step in self.steps:
+            peak = f"{step.peak_rss_bytes / 2**20:>13.1f}" if step.peak_rss_bytes is not None else f"{'n/a':>13}"
+            lines.append(
+                f"  {step.name:<28}{step.rows:>12,}{step.seconds:>10.2f}{step.frame_bytes / 2**20:>11.1f}{peak}"
+            )
+        return "\n".join(lines)
+
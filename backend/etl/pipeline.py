@@ -0,0 +1,348 @@
+"""
+The ETL as checkpointed stages (``python -m etl``)::
+
+    extract -> transform -+-> analyze_outliers
+                          +-> prepare_database -+-> load_locations -+-> load_trips -------+-> record_run
+                                                +-> load_vendors ---+                     |
+                                                +-> trip_rollups, od_matrix,  ------------+
+                                                    trip_samples, metric_histograms
+
+Stages on the same level run concurrently (database writers one at a time
+on SQLite). Checkpoints live in ``data/checkpoints``: the extracted frame as
+Parquet, the cleaned CSV in ``data/cleaned`` as before, the outlier report,
+and a manifest of finished stages, so a re-run after a failed load starts
+at the load. Stages that append rows first delete what an unfinished
+attempt of theirs left behind. ``--force`` runs everything again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Sequence
+
+import pandas as pd
+from sqlalchemy import delete, func, inspect
+
+from app.db.config import SessionLocal, engine
+from app.models import (
+    MetricHistogramBin,
+    OdMatrixCell,
+    Trip,
+    TripRollup,
+    TripSample,
+    TripSampleStratum,
+)
+from app.utils.custom_algorithms import OutlierDetector
+
+from .derived import load_metric_histograms, load_od_matrix, load_trip_rollups, load_trip_sample
+from .extract import SAMPLE_MODES, extract_data
+from .load import (
+    DATA_DIR,
+    EXTRACTED_PATH,
+    ZONE_LOOKUP_PATH,
+    create_tables,
+    load_locations,
+    load_trips,
+    load_vendors,
+    read_cleaned_trips,
+    read_zone_lookup,
+    record_etl_run,
+    record_partition_changes,
+    reset_tables,
+)
+from .runner import Pipeline, Stage, StageContext, format_report
+from .transform import transform_data
+
+
+CHECKPOINT_DIR = DATA_DIR.parent / "checkpoints"
+EXTRACT_CHECKPOINT = CHECKPOINT_DIR / "extracted.parquet"
+OUTLIER_REPORT_PATH = CHECKPOINT_DIR / "outlier_report.json"
+# extract_data reads data/raw relative to the working directory.
+RAW_DIR = Path("data/raw")
+STAGE_WORKERS = 4
+
+
+def _trips(ctx: StageContext) -> pd.DataFrame:
+    return ctx.shared("trips", read_cleaned_trips)
+
+
+def _extract(ctx: StageContext) -> int:
+    df = extract_data(
+        n_rows_per_file=ctx.params["rows_per_file"] or None,
+        sample=ctx.params["sample"],
+        seed=ctx.params["seed"],
+        start=ctx.params["start"],
+        end=ctx.params["end"],
+        vendors=ctx.params["vendors"],
+    )
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(EXTRACT_CHECKPOINT, index=False)
+    ctx.publish("extracted", df)
+    return len(df)
+
+
+def _transform(ctx: StageContext) -> int:
+    df = ctx.take("extracted", lambda: pd.read_parquet(EXTRACT_CHECKPOINT))
+    rows = len(df)
+    df = transform_data(df, compact=ctx.params["compact"])
+    EXTRACTED_PATH.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(EXTRACTED_PATH, index=False)
+    print(f"Saved cleaned data to {EXTRACTED_PATH}, with {len(df.columns):,} columns.")
+    return rows
+
+
+def _analyze_outliers(ctx: StageContext) -> int:
+    trip_df = _trips(ctx)
+    fares = trip_df["base_passenger_fare"].dropna().astype(float).tolist()
+    _, stats = OutlierDetector(multiplier=1.5).detect_outliers(fares)
+    flagged = trip_df["is_fare_outlier"].fillna(False).astype(bool)
+    by_vendor = flagged.groupby(trip_df["vendor_id"]).agg(["size", "sum"])
+    report = {
+        "fare_statistics": stats,
+        "by_vendor": {
+            vendor: {"trips": int(row["size"]), "outliers": int(row["sum"])}
+            for vendor, row in by_vendor.iterrows()
+        },
+    }
+    OUTLIER_REPORT_PATH.write_text(json.dumps(report, indent=2, default=float))
+    return len(fares)
+
+
+def _prepare_database(ctx: StageContext) -> None:
+    create_tables()
+    if not ctx.params["no_reset"]:
+        print("Clearing existing data...")
+        with SessionLocal() as session:
+            reset_tables(session)
+
+
+def _load_locations(ctx: StageContext) -> int:
+    lookup_df = read_zone_lookup()
+    with SessionLocal() as session:
+        load_locations(session, lookup_df)
+    return len(lookup_df)
+
+
+def _load_vendors(ctx: StageContext) -> int:
+    trip_df = _trips(ctx)
+    with SessionLocal() as session:
+        load_vendors(session, trip_df)
+    return len(trip_df)
+
+
+def _append_once(ctx: StageContext, models: Sequence, load: Callable) -> int:
+    """
+    Run ``load(session, trip_df)``, which appends rows to ``models``.
+
+    The first attempt records each table's highest primary key; a retry
+    deletes the rows above it, which the unfinished attempt appended.
+    """
+    trip_df = _trips(ctx)
+    with SessionLocal() as session:
+        high_water: Dict[str, int] | None = ctx.state.get("high_water")
+        if high_water is None:
+            ctx.state["high_water"] = {
+                model.__tablename__: session.query(func.max(inspect(model).primary_key[0])).scalar() or 0
+                for model in models
+            }
+            ctx.save_state()
+        else:
+            for model in models:
+                key = inspect(model).primary_key[0]
+                session.execute(delete(model).where(key > high_water[model.__tablename__]))
+            session.commit()
+        load(session, trip_df)
+    return len(trip_df)
+
+
+def _derived_stage(name: str, models: Sequence, load: Callable) -> Stage:
+    return Stage(
+        name,
+        lambda ctx: _append_once(ctx, models, load),
+        inputs=("cleaned", "schema"),
+        outputs=(name,),
+        database=True,
+    )
+
+
+def _record_run(ctx: StageContext) -> None:
+    with SessionLocal() as session:
+        run_id = record_etl_run(session, ctx.params["started_at"], ctx.rows_of("load_trips") or 0)
+        record_partition_changes(session, run_id, _trips(ctx))
+        # Imported here so ``python -m etl.refresh`` does not import itself
+        # twice through the package ``__init__``.
+        from .refresh import REFRESH_JOBS, mark_refreshed, unrefreshed_jobs
+        from .rescore import RESCORE_JOB
+
+        if not ctx.params["no_reset"]:
+            # Built and flagged from the complete data just now; nothing to refresh yet.
+            mark_refreshed(session, run_id, [*REFRESH_JOBS, RESCORE_JOB])
+            return
+        missing = unrefreshed_jobs(session)
+        if missing:
+            print(
+                f"Warning: {', '.join(missing)} may only hold the trips appended since they were created; "
+                "run `python -m etl.refresh --full` to rebuild them from all trips."
+            )
+
+
+def _raw_files() -> Iterable[Path]:
+    return RAW_DIR.glob("*.parquet")
+
+
+STAGES = [
+    Stage(
+        "extract",
+        _extract,
+        inputs=("raw",),
+        outputs=("extracted",),
+        params=("rows_per_file", "sample", "seed", "start", "end", "vendors"),
+    ),
+    Stage("transform", _transform, inputs=("extracted",), outputs=("cleaned",), params=("compact",)),
+    Stage("analyze_outliers", _analyze_outliers, inputs=("cleaned",), outputs=("outlier_report",)),
+    Stage(
+        "prepare_database",
+        _prepare_database,
+        inputs=("cleaned",),
+        outputs=("schema",),
+        params=("no_reset",),
+        database=True,
+    ),
+    Stage("load_locations", _load_locations, inputs=("zone_lookup", "schema"), outputs=("locations",), database=True),
+    Stage("load_vendors", _load_vendors, inputs=("cleaned", "schema"), outputs=("vendors",), database=True),
+    Stage(
+        "load_trips",
+        lambda ctx: _append_once(
+            ctx, [Trip], lambda session, trip_df: load_trips(session, trip_df, batch_size=ctx.params["batch_size"])
+        ),
+        inputs=("cleaned", "locations", "vendors"),
+        outputs=("trips",),
+        database=True,
+    ),
+    _derived_stage("trip_rollups", [TripRollup], load_trip_rollups),
+    _derived_stage("od_matrix", [OdMatrixCell], load_od_matrix),
+    _derived_stage("trip_samples", [TripSample, TripSampleStratum], load_trip_sample),
+    _derived_stage("metric_histograms", [MetricHistogramBin], load_metric_histograms),
+    Stage(
+        "record_run",
+        _record_run,
+        inputs=("trips", "trip_rollups", "od_matrix", "trip_samples", "metric_histograms"),
+        outputs=("etl_run",),
+        database=True,
+    ),
+]
+
+FILES = {
+    "raw": _raw_files,
+    "extracted": EXTRACT_CHECKPOINT,
+    "cleaned": EXTRACTED_PATH,
+    "outlier_report": OUTLIER_REPORT_PATH,
+    "zone_lookup": ZONE_LOOKUP_PATH,
+}
+
+
+def run_pipeline(
+    rows_per_file: int = 100_000,
+    sample: str = "head",
+    seed: int | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    vendors: Sequence[str] = (),
+    compact: bool = False,
+    no_reset: bool = False,
+    batch_size: int = 1_000,
+    workers: int = STAGE_WORKERS,
+    force: bool = False,
+) -> bool:
+    """Run the ETL stages not checkpointed yet; False when a stage failed."""
+    pipeline = Pipeline(
+        STAGES,
+        FILES,
+        CHECKPOINT_DIR,
+        params={
+            "rows_per_file": rows_per_file,
+            "sample": sample,
+            "seed": seed,
+            "start": start,
+            "end": end,
+            "vendors": sorted(vendors),
+            "compact": compact,
+            "no_reset": no_reset,
+            "batch_size": batch_size,
+            "started_at": datetime.now(),
+        },
+        workers=workers,
+        # SQLite takes one writer; concurrent loads would only wait on its lock.
+        single_writer=engine.dialect.name == "sqlite",
+    )
+    results = pipeline.run(force=force)
+    print("Stage report:")
+    print(format_report(results))
+    return all(result.status in ("ran", "skipped") for result in results)
+
+
+def _pickup_bound(value: str, upper: bool = False) -> datetime:
+    """``YYYY-MM-DD`` or an ISO timestamp; a bare end date includes its whole day."""
+    try:
+        bound = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r}")
+    return bound + timedelta(days=1) if upper and len(value) == 10 else bound
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the ETL: extract, transform and load into the database.")
+    parser.add_argument(
+        "--rows-per-file", type=int, default=100_000, help="Rows read from each raw file; 0 reads every matching row."
+    )
+    parser.add_argument("--sample", choices=SAMPLE_MODES, default="head", help="How the rows of each file are picked.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed of the sample.")
+    parser.add_argument("--start-date", type=_pickup_bound, help="Only trips picked up at or after this time.")
+    parser.add_argument(
+        "--end-date",
+        type=lambda value: _pickup_bound(value, upper=True),
+        help="Only trips picked up before this time (a bare date includes that day).",
+    )
+    parser.add_argument(
+        "--vendor",
+        action="append",
+        default=[],
+        help="Only this vendor id / HVFHS license / dispatching base (repeatable).",
+    )
+    parser.add_argument("--compact", action="store_true", help="Use the compact-dtype, in-place transform.")
+    parser.add_argument(
+        "--no-reset",
+        action="store_true",
+        help="Append to existing tables instead of clearing them first.",
+    )
+    parser.add_argument("--batch-size", type=int, default=1_000, help="Number of trip rows to insert per batch.")
+    parser.add_argument("--workers", type=int, default=STAGE_WORKERS, help="Stages run at the same time.")
+    parser.add_argument("--force", action="store_true", help="Ignore checkpoints and run every stage.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    succeeded = run_pipeline(
+        rows_per_file=args.rows_per_file,
+        sample=args.sample,
+        seed=args.seed,
+        start=args.start_date,
+        end=args.end_date,
+        vendors=args.vendor,
+        compact=args.compact,
+        no_reset=args.no_reset,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        force=args.force,
+    )
+    if not succeeded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+Incremental refresh of the derived tables after appending loads.
+
+Every load records the pickup months it added trips to (``partition_changes``)
+and every refresh job keeps a watermark (``derived_refreshes``): the last ETL
+run whose changes it has applied. A refresh rebuilds, for each job, only the
+months changed since its watermark, straight from ``trips``; a job without one
+rebuilds every month, since its table may predate the trips. That compacts the
+per-batch rows appending loads leave behind and redraws the stratified sample
+over the whole month. A month is read once, in chunks of ``REFRESH_CHUNK_ROWS``
+trips that feed every job: rollups, OD cells and histogram bins are summed
+across chunks, and the sample keeps a uniform subset per stratum as it goes, so
+a worker holds one chunk plus the month's output rather than the month's trips.
+Months are rebuilt in a worker pool; each job swaps a month's rows in a single
+transaction, so API reads see either the old or the new rows and are never
+blocked waiting for the refresh. A finished refresh records an ETL run, which
+bumps the data generation the API caches follow.
+
+Run once, or keep refreshing every ``--interval`` seconds::
+
+    python -m etl.refresh
+    python -m etl.refresh --interval 300 --workers 4
+
+The API can run the latter as a child process (``API_REFRESH_INTERVAL``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Protocol, Set
+
+import pandas as pd
+from sqlalchemy import and_, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run one scheduler.
+    fcntl = None
+
+from app.db.config import DATABASE_URL, SessionLocal, engine
+from app.models import (
+    DerivedRefresh,
+    EtlRun,
+    MetricHistogramBin,
+    OdMatrixCell,
+    PartitionChange,
+    Trip,
+    TripRollup,
+    TripSample,
+    TripSampleStratum,
+)
+
+from .derived import (
+    ROLLUP_METRICS,
+    StratifiedSampler,
+    build_metric_histograms,
+    build_od_matrix,
+    build_trip_rollups,
+    merge_metric_histograms,
+    merge_od_matrix,
+    merge_trip_rollups,
+    replace_rows,
+)
+
+
+REFRESH_WORKERS = 4
+REFRESH_INTERVAL_SECONDS = 300
+# Trips read from the database at a time while a month is rebuilt.
+REFRESH_CHUNK_ROWS = 250_000
+
+Month = Optional[date]
+
+
+class MonthRebuild(Protocol):
+    """One job's rows for one month, built from its trips chunk by chunk."""
+
+    def add(self, trip_df: pd.DataFrame) -> None: ...
+
+    def write(self, session: Session) -> int:
+        """Swap the month's rows for the built ones (uncommitted); rows written."""
+        ...
+
+
+@dataclass(frozen=True)
+class RefreshJob:
+    """Rebuilds one derived table family for one pickup month."""
+
+    name: str
+    start: Callable[[Session, Month], MonthRebuild]
+
+
+def _month_range(month: date) -> tuple[datetime, datetime]:
+    start = datetime(month.year, month.month, 1)
+    end = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return start, end
+
+
+def _in_month(column, month: Month):
+    """``column`` (a DateTime) falls in ``month``; NULL for the no-pickup partition."""
+    if month is None:
+        return column.is_(None)
+    start, end = _month_range(month)
+    return and_(column >= start, column < end)
+
+
+def _is_month(column, month: Month):
+    """``column`` (a month-start Date) equals ``month``."""
+    return column.is_(None) if month is None else column == month
+
+
+class _AggregateRebuild:
+    """An additive table: each chunk's partial aggregates are merged into the month's."""
+
+    def __init__(self, model, clause, build: Callable, merge: Callable) -> None:
+        self.model = model
+        self.clause = clause
+        self.build = build
+        self.merge = merge
+        self.frame: Optional[pd.DataFrame] = None
+
+    def add(self, trip_df: pd.DataFrame) -> None:
+        partial = self.build(trip_df)
+        if self.frame is not None:
+            partial = self.merge(pd.concat([self.frame, partial], ignore_index=True))
+        self.frame = partial
+
+    def write(self, session: Session) -> int:
+        frame = self.frame if self.frame is not None else pd.DataFrame()
+        return replace_rows(session, self.model, self.clause, frame)
+
+
+class _SampleRebuild:
+    """The month's stratified sample, drawn in one pass over its trips."""
+
+    def __init__(self, session: Session, month: Month) -> None:
+        self.month = month
+        populations = (
+            session.query(Trip.vendor_id, func.count())
+            .filter(_in_month(Trip.pickup_datetime, month))
+            .group_by(Trip.vendor_id)
+        )
+        self.sampler = StratifiedSampler(month, dict(populations.all()))
+
+    def add(self, trip_df: pd.DataFrame) -> None:
+        self.sampler.add(trip_df)
+
+    def write(self, session: Session) -> int:
+        sample, strata = self.sampler.result()
+        replace_rows(session, TripSampleStratum, _is_month(TripSampleStratum.sample_month, self.month), strata)
+        return replace_rows(session, TripSample, _is_month(TripSample.sample_month, self.month), sample)
+
+
+def _rebuild_rollups(session: Session, month: Month) -> MonthRebuild:
+    return _AggregateRebuild(
+        TripRollup, _in_month(TripRollup.pickup_hour, month), build_trip_rollups, merge_trip_rollups
+    )
+
+
+def _rebuild_od_matrix(session: Session, month: Month) -> MonthRebuild:
+    return _AggregateRebuild(
+        OdMatrixCell, _is_month(OdMatrixCell.pickup_month, month), build_od_matrix, merge_od_matrix
+    )
+
+
+def _rebuild_histograms(session: Session, month: Month) -> MonthRebuild:
+    return _AggregateRebuild(
+        MetricHistogramBin,
+        _is_month(MetricHistogramBin.pickup_month, month),
+        build_metric_histograms,
+        merge_metric_histograms,
+    )
+
+
+REFRESH_JOBS: Dict[str, RefreshJob] = {
+    job.name: job
+    for job in (
+        RefreshJob("trip_rollups", _rebuild_rollups),
+        RefreshJob("od_matrix", _rebuild_od_matrix),
+        RefreshJob("metric_histograms", _rebuild_histograms),
+        RefreshJob("trip_samples", _SampleRebuild),
+    )
+}
+
+
+def month_trips(session: Session, month: Month, chunk_rows: int = REFRESH_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    The month's trips in frames of ``chunk_rows``, with the column names the
+    ``derived`` builders expect. Streamed from a server-side cursor where the
+    driver has one, so memory stays bounded by the chunk size.
+    """
+    columns = [
+        Trip.trip_id,
+        Trip.vendor_id,
+        Trip.pickup_id.label("PULocationID"),
+        Trip.dropoff_id.label("DOLocationID"),
+        Trip.pickup_datetime,
+        Trip.is_fare_outlier,
+    ] + [getattr(Trip, column) for column in ROLLUP_METRICS]
+    statement = (
+        select(*columns)
+        .where(_in_month(Trip.pickup_datetime, month))
+        .execution_options(stream_results=True, max_row_buffer=chunk_rows)
+    )
+    yield from pd.read_sql(statement, session.connection(), chunksize=chunk_rows)
+
+
+def mark_refreshed(session: Session, run_id: int, jobs: Optional[List[str]] = None) -> None:
+    """Move the watermarks of ``jobs`` (default: all) up to ``run_id``."""
+    now = datetime.now()
+    for name in jobs or REFRESH_JOBS:
+        session.merge(DerivedRefresh(job=name, last_run_id=run_id, refreshed_at=now))
+    session.commit()
+
+
+def _all_months(session: Session) -> List[Month]:
+    first, last = session.query(func.min(Trip.pickup_datetime), func.max(Trip.pickup_datetime)).one()
+    months: List[Month] = [None]
+    if first is not None:
+        cursor = date(first.year, first.month, 1)
+        while cursor <= last.date():
+            months.append(cursor)
+            cursor = _month_range(cursor)[1].date()
+    return months
+
+
+def unrefreshed_jobs(session: Session, jobs: Optional[List[str]] = None) -> List[str]:
+    """
+    Jobs (default: all) without a watermark, whose tables may miss trips.
+
+    A full load sets every watermark. Tables of a database loaded before
+    they existed only hold what appending loads added since, until a
+    refresh rebuilds them from all of ``trips``.
+    """
+    watermarks = {job for (job,) in session.query(DerivedRefresh.job)}
+    return [name for name in jobs or REFRESH_JOBS if name not in watermarks]
+
+
+def _pending_months(session: Session, jobs: List[str], latest_run: int, full: bool) -> Dict[Month, Set[str]]:
+    """Months to rebuild, each with the jobs that still have to rebuild it."""
+    # Jobs never refreshed have no baseline to catch up from; they rebuild everything.
+    rebuild_all = list(jobs) if full else unrefreshed_jobs(session, jobs)
+    pending: Dict[Month, Set[str]] = {}
+    if rebuild_all:
+        for month in _all_months(session):
+            pending[month] = set(rebuild_all)
+
+    watermarks = dict(session.query(DerivedRefresh.job, DerivedRefresh.last_run_id))
+    for name in jobs:
+        if name in rebuild_all:
+            continue
+        changed = (
+            session.query(PartitionChange.pickup_month)
+            .filter(
+                PartitionChange.run_id > watermarks.get(name, 0),
+                PartitionChange.run_id <= latest_run,
+            )
+            .distinct()
+        )
+        for (month,) in changed:
+            pending.setdefault(month, set()).add(name)
+    return pending
+
+
+def _refresh_month(month: Month, jobs: Set[str]) -> Dict[str, int]:
+    """Rebuild ``month`` for each job in its own transaction; rows written per job."""
+    written: Dict[str, int] = {}
+    session = SessionLocal()
+    try:
+        rebuilds = {name: REFRESH_JOBS[name].start(session, month) for name in sorted(jobs)}
+        # One pass over the month feeds every job, a chunk at a time.
+        for trip_df in month_trips(session, month):
+            for rebuild in rebuilds.values():
+                rebuild.add(trip_df)
+        session.commit()
+        for name, rebuild in rebuilds.items():
+            written[name] = rebuild.write(session)
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    return written
+
+
+def refresh_derived(
+    workers: int = REFRESH_WORKERS,
+    full: bool = False,
+    jobs: Optional[List[str]] = None,
+) -> int:
+    """
+    Rebuild the derived months changed since each job's watermark.
+
+    Returns the number of (month, job) rebuilds. Jobs whose months all
+    succeeded advance their watermark; the rest retry on the next run.
+    """
+    jobs = list(jobs or REFRESH_JOBS)
+    session = SessionLocal()
+    try:
+        latest_run = session.query(func.max(EtlRun.run_id)).scalar() or 0
+        pending = _pending_months(session, jobs, latest_run, full)
+    finally:
+        session.close()
+    if not pending:
+        print("Derived tables are up to date.")
+        return 0
+
+    if engine.dialect.name == "sqlite":
+        workers = 1  # one writer at a time; parallel rebuilds would only wait on the lock
+    print(f"Refreshing {len(pending):,} month(s) with {workers} worker(s)...")
+    failed: Set[str] = set()
+    rebuilds = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="refresh") as executor:
+        futures = {
+            executor.submit(_refresh_month, month, month_jobs): (month, month_jobs)
+            for month, month_jobs in pending.items()
+        }
+        for future in as_completed(futures):
+            month, month_jobs = futures[future]
+            label = month.strftime("%Y-%m") if month else "no pickup time"
+            try:
+                written = future.result()
+            except SQLAlchemyError as exc:
+                failed.update(month_jobs)
+                print(f"  {label}: failed ({exc.__class__.__name__}: {exc})")
+                continue
+            rebuilds += len(written)
+            print(f"  {label}: " + ", ".join(f"{name} {rows:,} rows" for name, rows in sorted(written.items())))
+
+    session = SessionLocal()
+    try:
+        done = [name for name in jobs if name not in failed]
+        if done:
+            mark_refreshed(session, latest_run, done)
+        if rebuilds:
+            # A new run id is a new data generation for the API caches.
+            now = datetime.now()
+            session.add(EtlRun(started_at=now, finished_at=now, trips_loaded=0))
+            session.commit()
+    finally:
+        session.close()
+    print(f"Refreshed {rebuilds:,} derived partition(s).")
+    return rebuilds
+
+
+@contextlib.contextmanager
+def _scheduler_lock() -> Iterator[bool]:
+    """Non-blocking host-wide lock, so only one scheduler refreshes a database."""
+    database = hashlib.sha256(DATABASE_URL.encode("utf-8")).hexdigest()[:16]
+    path = Path(tempfile.gettempdir()) / f"urban-mobility-refresh-{database}.lock"
+    with open(path, "a+b") as handle:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def run_scheduler(
+    interval: float = REFRESH_INTERVAL_SECONDS,
+    workers: int = REFRESH_WORKERS,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """Refresh every ``interval`` seconds until ``stop`` is set."""
+    # Imported here: ``etl.rescore`` builds on this module.
+    from .rescore import print_result, rescore_needed, rescore_outliers
+
+    stop = stop or threading.Event()
+    while True:
+        started = time.monotonic()
+        with _scheduler_lock() as acquired:
+            if acquired:
+                try:
+                    # Appended batches were flagged against their own quartiles.
+                    with SessionLocal() as session:
+                        if rescore_needed(session):
+                            print_result(rescore_outliers(session))
+                    refresh_derived(workers=workers)
+                except SQLAlchemyError as exc:
+                    print(f"Refresh failed: {exc}")
+        if stop.wait(max(0.0, interval - (time.monotonic() - started))):
+            return
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Rebuild derived tables for changed pickup months.")
+    parser.add_argument("--workers", type=int, default=REFRESH_WORKERS, help="Months rebuilt in parallel.")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        help="Keep running and refresh every this many seconds (default: refresh once).",
+    )
+    parser.add_argument("--full", action="store_true", help="Rebuild every month, ignoring watermarks.")
+    parser.add_argument("--jobs", nargs="+", choices=sorted(REFRESH_JOBS), help="Only these jobs.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.interval:
+        run_scheduler(args.interval, args.workers)
+        return
+    with _scheduler_lock() as acquired:
+        if not acquired:
+            raise SystemExit("Another refresh is running against this database.")
+        refresh_derived(workers=args.workers, full=args.full, jobs=args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Re-flag fare outliers over the whole ``trips`` table, inside the database.
+
+``transform`` flags outliers against the quartiles of the batch it cleans, so
+after appending loads each batch was judged against itself. Rescoring takes
+Q1/Q3 of ``base_passenger_fare`` over every trip and rewrites
+``is_fare_outlier`` with the same IQR rule (``OutlierDetector``), without
+pulling trips into Python:
+
+* quartiles come from ``PERCENTILE_CONT`` on PostgreSQL; MySQL and SQLite have
+  no percentile aggregate, so they read them from a primary-key stride sample
+  of ``--sample-size`` trips (exact when the table is smaller than that);
+* flags are rewritten by set-based ``UPDATE`` statements over primary-key
+  ranges of ``--chunk-size`` ids, one transaction each, touching only rows
+  whose flag changes.
+
+The pickup months that had flags changed are recorded as partition changes, so
+``etl.refresh`` rebuilds their rollups and samples (and with them
+``/api/insights/algorithm-performance``). The scheduler rescores on its own
+whenever a load has added trips since the last rescore.
+
+    python -m etl.rescore
+    python -m etl.rescore --no-refresh --chunk-size 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Set
+
+from sqlalchemy import case, func, or_, update
+from sqlalchemy.orm import Session
+
+from app.db.config import SessionLocal, engine
+from app.models import DerivedRefresh, EtlRun, PartitionChange, Trip
+
+from .refresh import Month, _month_range, mark_refreshed, refresh_derived
+
+
+RESCORE_JOB = "fare_outliers"
+IQR_MULTIPLIER = 1.5
+CHUNK_SIZE = 50_000
+SAMPLE_SIZE = 1_000_000
+
+
+@dataclass(frozen=True)
+class RescoreResult:
+    q1: float
+    q3: float
+    lower_bound: float
+    upper_bound: float
+    fares_used: int
+    exact: bool
+    trips_changed: int
+    months: frozenset
+
+
+def _interpolated(session: Session, clause, count: int, percentile: float) -> float:
+    """Linear-interpolation percentile of the fares matching ``clause`` (``count`` of them)."""
+    index = percentile * (count - 1)
+    offset = int(index)
+    values = [
+        float(value)
+        for (value,) in session.query(Trip.base_passenger_fare)
+        .filter(clause)
+        .order_by(Trip.base_passenger_fare)
+        .offset(offset)
+        .limit(2)
+    ]
+    if len(values) == 1:
+        return values[0]
+    return values[0] + (index - offset) * (values[1] - values[0])
+
+
+def fare_quartiles(session: Session, sample_size: int = SAMPLE_SIZE) -> tuple[float, float, int, bool]:
+    """``(q1, q3, fares used, exact)`` of ``base_passenger_fare`` over all trips."""
+    has_fare = Trip.base_passenger_fare.isnot(None)
+    if engine.dialect.name == "postgresql":
+        q1, q3, count = session.query(
+            func.percentile_cont(0.25).within_group(Trip.base_passenger_fare),
+            func.percentile_cont(0.75).within_group(Trip.base_passenger_fare),
+            func.count(Trip.base_passenger_fare),
+        ).one()
+        return float(q1 or 0), float(q3 or 0), count, True
+
+    first_id, last_id = session.query(func.min(Trip.trip_id), func.max(Trip.trip_id)).one()
+    if first_id is None:
+        return 0.0, 0.0, 0, True
+    stride = max(1, -(-(last_id - first_id + 1) // sample_size))
+    clause = has_fare if stride == 1 else (has_fare & ((Trip.trip_id % stride) == 0))
+    count = session.query(func.count()).select_from(Trip).filter(clause).scalar()
+    if not count:
+        return 0.0, 0.0, 0, stride == 1
+    q1 = _interpolated(session, clause, count, 0.25)
+    q3 = _interpolated(session, clause, count, 0.75)
+    return q1, q3, count, stride == 1
+
+
+def _months_between(first: datetime, last: datetime) -> Set[Month]:
+    months: Set[Month] = set()
+    cursor = date(first.year, first.month, 1)
+    while cursor <= last.date():
+        months.add(cursor)
+        cursor = _month_range(cursor)[1].date()
+    return months
+
+
+def rescore_outliers(
+    session: Session,
+    multiplier: float = IQR_MULTIPLIER,
+    chunk_size: int = CHUNK_SIZE,
+    sample_size: int = SAMPLE_SIZE,
+) -> RescoreResult:
+    """
+    Recompute the IQR bounds over all trips and rewrite changed flags.
+
+    Records the affected months as partition changes of a new ETL run and
+    moves the ``fare_outliers`` watermark up to it.
+    """
+    latest_run = session.query(func.max(EtlRun.run_id)).scalar() or 0
+    q1, q3, fares_used, exact = fare_quartiles(session, sample_size)
+    iqr = q3 - q1
+    lower, upper = q1 - multiplier * iqr, q3 + multiplier * iqr
+
+    fare = Trip.base_passenger_fare
+    flag = case((or_(fare < lower, fare > upper), True), else_=False)
+    stale = or_(Trip.is_fare_outlier.is_(None), Trip.is_fare_outlier != flag)
+
+    first_id, last_id = session.query(func.min(Trip.trip_id), func.max(Trip.trip_id)).one()
+    session.commit()
+    changed = 0
+    months: Set[Month] = set()
+    for start in range(first_id or 0, (last_id or -1) + 1, chunk_size):
+        in_chunk = (Trip.trip_id >= start) & (Trip.trip_id < start + chunk_size)
+        first, last, rows, no_pickup = (
+            session.query(
+                func.min(Trip.pickup_datetime),
+                func.max(Trip.pickup_datetime),
+                func.count(),
+                func.sum(case((Trip.pickup_datetime.is_(None), 1), else_=0)),
+            )
+            .filter(in_chunk, stale)
+            .one()
+        )
+        if not rows:
+            continue
+        session.execute(
+            update(Trip)
+            .where(in_chunk, stale)
+            .values(is_fare_outlier=flag)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        changed += rows
+        if first is not None:
+            months |= _months_between(first, last)
+        if no_pickup:
+            months.add(None)
+
+    run_id = latest_run
+    if changed:
+        now = datetime.now()
+        run = EtlRun(started_at=now, finished_at=now, trips_loaded=0)
+        session.add(run)
+        session.flush()
+        run_id = run.run_id
+        session.add_all(PartitionChange(run_id=run_id, pickup_month=month, trips_loaded=0) for month in months)
+        session.commit()
+    mark_refreshed(session, run_id, [RESCORE_JOB])
+    return RescoreResult(q1, q3, lower, upper, fares_used, exact, changed, frozenset(months))
+
+
+def rescore_needed(session: Session) -> bool:
+    """Whether a load has added trips since the last rescore."""
+    watermark = session.get(DerivedRefresh, RESCORE_JOB)
+    return (
+        session.query(PartitionChange.change_id)
+        .filter(
+            PartitionChange.run_id > (watermark.last_run_id if watermark else 0),
+            PartitionChange.trips_loaded > 0,
+        )
+        .first()
+        is not None
+    )
+
+
+def print_result(result: RescoreResult) -> None:
+    method = "exact" if result.exact else "sampled"
+    print(f"Fare quartiles ({method}, {result.fares_used:,} fares):")
+    print(f"  Q1: ${result.q1:.2f}  Q3: ${result.q3:.2f}  IQR: ${result.q3 - result.q1:.2f}")
+    print(f"  Bounds: ${result.lower_bound:.2f} .. ${result.upper_bound:.2f}")
+    print(f"Re-flagged {result.trips_changed:,} trip(s) across {len(result.months):,} month(s).")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-flag fare outliers over all trips in the database.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Trip ids per UPDATE.")
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=SAMPLE_SIZE,
+        help="Fares sampled for the quartiles where the database has no PERCENTILE_CONT.",
+    )
+    parser.add_argument("--multiplier", type=float, default=IQR_MULTIPLIER, help="IQR multiplier.")
+    parser.add_argument(
+        "--no-refresh",
+        action="store_true",
+        help="Leave the affected months for the next etl.refresh run.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    session = SessionLocal()
+    try:
+        result = rescore_outliers(session, args.multiplier, args.chunk_size, args.sample_size)
+    finally:
+        session.close()
+    print_result(result)
+    if result.trips_changed and not args.no_refresh:
+        refresh_derived()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Small DAG runner for the ETL: checkpointed stages, run concurrently when independent.
+
+A ``Stage`` names the artifacts it reads and writes, and the pipeline
+parameters it depends on. File artifacts map to paths; the others (rows
+loaded into a table, say) exist only as the record of the stage that
+produced them. A stage runs once everything it reads has been produced,
+alongside any other stage that is ready.
+
+Finished stages are recorded in ``manifest.json`` in the checkpoint
+directory, keyed by a digest of their parameters and of their inputs
+(file size and mtime, or the run that produced them). A re-run skips every
+stage whose key is unchanged and whose output files are still in place, so a
+failed load resumes at the load without extracting and transforming again.
+Stages also keep a small ``state`` dict there that survives an unfinished
+attempt, which lets them clean up after it before retrying.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+Files = Union[Path, Callable[[], Iterable[Path]]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """``run`` returns the number of rows it processed (for the throughput report)."""
+
+    name: str
+    run: Callable[["StageContext"], Optional[int]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    # Pipeline parameters the stage's result depends on; part of its key.
+    params: Tuple[str, ...] = ()
+    # Writes to the database; serialized when the database takes one writer.
+    database: bool = False
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str  # "ran", "skipped", "failed" or "blocked"
+    seconds: float = 0.0
+    rows: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        if not self.rows or not self.seconds:
+            return None
+        return self.rows / self.seconds
+
+
+@dataclass
+class StageContext:
+    name: str
+    params: Dict[str, Any]
+    state: Dict[str, Any]
+    pipeline: "Pipeline"
+
+    def save_state(self) -> None:
+        """Persist ``state`` now, so it survives this attempt failing."""
+        self.pipeline._update_entry(self.name, state=self.state)
+
+    def shared(self, key: str, load: Callable[[], Any]) -> Any:
+        """``load()`` once per pipeline run, shared by every stage that asks for ``key``."""
+        return self.pipeline._shared(key, load)
+
+    def publish(self, key: str, value: Any) -> None:
+        """Hand ``value`` to later stages in this run, sparing them a checkpoint read."""
+        self.pipeline._shared(key, lambda: value)
+
+    def take(self, key: str, load: Callable[[], Any]) -> Any:
+        """Like ``shared``, but the value is forgotten, for a single consumer."""
+        value = self.pipeline._shared(key, load)
+        self.pipeline._forget(key)
+        return value
+
+    def rows_of(self, stage: str) -> Optional[int]:
+        """Rows reported by ``stage`` in this run or the run it was checkpointed in."""
+        return self.pipeline._entry(stage).get("rows")
+
+
+@dataclass
+class Pipeline:
+    stages: List[Stage]
+    files: Dict[str, Files]
+    checkpoint_dir: Path
+    params: Dict[str, Any] = field(default_factory=dict)
+    workers: int = 4
+    single_writer: bool = False
+
+    def __post_init__(self) -> None:
+        self._producers: Dict[str, Stage] = {}
+        for stage in self.stages:
+            for artifact in stage.outputs:
+                if artifact in self._producers:
+                    raise ValueError(f"{artifact!r} is produced by both {self._producers[artifact].name} and {stage.name}")
+                self._producers[artifact] = stage
+        self._lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._shared_values: Dict[str, Any] = {}
+        self._shared_locks: Dict[str, threading.Lock] = {}
+        self._manifest_path = self.checkpoint_dir / "manifest.json"
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+
+    # -- manifest ---------------------------------------------------------
+
+    def _load_manifest(self) -> None:
+        try:
+            self._manifest = json.loads(self._manifest_path.read_text())
+        except (FileNotFoundError, ValueError):
+            self._manifest = {}
+
+    def _write_manifest(self) -> None:
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=self.checkpoint_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(self._manifest, handle, indent=2, default=str)
+        os.replace(temp_name, self._manifest_path)
+
+    def _entry(self, stage: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._manifest.get(stage, {}))
+
+    def _update_entry(self, stage: str, **values: Any) -> None:
+        with self._lock:
+            self._manifest.setdefault(stage, {}).update(values)
+            self._write_manifest()
+
+    # -- fingerprints -----------------------------------------------------
+
+    def _paths(self, artifact: str) -> List[Path]:
+        files = self.files[artifact]
+        return [files] if isinstance(files, Path) else sorted(files())
+
+    def _fingerprint(self, artifact: str) -> Optional[str]:
+        if artifact not in self.files:
+            producer = self._producers.get(artifact)
+            return self._entry(producer.name).get("finished_at") if producer else None
+        parts = []
+        for path in self._paths(artifact):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                return None
+            parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest() if parts else None
+
+    def _key(self, stage: Stage) -> str:
+        payload = {
+            "params": {name: self.params.get(name) for name in stage.params},
+            "inputs": {artifact: self._fingerprint(artifact) for artifact in stage.inputs},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _is_current(self, stage: Stage, key: str) -> bool:
+        entry = self._entry(stage.name)
+        if entry.get("status") != "done" or entry.get("key") != key:
+            return False
+        recorded = entry.get("outputs", {})
+        return all(
+            self._fingerprint(artifact) == recorded.get(artifact)
+            for artifact in stage.outputs
+            if artifact in self.files
+        )
+
+    # -- running ----------------------------------------------------------
+
+    def _shared(self, key: str, load: Callable[[], Any]) -> Any:
+        with self._lock:
+            lock = self._shared_locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._shared_values:
+                self._shared_values[key] = load()
+            return self._shared_values[key]
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            self._shared_values.pop(key, None)
+
+    def _run_stage(self, stage: Stage, key: str) -> StageResult:
+        entry = self._entry(stage.name)
+        # An unfinished attempt's state carries over, so the stage can undo it.
+        state = dict(entry.get("state", {})) if entry.get("status") in ("running", "failed") else {}
+        self._update_entry(stage.name, key=key, status="running", state=state)
+        context = StageContext(stage.name, self.params, state, self)
+        writer = self._writer_lock if stage.database and self.single_writer else contextlib.nullcontext()
+        started = time.perf_counter()
+        try:
+            with writer:
+                started = time.perf_counter()  # not counting the wait for the writer lock
+                rows = stage.run(context)
+        except Exception as exc:
+            seconds = time.perf_counter() - started
+            self._update_entry(stage.name, status="failed", error=f"{exc.__class__.__name__}: {exc}")
+            traceback.print_exc()
+            return StageResult(stage.name, "failed", seconds, error=f"{exc.__class__.__name__}: {exc}")
+        seconds = time.perf_counter() - started
+        self._update_entry(
+            stage.name,
+            status="done",
+            state=context.state,
+            finished_at=datetime.now().isoformat(),
+            seconds=round(seconds, 3),
+            rows=rows,
+            error=None,
+            outputs={artifact: self._fingerprint(artifact) for artifact in stage.outputs if artifact in self.files},
+        )
+        return StageResult(stage.name, "ran", seconds, rows)
+
+    def run(self, force: bool = False) -> List[StageResult]:
+        """Run every stage not checkpointed yet (all of them with ``force``)."""
+        self._load_manifest()
+        if force:
+            self._manifest = {}
+        depends = {
+            stage.name: {self._producers[a].name for a in stage.inputs if a in self._producers}
+            for stage in self.stages
+        }
+        missing = {a for stage in self.stages for a in stage.inputs if a not in self._producers and a not in self.files}
+        if missing:
+            raise ValueError(f"No stage or file provides {sorted(missing)}")
+
+        results: Dict[str, StageResult] = {}
+        pending = {stage.name: stage for stage in self.stages}
+        running: Dict[Future, Stage] = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="etl-stage") as executor:
+            while pending or running:
+                progressed = False
+                for name, stage in list(pending.items()):
+                    upstream = [results.get(dep) for dep in depends[name]]
+                    if any(result is None for result in upstream):
+                        continue
+                    del pending[name]
+                    progressed = True
+                    if any(result.status in ("failed", "blocked") for result in upstream):
+                        results[name] = StageResult(name, "blocked")
+                        _print_result(results[name])
+                        continue
+                    key = self._key(stage)
+                    if self._is_current(stage, key):
+                        entry = self._entry(name)
+                        results[name] = StageResult(name, "skipped", entry.get("seconds", 0.0), entry.get("rows"))
+                        _print_result(results[name])
+                        continue
+                    print(f"[{name}] started", flush=True)
+                    running[executor.submit(self._run_stage, stage, key)] = stage
+                if not running:
+                    if pending and not progressed:
+                        raise ValueError(f"Dependency cycle among {sorted(pending)}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    results[stage.name] = future.result()
+                    _print_result(results[stage.name])
+        self._shared_values.clear()
+        return [results[stage.name] for stage in self.stages]
+
+
+def _print_result(result: StageResult) -> None:
+    line = f"[{result.name}] {result.status}"
+    if result.status in ("ran", "skipped"):
+        line += f" in {result.seconds:.2f}s" + (" (checkpoint)" if result.status == "skipped" else "")
+        if result.rows is not None:
+            line += f", {result.rows:,} rows"
+        if result.rows_per_second:
+            line += f", {result.rows_per_second:,.0f} rows/s"
+    elif result.error:
+        line += f": {result.error}"
+    print(line, flush=True)
+
+
+def format_report(results: List[StageResult]) -> str:
+    lines = [f"  {'stage':<24}{'status':<9}{'seconds':>10}{'rows':>13}{'rows/s':>12}"]
+    for result in results:
+        rows = f"{result.rows:,}" if result.rows is not None else "-"
+        rate = f"{result.rows_per_second:,.0f}" if result.rows_per_second else "-"
+        lines.append(f"  {result.name:<24}{result.status:<9}{result.seconds:>10.2f}{rows:>13}{rate:>12}")
+    return "\n".join(lines)
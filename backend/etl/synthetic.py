@@ -0,0 +1,432 @@
+"""Synthetic NYC TLC trip files for scale testing without the real downloads.
+
+Writes yellow, green, FHV and FHVHV parquet files with each source's column
+names and types, null patterns and row-group layout, so ``extract_data`` and
+``transform_data`` see the same heterogeneous input they get from the real
+monthly files. Values follow plausible distributions (skewed zone popularity,
+a daily demand curve, log-normal distances and durations, fares derived from
+both) and a small share of rows is deliberately bad: exact duplicates, fare
+outliers, negative fares and trips that end before they start.
+
+Generation is vectorised and streamed one row group at a time, so memory stays
+flat however many rows are requested. From the ``backend`` directory::
+
+    python -m etl.synthetic --rows 100000000 --seed 7 --output data/raw
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+ZONE_COUNT = 265
+# Share of all rows per source, roughly a 2024-25 month.
+DEFAULT_MIX = {"yellow": 0.15, "green": 0.02, "fhv": 0.06, "fhvhv": 0.77}
+
+DUPLICATE_RATE = 0.005
+FARE_OUTLIER_RATE = 0.003
+NEGATIVE_FARE_RATE = 0.001
+NEGATIVE_DURATION_RATE = 0.0005
+
+_TIMESTAMP = pa.timestamp("us")
+_HOURLY_DEMAND = np.array(
+    [3, 2, 1.5, 1, 1, 1.5, 3, 5, 6, 5, 4.5, 4.5, 5, 5, 5.5, 6, 6.5, 7, 7, 6.5, 6, 5.5, 5, 4],
+    dtype=float,
+)
+
+
+@dataclass(frozen=True)
+class Source:
+    name: str
+    schema: pa.Schema
+    row_group_size: int
+    build: Callable[[np.random.Generator, int, np.datetime64], Dict[str, pa.Array]]
+
+
+# --- shared value generators -------------------------------------------------
+
+
+def _zone_weights(seed: int) -> np.ndarray:
+    # Zipf-like popularity over a seed-fixed ordering of the zones.
+    ranks = np.random.default_rng(seed).permutation(ZONE_COUNT) + 1
+    weights = 1 / ranks ** 1.1
+    return weights / weights.sum()
+
+
+_ZONE_WEIGHTS = _zone_weights(265)
+
+
+def _zones(rng: np.random.Generator, n: int) -> np.ndarray:
+    return rng.choice(np.arange(1, ZONE_COUNT + 1, dtype=np.int32), n, p=_ZONE_WEIGHTS)
+
+
+def _pickups(rng: np.random.Generator, n: int, month_start: np.datetime64) -> np.ndarray:
+    first_day = month_start.astype("datetime64[D]")
+    days = ((month_start + 1).astype("datetime64[D]") - first_day).astype(int)
+    hours = rng.choice(24, n, p=_HOURLY_DEMAND / _HOURLY_DEMAND.sum())
+    seconds = rng.integers(0, days, n) * 86_400 + hours * 3_600 + rng.integers(0, 3_600, n)
+    return month_start.astype("datetime64[us]") + seconds.astype("timedelta64[s]")
+
+
+def _trips(rng: np.random.Generator, n: int):
+    """Distance (miles) and duration (seconds), loosely correlated."""
+    miles = np.maximum(rng.lognormal(0.9, 0.85, n), 0.0)
+    speed = np.clip(rng.lognormal(2.4, 0.35, n), 2.0, 60.0)
+    seconds = np.maximum(miles / speed * 3_600 + rng.normal(120, 60, n), 30).astype(np.int64)
+    # A few zero-distance trips, as in the real files.
+    miles[rng.random(n) < 0.01] = 0.0
+    return np.round(miles, 2), seconds
+
+
+def _metered_fare(rng: np.random.Generator, miles: np.ndarray, seconds: np.ndarray) -> np.ndarray:
+    fare = 3.0 + miles * 1.75 + seconds / 60 * 0.35
+    fare *= rng.lognormal(0, 0.05, len(fare))
+    return _inject_bad_fares(rng, fare)
+
+
+def _inject_bad_fares(rng: np.random.Generator, fare: np.ndarray) -> np.ndarray:
+    draw = rng.random(len(fare))
+    fare = np.where(draw < FARE_OUTLIER_RATE, fare * rng.uniform(10, 50, len(fare)), fare)
+    fare = np.where(
+        (draw >= FARE_OUTLIER_RATE) & (draw < FARE_OUTLIER_RATE + NEGATIVE_FARE_RATE), -fare, fare
+    )
+    return np.round(fare, 2)
+
+
+def _dropoffs(rng: np.random.Generator, pickups: np.ndarray, seconds: np.ndarray) -> np.ndarray:
+    dropoffs = pickups + seconds.astype("timedelta64[s]")
+    backwards = rng.random(len(seconds)) < NEGATIVE_DURATION_RATE
+    return np.where(backwards, pickups - seconds.astype("timedelta64[s]"), dropoffs)
+
+
+def _flag(rng: np.random.Generator, n: int, yes_rate: float) -> pa.Array:
+    return pa.array(np.where(rng.random(n) < yes_rate, "Y", "N"), pa.string())
+
+
+def _choice(rng: np.random.Generator, values: Sequence[str], n: int, p=None) -> pa.Array:
+    return pa.array(list(values), pa.string()).take(pa.array(rng.choice(len(values), n, p=p)))
+
+
+def _masked(values: np.ndarray, mask: np.ndarray, type_: pa.DataType) -> pa.Array:
+    return pa.array(values, type_, mask=mask)
+
+
+def _fees(rng: np.random.Generator, n: int, amount: float, rate: float) -> np.ndarray:
+    return np.where(rng.random(n) < rate, amount, 0.0)
+
+
+# --- per-source builders ----------------------------------------------------
+
+
+def _taxi_columns(rng, n, month_start, pickup_prefix: str) -> Dict[str, pa.Array]:
+    """Columns yellow and green share; ``pickup_prefix`` is ``tpep`` or ``lpep``."""
+    pickups = _pickups(rng, n, month_start)
+    miles, seconds = _trips(rng, n)
+    fare = _metered_fare(rng, miles, seconds)
+    # Trips without a meter record (payment_type 0) carry nulls here.
+    unknown = rng.random(n) < 0.04
+    extra = np.round(rng.choice([0.0, 1.0, 2.5], n, p=[0.4, 0.35, 0.25]), 2)
+    tip = np.round(np.where(rng.random(n) < 0.65, np.abs(fare) * rng.uniform(0.1, 0.3, n), 0.0), 2)
+    tolls = _fees(rng, n, 6.94, 0.06)
+    congestion = np.where(unknown, np.nan, _fees(rng, n, 2.5, 0.85))
+    total = np.round(fare + extra + 0.5 + tip + tolls + 1.0 + np.nan_to_num(congestion), 2)
+    return {
+        "VendorID": pa.array(rng.choice(np.array([1, 2, 6, 7], dtype=np.int32), n, p=[0.25, 0.7, 0.04, 0.01])),
+        f"{pickup_prefix}_pickup_datetime": pa.array(pickups, _TIMESTAMP),
+        f"{pickup_prefix}_dropoff_datetime": pa.array(_dropoffs(rng, pickups, seconds), _TIMESTAMP),
+        "passenger_count": _masked(rng.choice([1, 1, 1, 2, 3, 4, 5, 6, 0], n).astype(np.int64), unknown, pa.int64()),
+        "trip_distance": pa.array(miles),
+        "RatecodeID": _masked(rng.choice([1, 2, 3, 4, 5, 99], n, p=[0.93, 0.03, 0.005, 0.005, 0.025, 0.005]).astype(np.int64), unknown, pa.int64()),
+        "store_and_fwd_flag": pa.array(np.where(rng.random(n) < 0.005, "Y", "N"), pa.string(), mask=unknown),
+        "PULocationID": pa.array(_zones(rng, n)),
+        "DOLocationID": pa.array(_zones(rng, n)),
+        "payment_type": pa.array(np.where(unknown, 0, rng.choice([1, 2, 3, 4], n, p=[0.8, 0.17, 0.02, 0.01])).astype(np.int64)),
+        "fare_amount": pa.array(fare),
+        "extra": pa.array(extra),
+        "mta_tax": pa.array(np.full(n, 0.5)),
+        "tip_amount": pa.array(tip),
+        "tolls_amount": pa.array(tolls),
+        "improvement_surcharge": pa.array(np.full(n, 1.0)),
+        "total_amount": pa.array(total),
+        "congestion_surcharge": _masked(np.nan_to_num(congestion), unknown, pa.float64()),
+        "cbd_congestion_fee": pa.array(_fees(rng, n, 0.75, 0.3)),
+    }
+
+
+def _yellow(rng, n, month_start) -> Dict[str, pa.Array]:
+    columns = _taxi_columns(rng, n, month_start, "tpep")
+    unknown = columns["passenger_count"].is_null().to_numpy(zero_copy_only=False)
+    columns["Airport_fee"] = _masked(_fees(rng, n, 1.75, 0.08), unknown, pa.float64())
+    return columns
+
+
+def _green(rng, n, month_start) -> Dict[str, pa.Array]:
+    columns = _taxi_columns(rng, n, month_start, "lpep")
+    unknown = columns["passenger_count"].is_null().to_numpy(zero_copy_only=False)
+    columns["ehail_fee"] = pa.nulls(n, pa.float64())
+    columns["trip_type"] = _masked(rng.choice([1, 2], n, p=[0.97, 0.03]).astype(np.int64), unknown, pa.int64())
+    return columns
+
+
+_FHV_BASES = [f"B{number:05d}" for number in (2510, 2800, 3136, 3404, 1899, 2682, 3016, 712)]
+
+
+def _fhv(rng, n, month_start) -> Dict[str, pa.Array]:
+    pickups = _pickups(rng, n, month_start)
+    _, seconds = _trips(rng, n)
+    # Most FHV bases do not report zones; pickups are missing more often.
+    pickup_missing = rng.random(n) < 0.75
+    dropoff_missing = rng.random(n) < 0.2
+    base = _choice(rng, _FHV_BASES, n)
+    return {
+        "dispatching_base_num": base,
+        "pickup_datetime": pa.array(pickups, _TIMESTAMP),
+        "dropOff_datetime": pa.array(_dropoffs(rng, pickups, seconds), _TIMESTAMP),
+        "PUlocationID": _masked(_zones(rng, n).astype(float), pickup_missing, pa.float64()),
+        "DOlocationID": _masked(_zones(rng, n).astype(float), dropoff_missing, pa.float64()),
+        "SR_Flag": _masked(np.ones(n, dtype=np.int32), rng.random(n) >= 0.01, pa.int32()),
+        "Affiliated_base_number": pa.array(
+            base.to_numpy(zero_copy_only=False), pa.string(), mask=rng.random(n) < 0.1
+        ),
+    }
+
+
+_HVFHS_LICENSES = ["HV0003", "HV0005", "HV0004", "HV0002"]
+_HVFHS_BASES = {"HV0003": "B03404", "HV0005": "B03406", "HV0004": "B02800", "HV0002": "B02510"}
+
+
+def _fhvhv(rng, n, month_start) -> Dict[str, pa.Array]:
+    license_index = rng.choice(len(_HVFHS_LICENSES), n, p=[0.73, 0.25, 0.01, 0.01])
+    licenses = pa.array(_HVFHS_LICENSES, pa.string()).take(pa.array(license_index))
+    bases = pa.array([_HVFHS_BASES[name] for name in _HVFHS_LICENSES], pa.string()).take(pa.array(license_index))
+    is_uber = license_index == 0
+
+    pickups = _pickups(rng, n, month_start)
+    wait = rng.integers(120, 900, n).astype("timedelta64[s]")
+    requests = pickups - wait
+    miles, seconds = _trips(rng, n)
+    fare = _inject_bad_fares(rng, (2.5 + miles * 1.4 + seconds / 60 * 0.55) * rng.lognormal(0, 0.15, n))
+    positive = np.abs(fare)
+    return {
+        "hvfhs_license_num": licenses,
+        "dispatching_base_num": bases,
+        # Only Uber reports the originating base and the on-scene time.
+        "originating_base_num": pa.array(bases.to_numpy(zero_copy_only=False), pa.string(), mask=~is_uber),
+        "request_datetime": pa.array(requests, _TIMESTAMP),
+        "on_scene_datetime": pa.array(pickups - wait // 4, _TIMESTAMP, mask=~is_uber),
+        "pickup_datetime": pa.array(pickups, _TIMESTAMP),
+        "dropoff_datetime": pa.array(_dropoffs(rng, pickups, seconds), _TIMESTAMP),
+        "PULocationID": pa.array(_zones(rng, n)),
+        "DOLocationID": pa.array(_zones(rng, n)),
+        "trip_miles": pa.array(miles),
+        "trip_time": pa.array(seconds),
+        "base_passenger_fare": pa.array(fare),
+        "tolls": pa.array(_fees(rng, n, 6.94, 0.05)),
+        "bcf": pa.array(np.round(positive * 0.0275, 2)),
+        "sales_tax": pa.array(np.round(positive * 0.08875, 2)),
+        "congestion_surcharge": pa.array(_fees(rng, n, 2.75, 0.6)),
+        "airport_fee": pa.array(_fees(rng, n, 2.5, 0.05)),
+        "tips": pa.array(np.round(np.where(rng.random(n) < 0.2, positive * rng.uniform(0.1, 0.25, n), 0.0), 2)),
+        "driver_pay": pa.array(np.round(positive * rng.uniform(0.65, 0.85, n), 2)),
+        "shared_request_flag": _flag(rng, n, 0.01),
+        "shared_match_flag": _flag(rng, n, 0.003),
+        # Uber leaves this flag blank.
+        "access_a_ride_flag": pa.array(np.where(license_index == 0, " ", "N"), pa.string()),
+        "wav_request_flag": _flag(rng, n, 0.005),
+        "wav_match_flag": _flag(rng, n, 0.07),
+        "cbd_congestion_fee": pa.array(_fees(rng, n, 1.5, 0.3)),
+    }
+
+
+def _schema(fields: Iterable[tuple]) -> pa.Schema:
+    return pa.schema([pa.field(name, type_) for name, type_ in fields])
+
+
+_TAXI_FIELDS = [
+    ("VendorID", pa.int32()),
+    ("{prefix}_pickup_datetime", _TIMESTAMP),
+    ("{prefix}_dropoff_datetime", _TIMESTAMP),
+    ("passenger_count", pa.int64()),
+    ("trip_distance", pa.float64()),
+    ("RatecodeID", pa.int64()),
+    ("store_and_fwd_flag", pa.string()),
+    ("PULocationID", pa.int32()),
+    ("DOLocationID", pa.int32()),
+    ("payment_type", pa.int64()),
+    ("fare_amount", pa.float64()),
+    ("extra", pa.float64()),
+    ("mta_tax", pa.float64()),
+    ("tip_amount", pa.float64()),
+    ("tolls_amount", pa.float64()),
+    ("improvement_surcharge", pa.float64()),
+    ("total_amount", pa.float64()),
+    ("congestion_surcharge", pa.float64()),
+]
+
+
+def _taxi_schema(prefix: str, extra: List[tuple]) -> pa.Schema:
+    fields = [(name.format(prefix=prefix), type_) for name, type_ in _TAXI_FIELDS]
+    return _schema(fields + extra + [("cbd_congestion_fee", pa.float64())])
+
+
+SOURCES: Dict[str, Source] = {
+    "yellow": Source(
+        "yellow",
+        _taxi_schema("tpep", [("Airport_fee", pa.float64())]),
+        row_group_size=1_048_576,
+        build=_yellow,
+    ),
+    "green": Source(
+        "green",
+        _taxi_schema("lpep", [("ehail_fee", pa.float64()), ("trip_type", pa.int64())]),
+        row_group_size=1_048_576,
+        build=_green,
+    ),
+    "fhv": Source(
+        "fhv",
+        _schema(
+            [
+                ("dispatching_base_num", pa.string()),
+                ("pickup_datetime", _TIMESTAMP),
+                ("dropOff_datetime", _TIMESTAMP),
+                ("PUlocationID", pa.float64()),
+                ("DOlocationID", pa.float64()),
+                ("SR_Flag", pa.int32()),
+                ("Affiliated_base_number", pa.string()),
+            ]
+        ),
+        row_group_size=1_048_576,
+        build=_fhv,
+    ),
+    "fhvhv": Source(
+        "fhvhv",
+        _schema(
+            [
+                ("hvfhs_license_num", pa.string()),
+                ("dispatching_base_num", pa.string()),
+                ("originating_base_num", pa.string()),
+                ("request_datetime", _TIMESTAMP),
+                ("on_scene_datetime", _TIMESTAMP),
+                ("pickup_datetime", _TIMESTAMP),
+                ("dropoff_datetime", _TIMESTAMP),
+                ("PULocationID", pa.int32()),
+                ("DOLocationID", pa.int32()),
+                ("trip_miles", pa.float64()),
+                ("trip_time", pa.int64()),
+                ("base_passenger_fare", pa.float64()),
+                ("tolls", pa.float64()),
+                ("bcf", pa.float64()),
+                ("sales_tax", pa.float64()),
+                ("congestion_surcharge", pa.float64()),
+                ("airport_fee", pa.float64()),
+                ("tips", pa.float64()),
+                ("driver_pay", pa.float64()),
+                ("shared_request_flag", pa.string()),
+                ("shared_match_flag", pa.string()),
+                ("access_a_ride_flag", pa.string()),
+                ("wav_request_flag", pa.string()),
+                ("wav_match_flag", pa.string()),
+                ("cbd_congestion_fee", pa.float64()),
+            ]
+        ),
+        # The HVFHV files are by far the largest and use bigger row groups.
+        row_group_size=2_097_152,
+        build=_fhvhv,
+    ),
+}
+
+
+# --- writers -----------------------------------------------------------------
+
+
+def generate_table(source: str, rows: int, rng: np.random.Generator, month: str = "2025-01") -> pa.Table:
+    """``rows`` trips of ``source`` in ``month``, including injected duplicates."""
+    spec = SOURCES[source]
+    month_start = np.datetime64(month, "M")
+    unique_rows = rows - int(rows * DUPLICATE_RATE)
+    table = pa.table(spec.build(rng, unique_rows, month_start), schema=spec.schema)
+    if unique_rows < rows and unique_rows:
+        copies = table.take(pa.array(rng.integers(0, unique_rows, rows - unique_rows)))
+        table = pa.concat_tables([table, copies])
+        # Duplicates land next to random rows, not all at the end.
+        table = table.take(pa.array(rng.permutation(rows)))
+    return table
+
+
+def write_source(
+    source: str,
+    path: Path,
+    rows: int,
+    seed: int = 42,
+    month: str = "2025-01",
+    row_group_size: int | None = None,
+) -> Path:
+    """Stream ``rows`` trips of ``source`` into ``path``, one row group at a time."""
+    spec = SOURCES[source]
+    group_rows = row_group_size or spec.row_group_size
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with pq.ParquetWriter(path, spec.schema, compression="snappy") as writer:
+        for index, start in enumerate(range(0, rows, group_rows)):
+            rng = np.random.default_rng([seed, sorted(SOURCES).index(source), index])
+            writer.write_table(
+                generate_table(source, min(group_rows, rows - start), rng, month),
+                row_group_size=group_rows,
+            )
+    return path
+
+
+def generate(
+    output_dir: Path,
+    rows: int,
+    seed: int = 42,
+    month: str = "2025-01",
+    mix: Dict[str, float] | None = None,
+    row_group_size: int | None = None,
+) -> List[Path]:
+    """Write one ``<source>_tripdata_<month>.parquet`` per source, ``rows`` in total."""
+    mix = mix or DEFAULT_MIX
+    total_weight = sum(mix.values())
+    counts = {source: int(rows * weight / total_weight) for source, weight in mix.items()}
+    # Rounding leftovers go to the largest source.
+    counts[max(mix, key=mix.get)] += rows - sum(counts.values())
+    return [
+        write_source(source, Path(output_dir) / f"{source}_tripdata_{month}.parquet", count, seed, month, row_group_size)
+        for source, count in counts.items()
+        if count > 0
+    ]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Write synthetic TLC-shaped trip parquet files.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Total rows across all sources.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--month", default="2025-01", help="Month the trips fall in (YYYY-MM).")
+    parser.add_argument("--output", type=Path, default=Path("data/raw"), help="Directory for the files.")
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        choices=sorted(SOURCES),
+        default=list(DEFAULT_MIX),
+        help="Sources to write; rows are split between them in the default proportions.",
+    )
+    parser.add_argument("--row-group-size", type=int, help="Override each source's row-group size.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    mix = {source: DEFAULT_MIX[source] for source in args.sources}
+    for path in generate(args.output, args.rows, args.seed, args.month, mix, args.row_group_size):
+        metadata = pq.ParquetFile(path).metadata
+        print(f"Wrote {metadata.num_rows:,} rows in {metadata.num_row_groups} row group(s) to {path}")
+
+
+if __name__ == "__main__":
+    main()
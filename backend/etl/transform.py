@@ -1,7 +1,68 @@
 from app.utils.algorithm_integration import apply_fare_outlier_detection
+import argparse
+from typing import Optional
+
+import numpy as np
 import pandas as pd
 
-def transform_data(df: pd.DataFrame) -> pd.DataFrame:
+from .memory import MemoryReport
+
+
+# Source columns the trips table has no use for.
+UNUSED_COLUMNS = [
+    'Affiliated_base_number',
+    'trip_type',
+    'SR_Flag',
+    'store_and_fwd_flag',
+    'total_amount',
+    'shared_request_flag',
+    'shared_match_flag',
+    'access_a_ride_flag',
+    'wav_request_flag',
+    'wav_match_flag',
+    'ehail_fee',
+    'trip_time',
+    'RatecodeID',
+    'passenger_count',
+    'payment_type',
+]
+
+# Summed into total_extra_charges.
+EXTRA_CHARGE_COLUMNS = [
+    'tolls',
+    'bcf',
+    'sales_tax',
+    'congestion_surcharge',
+    'airport_fee',
+    'Airport_fee',
+    'tips',
+    'extra',
+    'mta_tax',
+    'tip_amount',
+    'tolls_amount',
+    'improvement_surcharge',
+    'cbd_congestion_fee',
+]
+
+# Compact mode dtypes: TLC zone ids run 1-265.
+ZONE_DTYPE = 'int16'
+METRIC_DTYPE = 'float32'
+
+
+def transform_data(
+    df: pd.DataFrame, compact: bool = False, report: Optional[MemoryReport] = None
+) -> pd.DataFrame:
+    """
+    Clean the extracted TLC frame into the ``trips`` columns.
+
+    ``compact=True`` works on ``df`` in place (the caller's frame is consumed)
+    and returns categorical vendor ids, int16 zone ids and float32 metrics;
+    see ``transform_compact``. ``report`` records the frame size and peak RSS
+    after each step.
+    """
+    if compact:
+        return transform_compact(df, report)
+
     print("Cleaning and transforming data...")
 
     # Make a copy to avoid SettingWithCopyWarning
@@ -9,6 +70,8 @@ def transform_data(df: pd.DataFrame) -> pd.DataFrame:
 
    # drop duplicates
     df = df.drop_duplicates()
+    if report:
+        report.step("drop duplicates", df)
 
     
     # merge PULocationID with PUlocationID
@@ -35,24 +98,7 @@ def transform_data(df: pd.DataFrame) -> pd.DataFrame:
     )
 
     # drop unnecessary columns
-    df.drop(columns=[
-        'Affiliated_base_number', 
-        'trip_type', 
-        'SR_Flag', 
-        'store_and_fwd_flag', 
-        'total_amount',
-        'shared_request_flag',
-        'shared_match_flag',
-        'access_a_ride_flag',
-        'wav_request_flag',
-        'wav_match_flag',
-        'ehail_fee',
-        'trip_time',
-        'RatecodeID',
-        'passenger_count',
-        'payment_type',
-        'Affiliated_base_number',
-        ], inplace=True)
+    df.drop(columns=UNUSED_COLUMNS, inplace=True)
 
     # merge dropOff_datetime with dropoff_datetime
     df['dropoff_datetime'] = df['dropoff_datetime'].combine_first(df['dropOff_datetime'])
@@ -86,6 +132,8 @@ def transform_data(df: pd.DataFrame) -> pd.DataFrame:
 
     # move vendor_id to the first column
     df = df[["vendor_id"] + [col for col in df.columns if col != "vendor_id"]]
+    if report:
+        report.step("merge zones and vendors", df)
 
     # combine the pickup_datetime, lpep_pickup_datetime, and tpep_pickup_datetime columns into pickup_datetime
     df["pickup_datetime"] = (
@@ -123,45 +171,14 @@ def transform_data(df: pd.DataFrame) -> pd.DataFrame:
 
     # calculate total extra charges
     df['total_extra_charges'] = (
-        df[[
-            'tolls',
-             'bcf', 
-             'sales_tax', 
-             'congestion_surcharge', 
-             'airport_fee', 
-             'Airport_fee',
-             'tips', 
-             'extra', 
-             'mta_tax', 
-             'tip_amount', 
-             'tolls_amount', 
-             'improvement_surcharge',
-             'cbd_congestion_fee',
-             ]]
+        df[EXTRA_CHARGE_COLUMNS]
         .fillna(0)
         .sum(axis=1)
         .round(2)
     )
 
     # drop the extra, mta_tax, tip_amount, tolls_amount, and improvement_surcharge columns
-    df.drop(
-        columns=[
-            'tolls',
-             'bcf', 
-             'sales_tax', 
-             'congestion_surcharge', 
-             'airport_fee', 
-             'Airport_fee',
-             'tips', 
-             'extra', 
-             'mta_tax', 
-             'tip_amount', 
-             'tolls_amount', 
-             'improvement_surcharge',
-             'cbd_congestion_fee',
-        ],
-        inplace=True,
-    )
+    df.drop(columns=EXTRA_CHARGE_COLUMNS, inplace=True)
 
     datetime_cols = ['request_datetime', 'on_scene_datetime', 'dropoff_datetime', 'pickup_datetime']
 
@@ -186,7 +203,8 @@ def transform_data(df: pd.DataFrame) -> pd.DataFrame:
     df['trip_duration'] = (df['dropoff_datetime'] - df['pickup_datetime']).dt.total_seconds()
 
     df['trip_duration'] = df['trip_duration'].apply(lambda x: round(x, 2) if pd.notna(x) and x >= 0 else pd.NA)
-
+    if report:
+        report.step("fares, times and speeds", df)
 
     df = df.dropna(subset=['PULocationID', 'DOLocationID', 'trip_miles', 'average_speed_mph'])
 
@@ -212,8 +230,143 @@ def transform_data(df: pd.DataFrame) -> pd.DataFrame:
 
     # Filter out rows where base_passenger_fare or total_extra_charges are negative
     df = df[(df['base_passenger_fare'] >= 0) & (df['total_extra_charges'] >= 0)]
+    if report:
+        report.step("filter rows", df)
 
     # Apply custom outlier detection algorithm
     df = apply_fare_outlier_detection(df)
+    if report:
+        report.step("fare outliers", df)
     
     return df
+
+
+def _merge_into(df: pd.DataFrame, target: str, *sources: str) -> None:
+    """Fill ``target``'s gaps from ``sources`` in order, then delete the sources."""
+    for source in sources:
+        df[target] = df[target].combine_first(df[source])
+        del df[source]
+
+
+def _duplicated_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    ``df.duplicated()`` without factorizing every column at once.
+
+    Rows are hashed one column at a time into a single uint64 per row; only
+    rows whose hash repeats are then compared in full, so hash collisions
+    never drop a row.
+    """
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    candidates = np.flatnonzero(pd.Series(hashes).duplicated(keep=False).to_numpy())
+    duplicated = np.zeros(len(df), dtype=bool)
+    duplicated[candidates] = df.take(candidates).duplicated().to_numpy()
+    return duplicated
+
+
+def transform_compact(df: pd.DataFrame, report: Optional[MemoryReport] = None) -> pd.DataFrame:
+    """
+    Memory-lean ``transform_data``: same rows and values, smaller dtypes.
+
+    Works on ``df`` in place: source columns are deleted as soon as they are
+    merged, and every row filter is collected into one mask applied once,
+    after the metrics have been narrowed. vendor_id becomes a categorical of
+    strings (taxi VendorIDs as "1", the form the loader stores, not 1.0),
+    zone ids int16 and metrics float32.
+    """
+    print("Cleaning and transforming data (compact)...")
+
+    # Mark duplicates before any column is dropped, so they match the full rows.
+    keep = ~_duplicated_rows(df)
+    for col in UNUSED_COLUMNS:
+        del df[col]
+    if report:
+        report.step("mark duplicates", df)
+
+    _merge_into(df, 'PULocationID', 'PUlocationID')
+    _merge_into(df, 'DOLocationID', 'DOlocationID')
+    for col in ('PULocationID', 'DOLocationID'):
+        zones = pd.to_numeric(df[col], errors='coerce').round(0)
+        keep &= zones.notna().to_numpy()
+        df[col] = zones.fillna(0).astype(ZONE_DTYPE)
+
+    # Taxi VendorID is a float column; as "1" rather than 1.0, the id the loader stores.
+    taxi_vendor = df.pop('VendorID').astype('string').str.removesuffix('.0')
+    vendor = (
+        df.pop('hvfhs_license_num')
+        .combine_first(df.pop('dispatching_base_num'))
+        .combine_first(taxi_vendor)
+        .astype('string')
+        .str.strip()
+        .replace('', pd.NA)
+    )
+    del taxi_vendor
+    del df['originating_base_num']
+    df.insert(0, 'vendor_id', vendor.astype('category'))
+    del vendor
+    if report:
+        report.step("merge zones and vendors", df)
+
+    _merge_into(df, 'dropoff_datetime', 'dropOff_datetime', 'lpep_dropoff_datetime', 'tpep_dropoff_datetime')
+    _merge_into(df, 'pickup_datetime', 'lpep_pickup_datetime', 'tpep_pickup_datetime')
+    _merge_into(df, 'trip_miles', 'trip_distance')
+    for col in ('request_datetime', 'on_scene_datetime', 'dropoff_datetime', 'pickup_datetime'):
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    fare = pd.to_numeric(df.pop('fare_amount'), errors='coerce')
+    fare = fare.combine_first(pd.to_numeric(df['base_passenger_fare'], errors='coerce')).fillna(0)
+    df['base_passenger_fare'] = fare.astype(METRIC_DTYPE)
+
+    extras = np.zeros(len(df))
+    for col in EXTRA_CHARGE_COLUMNS:
+        extras += pd.to_numeric(df.pop(col), errors='coerce').fillna(0).to_numpy()
+    extras = extras.round(2)
+    keep &= (fare.to_numpy() >= 0) & (extras >= 0)
+    del fare
+    df['total_extra_charges'] = extras.astype(METRIC_DTYPE)
+    del extras
+
+    miles = pd.to_numeric(df['trip_miles'], errors='coerce')
+    seconds = (df['dropoff_datetime'] - df['pickup_datetime']).dt.total_seconds()
+    hours = (seconds / 3600).round(2)
+    speed = (miles / hours.where(hours > 0)).round(2)
+    keep &= miles.notna().to_numpy() & speed.notna().to_numpy()
+    df['trip_miles'] = miles.astype(METRIC_DTYPE)
+    df['driver_pay'] = pd.to_numeric(df['driver_pay'], errors='coerce').astype(METRIC_DTYPE)
+    df['trip_duration_hours'] = hours.astype(METRIC_DTYPE)
+    df['average_speed_mph'] = speed.astype(METRIC_DTYPE)
+    df['trip_duration'] = seconds.where(seconds >= 0).round(2).astype(METRIC_DTYPE)
+    del miles, seconds, hours, speed
+    if report:
+        report.step("fares, times and speeds", df)
+
+    # Every row kept has zone ids, so the original "all columns empty" filter
+    # can never drop one here.
+    df = df.take(np.flatnonzero(keep))
+    if report:
+        report.step("filter rows", df)
+
+    df = apply_fare_outlier_detection(df)
+    if report:
+        report.step("fare outliers", df)
+    return df
+
+
+def main() -> None:
+    from .extract import SAMPLE_MODES, extract_data
+
+    parser = argparse.ArgumentParser(description="Transform the raw TLC files and report memory per step.")
+    parser.add_argument("--compact", action="store_true", help="Use the compact-dtype, in-place transform.")
+    parser.add_argument("--rows-per-file", type=int, default=100_000, help="Rows read from each raw file.")
+    parser.add_argument("--sample", choices=SAMPLE_MODES, default="head", help="How the rows of each file are picked.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed of the sample.")
+    args = parser.parse_args()
+
+    df = extract_data(n_rows_per_file=args.rows_per_file, sample=args.sample, seed=args.seed)
+    report = MemoryReport("transform (compact)" if args.compact else "transform")
+    report.step("extracted", df)
+    df = transform_data(df, compact=args.compact, report=report)
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""The tuple fast path of the trip listings renders what ``response_model`` documents."""
+
+from typing import List
+
+import orjson
+import pytest
+from pydantic import TypeAdapter
+
+from backend.app.db.config import SessionLocal, engine
+from backend.app.models import Base, Location, Trip
+from backend.app.schemas import LocationOut, TripOut, TripWithZonesOut
+from backend.app.utils.serializers import (
+    EXPANDED_TRIP_FIELDS,
+    TRIP_COLUMNS,
+    encode_json,
+    with_zones,
+)
+from backend.benchmarks.serialization import _seed
+
+
+PAGE_SIZE = 200
+
+
+@pytest.fixture(scope="module")
+def session():
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        _seed(session, 1_000)
+        yield session
+    Base.metadata.drop_all(bind=engine)
+
+
+def _page(session):
+    return session.query(Trip).order_by(Trip.pickup_datetime.desc()).limit(PAGE_SIZE)
+
+
+def _rendered(model, values) -> list:
+    # What FastAPI sends for ``response_model=List[model]``.
+    adapter = TypeAdapter(List[model])
+    return adapter.dump_python(adapter.validate_python(values, from_attributes=True), mode="json")
+
+
+def test_encode_json_matches_trip_out(session):
+    rows = _page(session).with_entities(*TRIP_COLUMNS).all()
+
+    assert orjson.loads(encode_json(rows)) == _rendered(TripOut, _page(session).all())
+
+
+def test_expanded_encode_json_matches_trip_with_zones_out(session):
+    rows = _page(session).with_entities(*TRIP_COLUMNS).all()
+    locations = {
+        location.location_id: LocationOut.model_validate(location)
+        for location in session.query(Location)
+    }
+    expanded = [
+        {
+            **TripOut.model_validate(trip).model_dump(),
+            "pickup_borough": locations[trip.pickup_id].borough,
+            "pickup_zone": locations[trip.pickup_id].zone,
+            "dropoff_borough": locations[trip.dropoff_id].borough,
+            "dropoff_zone": locations[trip.dropoff_id].zone,
+        }
+        for trip in _page(session)
+    ]
+
+    assert orjson.loads(
+        encode_json(with_zones(rows, locations), EXPANDED_TRIP_FIELDS)
+    ) == _rendered(TripWithZonesOut, expanded)
@@ -39,21 +39,27 @@ class AdvancedDataVisualizer {
     // ============================================
     async renderDistanceFareScatter() {
         try {
-            const trips = await app.apiCall('/trips?limit=1000');
-            const scatterData = this.generateScatterData(trips);
+            const params = app.buildFilterParams();
+            params.append('miles_bins', '25');
+            params.append('fare_bins', '25');
+            const histogram = await app.apiCall(`/insights/distance-fare?${params.toString()}`);
+            const scatterData = this.generateScatterData(histogram);
             this.createScatterChart('distance-fare-scatter', scatterData);
         } catch (error) {
             console.error('Failed to render distance-fare scatter:', error);
         }
     }
 
-    generateScatterData(trips) {
-        return trips
-            .filter(t => t.trip_miles && t.base_passenger_fare)
-            .map(trip => ({
-                x: parseFloat(trip.trip_miles),
-                y: parseFloat(trip.base_passenger_fare)
-            }));
+    // One bubble per non-empty histogram bin, sized by its trip count
+    generateScatterData(histogram) {
+        const maxCount = Math.max(1, ...histogram.bins.map(b => b.count));
+        const center = (edges, i) => (edges[i] + edges[i + 1]) / 2;
+        return histogram.bins.map(bin => ({
+            x: center(histogram.miles_edges, bin.miles_bin),
+            y: center(histogram.fare_edges, bin.fare_bin),
+            r: 2 + 10 * Math.sqrt(bin.count / maxCount),
+            count: bin.count
+        }));
     }
 
     createScatterChart(canvasId, data) {
@@ -65,7 +71,7 @@ class AdvancedDataVisualizer {
         }
 
         this.charts[canvasId] = new Chart(ctx, {
-            type: 'scatter',
+            type: 'bubble',
             data: {
                 datasets: [{
                     label: 'Trip Distance vs Fare',
@@ -73,8 +79,7 @@ class AdvancedDataVisualizer {
                     backgroundColor: this.colors.primary.replace('rgb', 'rgba').replace(')', ', 0.6)'),
                     borderColor: this.colors.primary,
                     borderWidth: 1,
-                    pointRadius: 3,
-                    pointHoverRadius: 6
+                    hoverRadius: 3
                 }]
             },
             options: {
@@ -92,8 +97,9 @@ class AdvancedDataVisualizer {
                         padding: 12,
                         callbacks: {
                             label: (context) => [
-                                `Distance: ${context.parsed.x.toFixed(2)} miles`,
-                                `Fare: $${context.parsed.y.toFixed(2)}`
+                                `Distance: ~${context.parsed.x.toFixed(2)} miles`,
+                                `Fare: ~$${context.parsed.y.toFixed(2)}`,
+                                `Trips: ${context.raw.count.toLocaleString()}`
                             ]
                         }
                     }
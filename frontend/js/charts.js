@@ -32,16 +32,13 @@ class DataVisualizer {
                 return;
             }
             
-            // Use filter parameters if available
-            const params = new URLSearchParams();
-            if (app.filters && app.filters.startDate) params.append('start_date', app.filters.startDate);
-            if (app.filters && app.filters.endDate) params.append('end_date', app.filters.endDate);
-            
-            const queryString = params.toString() ? `?limit=1000&${params.toString()}` : '?limit=1000';
+            // Hourly counts are aggregated server-side over every matching trip
+            const params = app.buildFilterParams();
+            const queryString = params.toString() ? `?${params.toString()}` : '';
             
-            const trips = await app.apiCall(`/trips${queryString}`);
-            if (trips && trips.length > 0) {
-                const hourlyData = this.aggregateTripsByHour(trips);
+            const hourly = await app.apiCall(`/insights/hourly-trips${queryString}`);
+            if (hourly && hourly.total_trips > 0) {
+                const hourlyData = this.formatHourlyCounts(hourly.by_hour);
                 this.renderTripVolumeChart(hourlyData);
             }
         } catch (error) {
@@ -57,10 +54,8 @@ class DataVisualizer {
             }
             
             // Use filter parameters if available
-            const params = new URLSearchParams();
+            const params = app.buildFilterParams();
             params.append('limit', '8');
-            if (app.filters && app.filters.startDate) params.append('start_date', app.filters.startDate);
-            if (app.filters && app.filters.endDate) params.append('end_date', app.filters.endDate);
             
             const vendors = await app.apiCall(`/insights/top-vendors?${params.toString()}`);
             if (vendors && vendors.length > 0) {
@@ -76,28 +71,13 @@ class DataVisualizer {
         }
     }
 
-    aggregateTripsByHour(trips) {
-        const hourlyCounts = new Map();
-        
-        trips.forEach(trip => {
-            if (trip.pickup_datetime) {
-                const date = new Date(trip.pickup_datetime);
-                const hour = date.getHours();
-                hourlyCounts.set(hour, (hourlyCounts.get(hour) || 0) + 1);
-            }
-        });
-
+    formatHourlyCounts(byHour) {
         // Create array with all 24 hours
-        const data = [];
-        for (let hour = 0; hour < 24; hour++) {
-            data.push({
-                hour: hour,
-                label: `${hour.toString().padStart(2, '0')}:00`,
-                count: hourlyCounts.get(hour) || 0
-            });
-        }
-        
-        return data;
+        return byHour.map((count, hour) => ({
+            hour: hour,
+            label: `${hour.toString().padStart(2, '0')}:00`,
+            count: count
+        }));
     }
 
     renderTripVolumeChart(data) {
@@ -79,6 +79,8 @@ class UrbanMobilityApp {
         if (locationFilter) {
             locationFilter.addEventListener('change', (e) => {
                 this.filters.location = e.target.value;
+                this.currentPage = 1;
+                this.highlightActiveFilters();
                 this.loadTrips();
             });
         }
@@ -235,19 +237,24 @@ class UrbanMobilityApp {
         }
     }
 
+    // Filters shared by the trip list and the aggregate endpoints
+    buildFilterParams(params = new URLSearchParams()) {
+        if (this.filters.vendor) params.append('vendor_id', this.filters.vendor);
+        if (this.filters.location) params.append('pickup_id', this.filters.location);
+        if (this.filters.startDate) params.append('start_date', this.filters.startDate);
+        if (this.filters.endDate) params.append('end_date', this.filters.endDate);
+        return params;
+    }
+
     async loadDashboardMetrics() {
         try {
             // Build query params from filters
-            const params = new URLSearchParams();
-            if (this.filters.startDate) params.append('start_date', this.filters.startDate);
-            if (this.filters.endDate) params.append('end_date', this.filters.endDate);
+            const params = this.buildFilterParams();
             
             const queryString = params.toString() ? `?${params.toString()}` : '';
             
-            const [overview, summary] = await Promise.all([
-                this.apiCall(`/insights/overview${queryString}`),
-                this.apiCall(`/trips/summary${queryString}`)
-            ]);
+            // One round trip for every dashboard section
+            const { overview, summary } = await this.apiCall(`/dashboard${queryString}`);
 
             this.updateMetric('total-trips', overview.total_trips?.toLocaleString() || '0');
             this.updateMetric('active-vendors', overview.unique_vendors?.toLocaleString() || '0');
@@ -330,14 +337,13 @@ class UrbanMobilityApp {
             
             const params = new URLSearchParams({
                 limit: this.pageSize,
-                offset: (this.currentPage - 1) * this.pageSize
+                offset: (this.currentPage - 1) * this.pageSize,
+                include_total: 'true'
             });
 
             // Add filter parameters
-            if (this.filters.vendor) params.append('vendor_id', this.filters.vendor);
+            this.buildFilterParams(params);
             if (this.filters.search) params.append('search', this.filters.search);
-            if (this.filters.startDate) params.append('start_date', this.filters.startDate);
-            if (this.filters.endDate) params.append('end_date', this.filters.endDate);
 
             // Add sorting parameters
             if (this.sortField) {
@@ -345,7 +351,9 @@ class UrbanMobilityApp {
                 params.append('sort_order', this.sortDirection);
             }
 
-            const trips = await this.apiCall(`/trips?${params}`);
+            const { data: trips, total, approximate } = await this.apiCallWithTotal(`/trips?${params}`);
+            this.tripsTotal = total;
+            this.tripsTotalApproximate = approximate;
             this.renderTripsTable(trips);
             this.updatePagination();
         } catch (error) {
@@ -371,17 +379,14 @@ class UrbanMobilityApp {
             this.showInsightsLoading();
             this.showAlgorithmPerformanceLoading();
             
-            const params = new URLSearchParams();
-            if (this.filters.startDate) params.append('start_date', this.filters.startDate);
-            if (this.filters.endDate) params.append('end_date', this.filters.endDate);
+            const params = this.buildFilterParams();
+            params.append('vendor_limit', '10');
             
-            const queryString = params.toString() ? `?${params.toString()}` : '';
-            
-            const [overview, topVendors, algorithmStats] = await Promise.all([
-                this.apiCall(`/insights/overview${queryString}`),
-                this.apiCall(`/insights/top-vendors?limit=10${queryString ? '&' + params.toString() : ''}`),
-                this.apiCall('/insights/algorithm-performance')
-            ]);
+            // One round trip for overview, top vendors and algorithm stats
+            const dashboard = await this.apiCall(`/dashboard?${params.toString()}`);
+            const overview = dashboard.overview;
+            const topVendors = dashboard.top_vendors;
+            const algorithmStats = dashboard.algorithm_performance;
 
             this.renderInsights(overview, topVendors);
             this.renderAlgorithmPerformance(algorithmStats);
@@ -554,9 +559,7 @@ class UrbanMobilityApp {
             console.log('📊 Loading analytics section...');
             
             // Build query params from filters
-            const params = new URLSearchParams();
-            if (this.filters.startDate) params.append('start_date', this.filters.startDate);
-            if (this.filters.endDate) params.append('end_date', this.filters.endDate);
+            const params = this.buildFilterParams();
             
             const queryString = params.toString() ? `?${params.toString()}` : '';
             
@@ -585,22 +588,13 @@ class UrbanMobilityApp {
 
                 const peakHourEl = document.getElementById('analytics-peak-hour');
                 if (peakHourEl) {
-                    // Calculate peak hour from trips data
-                    const trips = await this.apiCall(`/trips?limit=1000${queryString ? '&' + params.toString() : ''}`);
-                    if (trips && trips.length > 0) {
-                        const hourCounts = {};
-                        trips.forEach(trip => {
-                            if (trip.pickup_datetime) {
-                                const hour = new Date(trip.pickup_datetime).getHours();
-                                hourCounts[hour] = (hourCounts[hour] || 0) + 1;
-                            }
-                        });
-                        if (Object.keys(hourCounts).length > 0) {
-                            const peakHour = Object.keys(hourCounts).reduce((a, b) => 
-                                hourCounts[a] > hourCounts[b] ? a : b
-                            );
-                            peakHourEl.textContent = `${peakHour.toString().padStart(2, '0')}:00`;
-                        }
+                    // Peak hour over all matching trips, aggregated server-side
+                    const hourly = await this.apiCall(`/insights/hourly-trips${queryString}`);
+                    if (hourly && hourly.total_trips > 0) {
+                        const peakHour = hourly.by_hour.reduce((best, count, hour) =>
+                            count > hourly.by_hour[best] ? hour : best, 0
+                        );
+                        peakHourEl.textContent = `${peakHour.toString().padStart(2, '0')}:00`;
                     }
                 }
             }
@@ -994,13 +988,25 @@ class UrbanMobilityApp {
         const nextBtn = document.getElementById('next-page');
         const info = document.getElementById('pagination-info');
         
+        const total = this.tripsTotal;
+        const hasTotal = typeof total === 'number';
+        const lastPage = hasTotal ? Math.max(1, Math.ceil(total / this.pageSize)) : null;
+
         if (prevBtn) prevBtn.disabled = this.currentPage === 1;
-        if (nextBtn) nextBtn.disabled = false; 
+        // An approximate total is only an estimate, so never stop paging on it.
+        if (nextBtn) nextBtn.disabled = hasTotal && !this.tripsTotalApproximate && this.currentPage >= lastPage;
         
         if (info) {
             const start = (this.currentPage - 1) * this.pageSize + 1;
-            const end = this.currentPage * this.pageSize;
-            info.textContent = `Showing ${start}-${end} of many trips`;
+            const end = hasTotal && !this.tripsTotalApproximate
+                ? Math.min(this.currentPage * this.pageSize, total)
+                : this.currentPage * this.pageSize;
+            if (!hasTotal) {
+                info.textContent = `Showing ${start}-${end} of many trips`;
+            } else {
+                const prefix = this.tripsTotalApproximate ? '~' : '';
+                info.textContent = `Showing ${start}-${end} of ${prefix}${total.toLocaleString()} trips (page ${this.currentPage} of ${prefix}${lastPage.toLocaleString()})`;
+            }
         }
     }
 
@@ -1195,6 +1201,27 @@ class UrbanMobilityApp {
         }
     }
 
+    async apiCallWithTotal(endpoint) {
+        // Like apiCall, plus the X-Total-Count pagination headers.
+        const cacheKey = `total:${endpoint}`;
+        if (this.cache.has(cacheKey)) {
+            return this.cache.get(cacheKey);
+        }
+
+        const response = await fetch(`${this.apiBase}${endpoint}`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        const header = response.headers.get('X-Total-Count');
+        const result = {
+            data: await response.json(),
+            total: header === null ? null : parseInt(header, 10),
+            approximate: response.headers.get('X-Total-Count-Approximate') === 'true'
+        };
+        this.cache.set(cacheKey, result);
+        return result;
+    }
+
     updateMetric(id, value) {
         const element = document.getElementById(id);
         if (element) element.textContent = value;